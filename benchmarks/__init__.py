@@ -0,0 +1 @@
+"""Performance benchmarks for the national-parks project."""
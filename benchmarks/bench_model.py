@@ -0,0 +1,43 @@
+"""Benchmarks for model training."""
+
+from pmdarima.arima import AutoARIMA
+import pytest
+
+from national_parks.model._arima import _detrend_time_series
+from national_parks.model._order_search import parallel_stepwise_search
+
+
+@pytest.mark.benchmark(group='detrend')
+def bench_detrend_time_series(benchmark, monthly_series):
+    deseasoned = (monthly_series - monthly_series.shift(12)).dropna()
+    benchmark(_detrend_time_series, deseasoned, alpha=0.01, max_diffs=3)
+
+
+@pytest.mark.benchmark(group='auto_arima')
+def bench_auto_arima_fit(benchmark, monthly_series):
+    # A single seasonal order search is slow enough that only a few rounds
+    # are affordable
+    train_ts = monthly_series[:-103]
+    benchmark.pedantic(
+        lambda: AutoARIMA(m=12, max_order=8).fit(train_ts),
+        rounds=3,
+        iterations=1
+    )
+
+
+def _orders(model):
+    # AutoARIMA wraps the ARIMA that it chose
+    model = getattr(model, 'model_', model)
+    return model.order, model.seasonal_order
+
+
+@pytest.mark.benchmark(group='auto_arima')
+def bench_parallel_stepwise_search(benchmark, monthly_series):
+    train_ts = monthly_series[:-103]
+    model = benchmark.pedantic(
+        lambda: parallel_stepwise_search(train_ts, m=12, n_jobs=4),
+        rounds=3,
+        iterations=1
+    )
+    # The parallel search must choose the same model as the serial search
+    assert _orders(model) == _orders(AutoARIMA(m=12).fit(train_ts))
@@ -0,0 +1,61 @@
+"""Benchmarks for parsing scraped National Parks Service reports."""
+
+from bs4 import BeautifulSoup
+import pytest
+
+from national_parks.nps import NPSCaptaset, generate_monthly_visitors
+from national_parks.nps.mock_server import (
+    MockNPSServer, render_report_csv, render_report_page
+)
+from national_parks.nps.park_scraper import (
+    _bs_table_to_pandas, _csv_report_to_pandas
+)
+
+
+@pytest.fixture(params=[43], ids=lambda n: f'{n}_years')
+def report_page(request):
+    return render_report_page(generate_monthly_visitors(
+        1, min_year=2022 - request.param, max_year=2021, ragged_share=0
+    ))
+
+
+@pytest.mark.benchmark(group='nps_parsing')
+def bench_parse_report_table(benchmark, report_page):
+    def parse():
+        soup = BeautifulSoup(report_page, 'html.parser')
+        return _bs_table_to_pandas(soup.find('table', cols='14'))
+    benchmark(parse)
+
+
+@pytest.mark.benchmark(group='nps_parsing')
+def bench_parse_report_csv(benchmark):
+    report_csv = render_report_csv(generate_monthly_visitors(
+        1, min_year=1979, max_year=2021, ragged_share=0
+    ))
+    benchmark(_csv_report_to_pandas, report_csv)
+
+
+@pytest.mark.benchmark(group='nps_scraping')
+@pytest.mark.parametrize('fetch_mode', ['csv', 'html'])
+@pytest.mark.parametrize('latency', [0.0, 0.05], ids=lambda s: f'{s}s')
+def bench_scrape_parks_from_mock_server(benchmark, latency, fetch_mode):
+    parks = [f'P{i:03d}' for i in range(20)]
+    with MockNPSServer(parks=parks, latency=latency) as server:
+        def scrape():
+            npsc = NPSCaptaset(
+                min_year=1979,
+                max_year=2021,
+                visitor_base_url=server.base_url,
+                request_delay=0,
+                fetch_mode=fetch_mode
+            )
+            for park in parks:
+                npsc.add_and_populate_park(name=park, park_type='NP')
+            return npsc
+        benchmark.pedantic(scrape, rounds=3, iterations=1)
+        # Every park requires one request for its CSV export, or two for its
+        # HTML report
+        requests_per_park = 1 if fetch_mode == 'csv' else 2
+        benchmark.extra_info['requests_per_second'] = (
+            requests_per_park * len(parks) / benchmark.stats.stats.mean
+        )
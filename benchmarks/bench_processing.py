@@ -0,0 +1,194 @@
+"""Benchmarks for the process_capta transformations."""
+
+from copy import deepcopy
+import os
+
+import numpy as np
+from omegaconf import OmegaConf
+import pandas as pd
+import pytest
+
+from national_parks.processing import Transformation
+from national_parks.utils.dtypes import apply_dtype_policy
+from process_capta import _execute_steps_eagerly, _execute_steps_lazily
+
+from .conftest import REPO_DIR
+
+
+def _run(df, transformations):
+    for name, params in transformations:
+        df = Transformation(name=name, params=params).transform(df)
+    return df
+
+
+# Every transformation configured in steps.yaml is benchmarked on its own,
+# with its input prepared by (unbenchmarked) executions of everything upstream
+_STEPS = OmegaConf.load(
+    os.path.join(REPO_DIR, 'config', 'process_capta', 'steps.yaml')
+)
+_CONFIGURED_TRANSFORMATIONS = [
+    (step_idx, t_idx)
+    for step_idx, step in enumerate(_STEPS)
+    for t_idx in range(len(step.transformations))
+]
+
+
+def _synthetic_weather(source_df):
+    # One row of weather per park and month in which it has visitor capta
+    rng = np.random.default_rng(0)
+    dt_pk = pd.to_datetime(
+        source_df['Year'].to_numpy().repeat(12).astype(str)
+        + '-' + np.tile(np.arange(1, 13), len(source_df)).astype(str)
+    )
+    n_rows = len(dt_pk)
+    return pd.DataFrame({
+        'dt_pk': dt_pk,
+        'park_name': source_df['park_name'].to_numpy().repeat(12),
+        'TAVG': rng.normal(12, 10, n_rows).astype(np.float32),
+        'PRCP': rng.gamma(2, 30, n_rows).astype(np.float32),
+        'SNOW': rng.gamma(0.5, 20, n_rows).astype(np.float32),
+    })
+
+
+_SOURCES = {
+    'nps_monthly_visitors': lambda source_df: source_df,
+    'weather_by_park': _synthetic_weather,
+}
+
+
+def _configured_input(source_df, step_idx, t_idx):
+    artifacts = {}
+
+    def artifact(name):
+        # Source capta are only generated for the steps that read them
+        if name not in artifacts:
+            artifacts[name] = _SOURCES[name](source_df)
+        return artifacts[name]
+
+    for step in _STEPS[:step_idx]:
+        artifacts[step.output] = _run(
+            deepcopy(artifact(step.input)),
+            [(t.name, t.get('params')) for t in step.transformations]
+        )
+    step = _STEPS[step_idx]
+    return _run(
+        deepcopy(artifact(step.input)),
+        [(t.name, t.get('params')) for t in step.transformations[:t_idx]]
+    )
+
+
+@pytest.mark.benchmark(group='configured_transformations')
+@pytest.mark.parametrize(
+    'step_idx,t_idx',
+    _CONFIGURED_TRANSFORMATIONS,
+    ids=[
+        f'{_STEPS[s].name}-{_STEPS[s].transformations[t].name}'
+        for s, t in _CONFIGURED_TRANSFORMATIONS
+    ]
+)
+def bench_configured_transformation(
+        benchmark, source_visitors, step_idx, t_idx
+):
+    df = _configured_input(source_visitors, step_idx, t_idx)
+    t = _STEPS[step_idx].transformations[t_idx]
+    transformation = Transformation(name=t.name, params=t.get('params'))
+    # Steps are executed on copies of their inputs, as in process_capta
+    benchmark(lambda: transformation.transform(deepcopy(df)))
+
+
+_MELT_CHAIN = [
+    ('columns_to_lowercase', None),
+    ('melt', {
+        'id_vars': ['park_name', 'park_type', 'year'],
+        'var_name': 'month',
+        'value_name': 'visitors',
+    }),
+    ('create_dt_pk', {'year_col': 'year', 'month_col': 'month'}),
+]
+
+
+def _melt_chain_by_park(df):
+    tall_df = _run(df, _MELT_CHAIN)
+    return _run(tall_df, [
+        ('pivot', {
+            'index': 'dt_pk', 'columns': 'park_name', 'values': 'visitors'
+        }),
+    ])
+
+
+def _melt_chain_by_park_type(df):
+    tall_df = _run(df, _MELT_CHAIN)
+    return _run(tall_df, [
+        ('sum_by', {'by': ['park_type', 'dt_pk'], 'summands': ['visitors']}),
+        ('pivot', {
+            'index': 'dt_pk', 'columns': 'park_type', 'values': 'visitors'
+        }),
+    ])
+
+
+def _grid_by_park(df):
+    return _run(df, [
+        ('columns_to_lowercase', None),
+        ('pivot_monthly_grid', {'columns': 'park_name'}),
+    ])
+
+
+def _grid_by_park_type(df):
+    return _run(df, [
+        ('columns_to_lowercase', None),
+        ('pivot_monthly_grid', {
+            'columns': 'park_type', 'sum_duplicates': True
+        }),
+    ])
+
+
+@pytest.mark.benchmark(group='visitors_by_park')
+@pytest.mark.parametrize(
+    'func', [_melt_chain_by_park, _grid_by_park], ids=['melt', 'grid']
+)
+def bench_visitors_by_park(benchmark, source_visitors, func):
+    benchmark(lambda: func(source_visitors.copy()))
+
+
+@pytest.mark.benchmark(group='visitors_by_park_type')
+@pytest.mark.parametrize(
+    'func', [_melt_chain_by_park_type, _grid_by_park_type],
+    ids=['melt', 'grid']
+)
+def bench_visitors_by_park_type(benchmark, source_visitors, func):
+    benchmark(lambda: func(source_visitors.copy()))
+
+
+# The engines are compared on the shipped source capta, which are only present
+# once they have been pulled (see `dvc pull`)
+_INPUTS = OmegaConf.load(
+    os.path.join(REPO_DIR, 'config', 'process_capta', 'inputs.yaml')
+)
+for _item in _INPUTS:
+    _item.path = os.path.join(REPO_DIR, _item.path)
+
+
+def _engine_outputs(execute):
+    outputs = {}
+
+    def write(df, output_path):
+        outputs[output_path] = apply_dtype_policy(df)
+
+    execute(_INPUTS, _STEPS, write=write)
+    return outputs
+
+
+@pytest.mark.skipif(
+    not all(os.path.exists(item.path) for item in _INPUTS),
+    reason='Source capta have not been pulled'
+)
+@pytest.mark.benchmark(group='engines')
+def bench_lazy_engine(benchmark):
+    expected = _engine_outputs(_execute_steps_eagerly)
+    outputs = benchmark(_engine_outputs, _execute_steps_lazily)
+    # Both engines must write identical outputs, dtypes included
+    assert outputs.keys() == expected.keys()
+    for output_path, df in outputs.items():
+        pd.testing.assert_frame_equal(
+            df, expected[output_path], check_names=False
+        )
@@ -0,0 +1,73 @@
+"""Benchmarks for rendering plots. Rendering is benchmarked through the
+undecorated plotting functions, since the decorated ones would skip every
+round after the first.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from national_parks.visualization.model_evaluation import plot_forecast
+from national_parks.visualization.time_series import (
+    plot_differenced_time_series, plot_time_series
+)
+
+
+@pytest.mark.benchmark(group='plotting')
+def bench_plot_time_series(benchmark, monthly_series, tmp_path):
+    benchmark(
+        plot_time_series.__wrapped__,
+        monthly_series,
+        rolling_window=12,
+        fp=os.path.join(tmp_path, 'ts.png')
+    )
+
+
+@pytest.mark.benchmark(group='plotting')
+def bench_plot_differenced_time_series(benchmark, monthly_series, tmp_path):
+    diff_ts = (monthly_series - monthly_series.shift(12)).dropna()
+    benchmark(
+        plot_differenced_time_series.__wrapped__,
+        diff_ts,
+        diffs=0,
+        m=12,
+        df_p_value=0.01,
+        fp=os.path.join(tmp_path, 'analysis.png')
+    )
+
+
+@pytest.mark.benchmark(group='plotting')
+def bench_plot_forecast(benchmark, monthly_series, tmp_path):
+    train_ts, test_ts = monthly_series[:-103], monthly_series[-103:]
+    forecast = test_ts.to_numpy() * 1.05
+    forecast_ci = np.column_stack([forecast * 0.9, forecast * 1.1])
+    benchmark(
+        plot_forecast.__wrapped__,
+        train_ts,
+        test_ts,
+        forecast,
+        forecast_ci,
+        train_limit=2,
+        fp=os.path.join(tmp_path, 'forecast.png')
+    )
+
+
+@pytest.mark.benchmark(group='plotting')
+def bench_plot_forecast_unchanged(benchmark, monthly_series, tmp_path):
+    train_ts, test_ts = monthly_series[:-103], monthly_series[-103:]
+    forecast = test_ts.to_numpy() * 1.05
+    forecast_ci = np.column_stack([forecast * 0.9, forecast * 1.1])
+    fp = os.path.join(tmp_path, 'forecast.png')
+    plot_forecast(
+        train_ts, test_ts, forecast, forecast_ci, train_limit=2, fp=fp
+    )
+    benchmark(
+        plot_forecast,
+        train_ts,
+        test_ts,
+        forecast,
+        forecast_ci,
+        train_limit=2,
+        fp=fp
+    )
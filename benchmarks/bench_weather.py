@@ -0,0 +1,22 @@
+"""Benchmarks for joining parks to their nearest weather stations."""
+
+import numpy as np
+import pytest
+
+from national_parks.weather import StationIndex
+
+
+@pytest.mark.benchmark(group='weather_station_index')
+@pytest.mark.parametrize(
+    'n_stations', [10000, 100000], ids=lambda n: f'{n}_stations'
+)
+def bench_nearest_stations(benchmark, n_stations):
+    rng = np.random.default_rng(0)
+    index = StationIndex(
+        np.arange(n_stations),
+        rng.uniform(-60, 75, n_stations),
+        rng.uniform(-180, 180, n_stations),
+    )
+    park_lats = rng.uniform(-60, 75, 10000)
+    park_lons = rng.uniform(-180, 180, 10000)
+    benchmark(index.query, park_lats, park_lons, k=3, max_distance_km=100)
@@ -0,0 +1,68 @@
+"""Shared fixtures for benchmarks."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The driver scripts are run from src/, which is therefore where the
+# national_parks package can be found
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, 'src'))
+
+
+def make_monthly_series(name='YELL', n_years=43, seed=0):
+    """Builds a seasonal, trending, noisy monthly time series resembling the
+    visitor counts of a single park.
+
+    Args:
+        name (str): the name of the series
+        n_years (int): the number of years spanned by the series
+        seed (int): a seed for the random number generator
+
+    Returns:
+        pd.Series: a series indexed by monthly periods
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_years * 12)
+    values = (
+        100000
+        + 500 * t
+        + 50000 * np.sin(2 * np.pi * t / 12)
+        + rng.normal(0, 5000, size=len(t))
+    )
+    index = pd.period_range('1979-01', periods=len(t), freq='M', name='dt_pk')
+    return pd.Series(values, index=index, name=name)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_benchmark_group_stats(config, benchmarks, group_by):
+    """Groups benchmarks by their group and (where present) the scale of their
+    synthetic capta, so that alternative implementations are compared at the
+    same scale.
+    """
+    groups = {}
+    for bench in benchmarks:
+        key = bench['group']
+        scale = (bench['params'] or {}).get('source_visitors')
+        if scale is not None:
+            key += f' {scale}_parks'
+        groups.setdefault(key, []).append(bench)
+    return sorted(groups.items(), key=lambda kv: kv[0] or '')
+
+
+@pytest.fixture(
+    scope='module', params=[10, 400, 10000], ids=lambda n: f'{n}_parks'
+)
+def source_visitors(request):
+    from national_parks.nps import generate_monthly_visitors
+    return generate_monthly_visitors(
+        request.param, park_types=['NHP', 'NHS', 'NM', 'NMEM', 'NP', 'NRA']
+    )
+
+
+@pytest.fixture
+def monthly_series():
+    return make_monthly_series()
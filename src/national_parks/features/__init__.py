@@ -0,0 +1,7 @@
+"""Package to manage exogenous features that are computed once, during the
+process_capta DVC stage, and shared by every model in the train_models stage.
+"""
+
+from .calendar import build_calendar_features
+from .series import add_series_features
+from .store import FeatureStore
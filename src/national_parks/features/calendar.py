@@ -0,0 +1,86 @@
+"""Functionality for computing monthly calendar features."""
+
+from dateutil.relativedelta import MO, SA
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, Holiday, USFederalHolidayCalendar
+)
+from pandas.tseries.offsets import DateOffset
+
+from .store import FeatureStore
+
+
+class NPSFeeFreeCalendar(AbstractHolidayCalendar):
+    """The days on which entrance fees are waived at every national park.
+    The schedule has changed from year to year, so this follows the current
+    schedule from the year in which each day was (approximately) introduced.
+    """
+    rules = [
+        Holiday(
+            'Martin Luther King Jr. Day', month=1, day=1,
+            offset=DateOffset(weekday=MO(3)), start_date='2009-01-01'
+        ),
+        Holiday(
+            'First Day of National Park Week', month=4, day=1,
+            offset=DateOffset(weekday=SA(3)), start_date='2009-01-01'
+        ),
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01'),
+        Holiday(
+            'Great American Outdoors Day', month=8, day=4,
+            start_date='2021-01-01'
+        ),
+        Holiday(
+            'National Park Service Birthday', month=8, day=25,
+            start_date='2009-01-01'
+        ),
+        Holiday(
+            'National Public Lands Day', month=9, day=1,
+            offset=DateOffset(weekday=SA(4)), start_date='2009-01-01'
+        ),
+        Holiday('Veterans Day', month=11, day=11, start_date='2009-01-01'),
+    ]
+
+
+def _count_by_month(dates, months):
+    """Helper function to count the dates falling within each of a regular
+    range of months."""
+    ordinals = (
+        pd.DatetimeIndex(dates).to_period('M').astype('int64').to_numpy()
+        - months[0].ordinal
+    )
+    return np.bincount(ordinals, minlength=len(months))[:len(months)]
+
+
+def build_calendar_features(start, end):
+    """Computes calendar features for every month in a range.
+
+    Args:
+        start (str | pd.Period): the first month (e.g., "1979-01")
+        end (str | pd.Period): the last month
+
+    Returns:
+        FeatureStore: a store with the features "federal_holidays" (the
+            number of observed federal holidays), "weekend_days", and
+            "fee_free_days" (the number of days on which national park
+            entrance fees are waived)
+    """
+    months = pd.period_range(start, end, freq='M', name='dt_pk')
+    first_day = months.start_time.values.astype('datetime64[D]')
+    last_day = months.end_time.values.astype('datetime64[D]')
+    days_in_month = (last_day - first_day).astype(np.int64) + 1
+    weekdays = np.busday_count(first_day, last_day + 1)
+    span = (first_day[0], last_day[-1])
+    features = pd.DataFrame(
+        {
+            'federal_holidays': _count_by_month(
+                USFederalHolidayCalendar().holidays(*span), months
+            ),
+            'weekend_days': days_in_month - weekdays,
+            'fee_free_days': _count_by_month(
+                NPSFeeFreeCalendar().holidays(*span), months
+            ),
+        },
+        index=months
+    )
+    return FeatureStore.from_dataframe(features)
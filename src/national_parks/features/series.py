@@ -0,0 +1,38 @@
+"""Function for adding exogenous variables specific to each series (e.g., each
+park's weather) to a FeatureStore.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import FeatureStore
+
+
+def add_series_features(store, df):
+    """Adds variables specific to each series to a store of features. Each
+    variable is a column named for its series and the variable (e.g.,
+    "YELL_TAVG", as written by pivot_variables), from which the model of
+    series "YELL" reads its own "TAVG". Since a variable must cover every
+    period that its series (or a forecast of it) may span, periods without
+    capta (e.g., gaps in a station's record, or the forecasting horizon) are
+    filled with the variable's mean in the same month of the year.
+
+    Args:
+        store (FeatureStore): a store of features
+        df (pd.DataFrame): variables with a "dt_pk" column and one column per
+            series and variable
+
+    Returns:
+        FeatureStore: a store with the features of store and the variables of
+            df, less any variable left with a month of the year without capta
+    """
+    index = store.index
+    variables = df.drop(columns='dt_pk').set_axis(
+        pd.PeriodIndex(pd.to_datetime(df['dt_pk']), freq=store.freq), axis=0
+    ).astype(np.float64).reindex(index)
+    climatology = variables.groupby(index.month).transform('mean')
+    variables = variables.fillna(climatology).dropna(axis=1, how='any')
+    return FeatureStore.from_dataframe(
+        pd.concat([store.window(store.start, len(store)), variables], axis=1),
+        freq=store.freq
+    )
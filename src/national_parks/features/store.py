@@ -0,0 +1,152 @@
+"""Class for storing exogenous features aligned to a single range of periods.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureStore(object):
+    """A dense (period x feature) array of exogenous features covering one
+    regular range of periods. Since every time series's periods are a
+    contiguous run within that range, the features for any series (and for
+    any train/test split of it) are a slice of rows at a known offset, which
+    is returned as a view rather than a copy.
+
+    Attributes:
+        columns (np.ndarray): the name of each feature
+        values (np.ndarray): a C-contiguous array of shape (n_periods,
+            n_features)
+        start (int): the ordinal of the first period
+        freq (str): the frequency of the periods
+    """
+
+    def __init__(self, columns, values, start, freq='M'):
+        self.columns = np.asarray(columns, dtype=str)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.start = int(start)
+        self.freq = freq
+        self._positions = {c: i for i, c in enumerate(self.columns)}
+        if self.values.shape != (len(self.values), len(self.columns)):
+            raise ValueError('Expected one column of values per feature')
+
+    @classmethod
+    def from_dataframe(cls, df, freq='M'):
+        """Builds a FeatureStore from a DataFrame with one feature per column
+        and a regular, gapless datetime or period index.
+
+        Args:
+            df (pd.DataFrame): a DataFrame of features
+            freq (str): the frequency of df's index
+
+        Returns:
+            FeatureStore
+
+        Raises:
+            ValueError: if df's index is not regular at the given frequency
+        """
+        index = df.index
+        if not isinstance(index, pd.PeriodIndex):
+            index = pd.PeriodIndex(pd.to_datetime(index), freq=freq)
+        ordinals = index.astype('int64').to_numpy()
+        if len(ordinals) > 1 and (np.diff(ordinals) != 1).any():
+            raise ValueError('Index must be regular and sorted')
+        return cls(
+            columns=[str(c) for c in df.columns],
+            values=df.to_numpy(dtype=np.float64),
+            start=ordinals[0],
+            freq=freq
+        )
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, column):
+        return column in self._positions
+
+    @property
+    def index(self):
+        """The periods covered by the store.
+
+        Returns:
+            pd.PeriodIndex
+        """
+        return pd.period_range(
+            start=pd.Period(ordinal=self.start, freq=self.freq),
+            periods=len(self),
+            name='dt_pk'
+        )
+
+    def window(self, start, length, columns=None):
+        """Retrieves the features for a run of periods. The values are a view
+        of the store whenever the requested columns are contiguous within it
+        (e.g., all columns, or any single column).
+
+        Args:
+            start (int | pd.Period): the (ordinal of the) first period
+            length (int): the number of periods
+            columns (list): the features to retrieve, defaulting to all
+
+        Returns:
+            pd.DataFrame: the features, indexed by period
+
+        Raises:
+            KeyError: if a requested feature is not in the store
+            ValueError: if the periods are not all covered by the store
+        """
+        if isinstance(start, pd.Period):
+            start = start.ordinal
+        row = start - self.start
+        if row < 0 or row + length > len(self):
+            raise ValueError('Requested periods are not covered by the store')
+        if columns is None:
+            cols = slice(None)
+            columns = self.columns
+        else:
+            cols = [self._positions[c] for c in columns]
+            # A contiguous, increasing run of columns can still be sliced
+            if len(cols) and cols == list(range(cols[0], cols[-1] + 1)):
+                cols = slice(cols[0], cols[-1] + 1)
+        index = pd.period_range(
+            start=pd.Period(ordinal=start, freq=self.freq),
+            periods=length,
+            name='dt_pk'
+        )
+        return pd.DataFrame(
+            self.values[row:row + length, cols],
+            index=index,
+            columns=list(columns),
+            copy=False
+        )
+
+    def save(self, path):
+        """Writes the store to disk as an uncompressed NumPy archive.
+
+        Args:
+            path (str): the path of the archive, which should end in ".npz"
+        """
+        with open(path, 'wb') as fo:
+            np.savez(
+                fo,
+                columns=self.columns,
+                values=self.values,
+                start=np.array(self.start),
+                freq=np.array(self.freq)
+            )
+
+    @classmethod
+    def load(cls, path):
+        """Reads a store written by save().
+
+        Args:
+            path (str): the path of the archive
+
+        Returns:
+            FeatureStore
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(
+                columns=archive['columns'],
+                values=archive['values'],
+                start=int(archive['start']),
+                freq=str(archive['freq'])
+            )
@@ -2,4 +2,12 @@
 DVC stage.
 """
 
+from ._journal import CompletionJournal, journal_unit
+from ._shards import (
+    assign_series, find_shards, merge_shards, parse_shard, remove_shards,
+    shard_subdir, unshard_subdir
+)
+from ._scheduler import Scheduler
+from ._shared import SharedSeriesStore
+from ._timings import FitTimings
 from .national_parks_model import NationalParksModel
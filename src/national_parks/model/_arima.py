@@ -1,19 +1,45 @@
 """Functionality for training, evaluating, and analyzing an ARIMA model."""
 
+from concurrent.futures import ProcessPoolExecutor
 import joblib
 import logging
 import os
+import time
 
+import numpy as np
 import pandas as pd
 from pmdarima.arima import AutoARIMA
 import statsmodels.api as sm
 
-from ..utils.io import create_model_output_dirs
+from .. import visualization
+from ..utils.io import (
+    create_model_output_dirs, get_model_output_dirs, staged_model_output_dirs
+)
+from ..utils.ragged import RaggedSeries
+from ._cache import ResultCache, code_version, series_fingerprint
+from ._forecasts import forecast_path, write_forecast
+from ._journal import journal_unit
+from ._order_search import parallel_stepwise_search
+from ._shards import unshard_subdir
+from ._shared import SharedSeriesStore
+from ._timings import expected_costs
 from ..visualization.model_evaluation import plot_forecast
 from ..visualization.time_series import (
     plot_differenced_time_series, plot_time_series
 )
 
+# The modules that determine each series's artifacts, whether it's fit by
+# AutoARIMA or a baseline of the cascade, and so whose changes invalidate them
+_ARTIFACT_MODULES = [
+    os.path.join(os.path.dirname(__file__), f'{module}.py')
+    for module in (
+        '_arima', '_baselines', '_cascade', '_forecasts', '_order_search'
+    )
+] + [
+    os.path.join(os.path.dirname(visualization.__file__), f'{module}.py')
+    for module in ('model_evaluation', 'time_series', 'utils')
+]
+
 
 # TODO (WW): consider moving elsewhere long-term, depending on plans
 def _detrend_time_series(ts, alpha=0.05, max_diffs=3):
@@ -51,6 +77,10 @@ def _train_and_evaluate_arima_model(
         max_order=8,
         arima_ci_alpha=0.05,
         plot_train_limit=2,
+        plots=True,
+        search_jobs=1,
+        search_min_length=240,
+        output_paths=None,
 ):
     """Trains and evaluates an ARIMA model for a single time series.
 
@@ -77,27 +107,42 @@ def _train_and_evaluate_arima_model(
             interval should be estimated for the ARIMA model's predictions
         plot_train_limit (int): the number of test-set-length portions of
             the training set to include in the forecast plot
+        plots (bool): whether to write plots to plots/, which may be left to
+            a recipe's report instead
+        search_jobs (int): if greater than one, AutoARIMA's stepwise order
+            search is replaced for long series by one that chooses the same
+            model but fits its candidates on this many worker processes at
+            once (see parallel_stepwise_search())
+        search_min_length (int): the minimum length of a training set for
+            which candidates are fit concurrently
+        output_paths (Tuple[str, str]): optional directories in which to
+            write model and plot artifacts, respectively, in place of those
+            determined by outputs_subdir
 
     Returns:
         None
     """
     # Setup output paths and plot the entire time series alongside a rolling
     # average for post hoc analysis
-    model_output_path, plots_output_path = create_model_output_dirs(
-        name=ts.name, outputs_subdir=outputs_subdir
-    )
-    plot_time_series(
-        ts,
-        rolling_window=12,
-        fp=os.path.join(plots_output_path, f'{ts.name}.png')
+    model_output_path, plots_output_path = (
+        output_paths if output_paths is not None
+        else create_model_output_dirs(
+            name=ts.name, outputs_subdir=outputs_subdir
+        )
     )
+    if plots:
+        plot_time_series(
+            ts,
+            rolling_window=12,
+            fp=os.path.join(plots_output_path, f'{ts.name}.png')
+        )
 
     # Split capta for training and evaluation
     test_cutoff = int(test_size * len(ts)) if test_size < 1 else test_size
     train_ts, test_ts = ts[:-test_cutoff], ts[-test_cutoff:]
     if exog is not None:
-        train_exog = exog.iloc[:, :-test_cutoff]
-        test_exog = exog.iloc[:, -test_cutoff:]
+        train_exog = exog.iloc[:-test_cutoff]
+        test_exog = exog.iloc[-test_cutoff:]
     else:
         train_exog = test_exog = None
 
@@ -108,21 +153,27 @@ def _train_and_evaluate_arima_model(
     diff_ts, diffs, df_p_value = _detrend_time_series(
         diff_ts, alpha=df_alpha, max_diffs=max_diffs
     )
-    plot_differenced_time_series(
-        diff_ts,
-        diffs=diffs,
-        m=m,
-        df_p_value=df_p_value,
-        fp=os.path.join(plots_output_path, f'{ts.name}_analysis.png')
-    )
+    if plots:
+        plot_differenced_time_series(
+            diff_ts,
+            diffs=diffs,
+            m=m,
+            df_p_value=df_p_value,
+            fp=os.path.join(plots_output_path, f'{ts.name}_analysis.png')
+        )
 
     # Fit and evaluate an ARIMA model, writing both the model object and an
     # analytic summary to the models/ directory
     # NB: this uses the original time series rather than the detrended time
     # series analyzed above, since AutoARIMA will determine an appropriate
     # degree of differencing automatically
-    arima_model = AutoARIMA(m=m, max_order=max_order)
-    arima_model.fit(train_ts, X=train_exog)
+    if search_jobs > 1 and len(train_ts) >= search_min_length:
+        arima_model = parallel_stepwise_search(
+            train_ts, X=train_exog, m=m, n_jobs=search_jobs
+        )
+    else:
+        arima_model = AutoARIMA(m=m, max_order=max_order)
+        arima_model.fit(train_ts, X=train_exog)
     arima_model_fn = os.path.join(model_output_path, f'{ts.name}_arima.pkl')
     joblib.dump(arima_model, arima_model_fn)
     arima_summary_fn = os.path.join(
@@ -136,13 +187,197 @@ def _train_and_evaluate_arima_model(
         return_conf_int=True,
         alpha=arima_ci_alpha
     )
-    plot_forecast(
-        train_ts,
+    write_forecast(
+        forecast_path(model_output_path, ts.name),
         test_ts,
         forecast,
-        forecast_ci,
-        train_limit=plot_train_limit,
-        fp=os.path.join(plots_output_path, f'{ts.name}_forecast.png')
+        forecast_ci
+    )
+    if plots:
+        plot_forecast(
+            train_ts,
+            test_ts,
+            forecast,
+            forecast_ci,
+            train_limit=plot_train_limit,
+            fp=os.path.join(plots_output_path, f'{ts.name}_forecast.png')
+        )
+
+
+def _get_exog(ts, ragged, exog_vars, features=None):
+    """Helper function to align exogenous variables to a time series. Features
+    in a FeatureStore are sliced from it by row offset (without copying, for
+    a series without gaps), while any other variables are read from the same
+    RaggedSeries as the series itself. A variable that is specific to each
+    series (e.g., "TAVG") is read from the store's feature for this series
+    (e.g., "YELL_TAVG"), but keeps its own name, so that every series's model
+    names its variables alike.
+
+    Args:
+        ts (pd.Series): a time series indexed by period
+        ragged (RaggedSeries): the collection of time series containing ts
+        exog_vars (list): the names of the exogenous variables
+        features (FeatureStore): an optional store of precomputed features
+
+    Returns:
+        pd.DataFrame: the exogenous variables, indexed like ts, or None if
+            there are no exogenous variables
+    """
+    if not exog_vars:
+        return None
+    feature_columns = {}
+    if features is not None:
+        for v in exog_vars:
+            if v in features:
+                feature_columns[v] = v
+            elif f'{ts.name}_{v}' in features:
+                feature_columns[v] = f'{ts.name}_{v}'
+    feature_vars = list(feature_columns)
+    series_vars = [v for v in exog_vars if v not in feature_columns]
+    exogs = []
+    if feature_vars:
+        # Series with gaps inside their span no longer occupy a contiguous run
+        # of periods, and must be aligned by label instead
+        span = features.window(
+            ts.index[0], ts.index[-1].ordinal - ts.index[0].ordinal + 1,
+            columns=list(feature_columns.values())
+        )
+        span.columns = feature_vars
+        exogs.append(span if len(span) == len(ts) else span.loc[ts.index])
+    if series_vars:
+        exogs.append(
+            pd.concat([ragged[v] for v in series_vars], axis=1).reindex(
+                ts.index
+            )
+        )
+    return exogs[0] if len(exogs) == 1 else pd.concat(exogs, axis=1)
+
+
+def _train_and_evaluate_arima_model_from_ragged(
+        ragged,
+        ts_col,
+        exog_vars,
+        features=None,
+        cache=None,
+        version=None,
+        journal=None,
+        completed_key=None,
+        timings=None,
+        **kwargs
+):
+    """Helper function to slice a single time series (and any exogenous
+    variables) from a RaggedSeries and train and evaluate an ARIMA model for
+    it. The series's artifacts are written to staging directories that only
+    replace its output directories once every artifact has been written.
+
+    Args:
+        ragged (RaggedSeries): a collection of time series
+        ts_col (str): the name of the series to be modeled
+        exog_vars (list): the names of any series or features to be treated as
+            exogenous variables
+        features (FeatureStore): an optional store of precomputed features
+        cache (ResultCache): an optional cache of previously produced
+            artifacts, which are reused if the series's fingerprint is found
+        version (str): the code version included in each fingerprint
+        journal (CompletionJournal): an optional journal in which the
+            series's completion is recorded
+        completed_key (str): the fingerprint with which the series completed
+            in an interrupted run being resumed, if any - if it matches the
+            series's fingerprint and the series's artifacts are in place, the
+            series is skipped
+        timings (FitTimings): an optional record of fit durations, to which
+            the series's is added if it is fit
+        **kwargs: keyword arguments passed to _train_and_evaluate_arima_model()
+
+    Returns:
+        str: "resumed" if the series was skipped, "restored" if its artifacts
+            were restored from the cache, or "fit" otherwise
+    """
+    ts = ragged[ts_col]
+    # Only series with gaps inside their span need to have NaNs removed
+    if ragged.n_missing[ragged.index_of(ts_col)]:
+        ts = ts.dropna()
+    ts_exog = _get_exog(ts, ragged, exog_vars, features=features)
+    outputs_subdir = kwargs.get('outputs_subdir')
+    key = None
+    if cache is not None or journal is not None:
+        # A series's artifacts are the same whether or not it's fit in a
+        # shard (see train_models.py), so its fingerprint is too
+        key = series_fingerprint(
+            ts,
+            ts_exog,
+            {**kwargs, 'outputs_subdir': unshard_subdir(outputs_subdir)},
+            version
+        )
+    if completed_key is not None and completed_key == key and all(
+            os.path.isdir(p)
+            for p in get_model_output_dirs(ts.name, outputs_subdir)
+    ):
+        logging.info(f'Skipping ARIMA for {ts_col} - completed previously')
+        return 'resumed'
+    with staged_model_output_dirs(
+            ts.name, outputs_subdir, reuse_plots=True
+    ) as output_paths:
+        if cache is not None and cache.restore(key, *output_paths):
+            logging.info(f'Restored ARIMA for {ts_col} from cache')
+            status = 'restored'
+        else:
+            logging.info(f'Fitting ARIMA for {ts_col}')
+            start = time.perf_counter()
+            _train_and_evaluate_arima_model(
+                ts, exog=ts_exog, output_paths=output_paths, **kwargs
+            )
+            if timings is not None:
+                timings.record(
+                    journal_unit(ts.name, unshard_subdir(outputs_subdir)),
+                    time.perf_counter() - start
+                )
+            if cache is not None:
+                cache.store(key, *output_paths)
+            status = 'fit'
+    if journal is not None:
+        journal.record(journal_unit(ts.name, outputs_subdir), key)
+    return status
+
+
+# Each worker process attaches to the shared store (and receives any
+# features) once, when it starts
+_WORKER_STORE = None
+_WORKER_FEATURES = None
+
+
+def _attach_worker_store(handle, features=None):
+    global _WORKER_STORE, _WORKER_FEATURES
+    _WORKER_STORE = SharedSeriesStore.attach(handle)
+    _WORKER_FEATURES = features
+
+
+def _train_and_evaluate_shared_arima_model(ts_col, exog_vars, kwargs):
+    return _train_and_evaluate_arima_model_from_ragged(
+        _WORKER_STORE.series,
+        ts_col,
+        exog_vars,
+        features=_WORKER_FEATURES,
+        **kwargs
+    )
+
+
+# Worker processes of a Scheduler are shared by every recipe, and so attach to
+# each recipe's store the first time that they fit one of its series
+_WORKER_STORES = {}
+
+
+def _train_and_evaluate_scheduled_arima_model(
+        handle, ts_col, exog_vars, features, kwargs
+):
+    if handle['path'] not in _WORKER_STORES:
+        _WORKER_STORES[handle['path']] = SharedSeriesStore.attach(handle)
+    return _train_and_evaluate_arima_model_from_ragged(
+        _WORKER_STORES[handle['path']].series,
+        ts_col,
+        exog_vars,
+        features=features,
+        **kwargs
     )
 
 
@@ -158,22 +393,32 @@ def train_and_evaluate_arima_models(
         max_order=8,
         arima_ci_alpha=0.05,
         plot_train_limit=2,
+        plots=True,
+        search_jobs=1,
+        search_min_length=240,
+        n_jobs=1,
+        features=None,
+        cache_dir=None,
+        journal=None,
+        resume=False,
+        timings=None,
+        scheduler=None,
 ):
     """Trains and evaluates an ARIMA model for all indicated time series in a
     DataFrame.
 
     Args:
-        df (pd.DataFrame): a DataFrame with one or more time series and
-            (optionally) exogenous variables
+        df (pd.DataFrame | RaggedSeries): a DataFrame or RaggedSeries with one
+            or more time series and (optionally) exogenous variables
         outputs_subdir (str): optional subdirectory within models/ and plots/
             where output artifacts should be written, if None then all
             artifacts will be written at the top level of the relevant
             directory
-        ts_cols (list): a list of columns to be modeled as the values of a time
-            series, defaults to all columns in df that are not included in
-            exog_vars
-        exog_vars (list): an optional list of columns to be treated as
-            exogenous variables in each model
+        ts_cols (list): a list of columns (or RaggedSeries names) to be modeled
+            as the values of a time series, defaults to all columns in df that
+            are not included in exog_vars
+        exog_vars (list): an optional list of columns (or features in
+            features) to be treated as exogenous variables in each model
         test_size (float | int): if <1 the proportion of each time series to be
             held out as a test set; if an integer the number of steps to be
             held out as a test set
@@ -190,6 +435,36 @@ def train_and_evaluate_arima_models(
             interval should be estimated for the ARIMA model's predictions
         plot_train_limit (int): the number of test-set-length portions of
             the training set to include in the forecast plot
+        plots (bool): whether to write plots to plots/, which may be left to
+            a recipe's report instead
+        search_jobs (int): if greater than one, the order search for each
+            series at least search_min_length periods long fits its
+            candidates on this many worker processes at once (on top of any
+            n_jobs workers fitting series)
+        search_min_length (int): the minimum length of a training set for
+            which candidates are fit concurrently
+        n_jobs (int): the number of worker processes across which to fan out
+            model training - if greater than one, the capta are placed in a
+            SharedSeriesStore to which every worker attaches
+        features (FeatureStore): an optional store of precomputed features
+            covering the periods of every series, from which any exog_vars
+            that it contains are sliced
+        cache_dir (str): an optional directory in which each series's
+            artifacts are cached, keyed on a fingerprint of its capta, these
+            parameters, and the modeling code, so that unchanged series are
+            restored rather than refit
+        journal (CompletionJournal): an optional journal in which each series
+            is recorded (with the same fingerprint) once its artifacts are
+            in place
+        resume (bool): whether to skip series recorded in journal whose
+            fingerprints are unchanged and whose artifacts remain in place,
+            as when resuming an interrupted run
+        timings (FitTimings): an optional record to which the duration of
+            each series's fit is added, and from whose past durations the
+            series are ordered so that the longest fits start first
+        scheduler (Scheduler): an optional pool of worker processes shared
+            with other recipes, to which every series's fit is submitted in
+            place of n_jobs workers of its own
 
     Returns:
         None
@@ -197,33 +472,146 @@ def train_and_evaluate_arima_models(
     # Checks and one-time operations before execution
     if not (0 < test_size < 1 or test_size // 1 == test_size):
         raise ValueError('Improper value of test_size')
+    exog_vars = [v for v in exog_vars] if exog_vars is not None else []
+    # Every series is read from a RaggedSeries, which locates the span of
+    # actual capta for all series in a single pass rather than requiring each
+    # column to be scanned for NaNs
+    ragged = df if isinstance(df, RaggedSeries) else (
+        RaggedSeries.from_dataframe(df)
+    )
     if ts_cols is None:
-        if exog_vars is not None:
-            ts_cols = [c for c in df.columns if c not in exog_vars]
-        else:
-            ts_cols = df.columns.to_list()
-    exog = df[exog_vars] if exog_vars is not None else None
+        ts_cols = [c for c in ragged.names if c not in exog_vars]
+    missing_vars = [
+        v for v in exog_vars
+        if v not in ragged and (features is None or v not in features)
+    ]
+    if missing_vars:
+        raise KeyError(f'Unrecognized exogenous variables {missing_vars}')
+    n_capta = dict(zip(ragged.names, ragged.lengths - ragged.n_missing))
 
     # Build ARIMAs for all indicated time series, provided there are adequate
     # capta (five years is the threshold here, to allow for at least one year
     # of test data under the default settings)
     # TODO (WW): make this configurable in the long term
+    eligible_ts_cols = []
     for ts_col in ts_cols:
-        ts = df[ts_col].dropna()
-        ts_exog = exog[~pd.isna(df[ts_col])] if exog is not None else None
-        if len(ts) < 60:
+        if n_capta[ts_col] < 60:
             logging.info(f'Skipping ARIMA for {ts_col} - too few capta')
             continue
-        logging.info(f'Fitting ARIMA for {ts_col}')
-        _train_and_evaluate_arima_model(
-            ts,
-            outputs_subdir=outputs_subdir,
-            exog=ts_exog,
-            test_size=test_size,
-            m=m,
-            df_alpha=df_alpha,
-            max_diffs=max_diffs,
-            max_order=max_order,
-            arima_ci_alpha=arima_ci_alpha,
-            plot_train_limit=plot_train_limit
+        eligible_ts_cols.append(ts_col)
+    model_kwargs = {
+        'outputs_subdir': outputs_subdir,
+        'test_size': test_size,
+        'm': m,
+        'df_alpha': df_alpha,
+        'max_diffs': max_diffs,
+        'max_order': max_order,
+        'arima_ci_alpha': arima_ci_alpha,
+        'plot_train_limit': plot_train_limit,
+        'plots': plots,
+        'search_jobs': search_jobs,
+        'search_min_length': search_min_length,
+    }
+    cache_kwargs = {}
+    if cache_dir is not None or journal is not None:
+        cache_kwargs = {
+            'cache': ResultCache(cache_dir) if cache_dir is not None else None,
+            'version': code_version(*_ARTIFACT_MODULES),
+            'journal': journal,
+        }
+    completed = journal.completed() if resume and journal is not None else {}
+    # The longest fits (by past durations, or failing those by numbers of
+    # capta) are started first, so that workers aren't left idle while they
+    # finish at the tail of the run
+    if scheduler is not None:
+        costs = scheduler.expected_costs(
+            eligible_ts_cols,
+            [n_capta[c] for c in eligible_ts_cols],
+            outputs_subdir=outputs_subdir
+        )
+    else:
+        costs = expected_costs(
+            [
+                journal_unit(c, unshard_subdir(outputs_subdir))
+                for c in eligible_ts_cols
+            ],
+            [n_capta[c] for c in eligible_ts_cols],
+            timings.history() if timings is not None else {}
+        )
+    order = np.argsort(-costs, kind='stable')
+    eligible_ts_cols = [eligible_ts_cols[i] for i in order]
+    costs = costs[order]
+    if scheduler is not None:
+        with SharedSeriesStore.create(ragged) as store:
+            futures = [
+                scheduler.submit(
+                    cost,
+                    _train_and_evaluate_scheduled_arima_model,
+                    store.handle,
+                    ts_col,
+                    exog_vars,
+                    features,
+                    {
+                        'completed_key': completed.get(
+                            journal_unit(ts_col, outputs_subdir)
+                        ),
+                        'timings': timings,
+                        **cache_kwargs,
+                        **model_kwargs
+                    }
+                )
+                for ts_col, cost in zip(eligible_ts_cols, costs)
+            ]
+            # Surface any exception raised in a worker
+            statuses = [future.result() for future in futures]
+    elif n_jobs == 1:
+        statuses = [
+            _train_and_evaluate_arima_model_from_ragged(
+                ragged,
+                ts_col,
+                exog_vars,
+                features=features,
+                completed_key=completed.get(
+                    journal_unit(ts_col, outputs_subdir)
+                ),
+                timings=timings,
+                **cache_kwargs,
+                **model_kwargs
+            )
+            for ts_col in eligible_ts_cols
+        ]
+    else:
+        with SharedSeriesStore.create(ragged) as store:
+            with ProcessPoolExecutor(
+                    max_workers=n_jobs,
+                    initializer=_attach_worker_store,
+                    initargs=(store.handle, features)
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _train_and_evaluate_shared_arima_model,
+                        ts_col,
+                        exog_vars,
+                        {
+                            'completed_key': completed.get(
+                                journal_unit(ts_col, outputs_subdir)
+                            ),
+                            'timings': timings,
+                            **cache_kwargs,
+                            **model_kwargs
+                        }
+                    )
+                    for ts_col in eligible_ts_cols
+                ]
+                # Surface any exception raised in a worker
+                statuses = [future.result() for future in futures]
+    if resume:
+        logging.info(
+            f'Skipped {statuses.count("resumed")} of {len(statuses)} ARIMAs '
+            f'completed previously'
+        )
+    if cache_dir is not None:
+        logging.info(
+            f'Restored {statuses.count("restored")} of {len(statuses)} ARIMAs '
+            f'from cache'
         )
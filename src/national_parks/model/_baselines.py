@@ -0,0 +1,203 @@
+"""Vectorized baseline forecasts, computed for every series in a collection at
+once. Series are right-aligned in a (period x series) grid, so that each
+series's forecast origin (the row of its first forecast period) may differ
+while every baseline remains a handful of whole-grid NumPy operations.
+"""
+
+import numpy as np
+
+
+def right_aligned_grid(ragged, names):
+    """Lays out series from a RaggedSeries as the columns of a grid, each
+    ending in the grid's last row and preceded by NaN padding. Missing values
+    within a series's span are forward filled.
+
+    Args:
+        ragged (RaggedSeries): a collection of time series
+        names (list): the names of the series to include
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the grid, of shape (max length,
+            len(names)), and the length of each series
+    """
+    positions = np.array([ragged.index_of(n) for n in names], dtype=np.int64)
+    lengths = ragged.lengths[positions]
+    offsets = ragged.offsets[positions]
+    n_rows = int(lengths.max()) if len(lengths) else 0
+    rows = np.arange(n_rows)[:, None]
+    first_rows = n_rows - lengths
+    in_span = rows >= first_rows
+    value_idx = np.clip(offsets + rows - first_rows, 0, len(ragged.values) - 1)
+    grid = np.where(in_span, ragged.values[value_idx], np.nan)
+    if ragged.n_missing[positions].any():
+        grid = forward_fill(grid)
+    return grid, lengths
+
+
+def date_aligned_grid(ragged, names):
+    """Lays out series from a RaggedSeries as the columns of a grid whose rows
+    are consecutive periods, so that each row holds every series's value for
+    the same period. Periods outside a series's span are NaN.
+
+    Args:
+        ragged (RaggedSeries): a collection of time series
+        names (list): the names of the series to include
+
+    Returns:
+        Tuple[np.ndarray, int]: the grid, of shape (periods spanned by any
+            series, len(names)), and the ordinal of its first row's period
+    """
+    positions = np.array([ragged.index_of(n) for n in names], dtype=np.int64)
+    lengths = ragged.lengths[positions]
+    first_period = int(ragged.starts[positions].min())
+    first_rows = ragged.starts[positions] - first_period
+    n_rows = int((first_rows + lengths).max())
+    rows = np.arange(n_rows)[:, None] - first_rows
+    in_span = (rows >= 0) & (rows < lengths)
+    value_idx = np.clip(
+        ragged.offsets[positions] + rows, 0, len(ragged.values) - 1
+    )
+    return np.where(in_span, ragged.values[value_idx], np.nan), first_period
+
+
+def forward_fill(grid):
+    """Forward fills NaNs down the columns of a grid."""
+    rows = np.arange(len(grid))[:, None]
+    last_valid = np.maximum.accumulate(
+        np.where(np.isnan(grid), 0, rows), axis=0
+    )
+    return np.take_along_axis(grid, last_valid, axis=0)
+
+
+def _forecast_rows(grid, origins):
+    """Helper function to locate the forecast rows of every series, returning
+    each row's horizon (0 for the first forecast period) and a mask of the
+    rows that are forecast."""
+    rows = np.arange(len(grid))[:, None]
+    horizons = rows - origins
+    return horizons, horizons >= 0
+
+
+def seasonal_naive(grid, origins, m=12):
+    """Forecasts each period as the value of the same season in the last
+    observed cycle.
+
+    Args:
+        grid (np.ndarray): a right-aligned grid of series
+        origins (np.ndarray): the row of each series's first forecast period
+        m (int): the seasonal period
+
+    Returns:
+        np.ndarray: forecasts for the rows at and after each origin, and NaN
+            elsewhere
+    """
+    horizons, forecast = _forecast_rows(grid, origins)
+    source = np.clip(origins - m + horizons % m, 0, len(grid) - 1)
+    return np.where(
+        forecast, np.take_along_axis(grid, source, axis=0), np.nan
+    )
+
+
+def drift(grid, origins, lengths):
+    """Forecasts by extrapolating the line between each series's first and
+    last observed values.
+
+    Args:
+        grid (np.ndarray): a right-aligned grid of series
+        origins (np.ndarray): the row of each series's first forecast period
+        lengths (np.ndarray): the length of each series
+
+    Returns:
+        np.ndarray: forecasts for the rows at and after each origin, and NaN
+            elsewhere
+    """
+    horizons, forecast = _forecast_rows(grid, origins)
+    cols = np.arange(grid.shape[1])
+    first_rows = len(grid) - lengths
+    first = grid[first_rows, cols]
+    last = grid[origins - 1, cols]
+    slope = (last - first) / np.maximum(origins - 1 - first_rows, 1)
+    return np.where(forecast, last + (horizons + 1) * slope, np.nan)
+
+
+def simple_exponential_smoothing(
+        grid, origins, alphas=(0.1, 0.3, 0.5, 0.7, 0.9)
+):
+    """Forecasts each series's smoothed level, choosing each series's
+    smoothing parameter from a grid by its one-step-ahead squared error. Every
+    series and every smoothing parameter is updated in the same pass over the
+    grid's rows.
+
+    Args:
+        grid (np.ndarray): a right-aligned grid of series
+        origins (np.ndarray): the row of each series's first forecast period
+        alphas (Sequence[float]): candidate smoothing parameters
+
+    Returns:
+        np.ndarray: forecasts for the rows at and after each origin, and NaN
+            elsewhere
+    """
+    alphas = np.asarray(alphas, dtype=np.float64)[:, None]
+    n_cols = grid.shape[1]
+    level = np.full((len(alphas), n_cols), np.nan)
+    sse = np.zeros((len(alphas), n_cols))
+    for r in range(len(grid)):
+        y = grid[r]
+        # Only observations before each series's origin are smoothed
+        observed = ~np.isnan(y) & (r < origins)
+        started = ~np.isnan(level)
+        error = np.where(observed & started, y - level, 0)
+        sse += error ** 2
+        level = np.where(
+            observed,
+            np.where(started, level + alphas * error, y),
+            level
+        )
+    best = sse.argmin(axis=0)
+    final_level = level[best, np.arange(n_cols)]
+    _, forecast = _forecast_rows(grid, origins)
+    return np.where(forecast, final_level, np.nan)
+
+
+def mean_absolute_error(grid, forecasts, origins, horizons):
+    """Computes each series's mean absolute error over a window of rows.
+
+    Args:
+        grid (np.ndarray): a right-aligned grid of series
+        forecasts (np.ndarray): forecasts aligned to grid
+        origins (np.ndarray): the row of each series's first forecast period
+        horizons (np.ndarray): the number of periods evaluated per series
+
+    Returns:
+        np.ndarray: the mean absolute error of each series
+    """
+    rows = np.arange(len(grid))[:, None]
+    errors = np.abs(grid - forecasts)
+    window = (rows >= origins) & (rows < origins + horizons) & ~np.isnan(
+        errors
+    )
+    # Series without any evaluable periods have an undefined error
+    with np.errstate(invalid='ignore'):
+        return np.where(window, errors, 0).sum(axis=0) / window.sum(axis=0)
+
+
+def forecast_baselines(grid, origins, lengths, m=12):
+    """Computes every baseline's forecasts.
+
+    Args:
+        grid (np.ndarray): a right-aligned grid of series
+        origins (np.ndarray): the row of each series's first forecast period
+        lengths (np.ndarray): the length of each series
+        m (int): the seasonal period
+
+    Returns:
+        Dict[str, np.ndarray]: forecasts aligned to grid, keyed on the name
+            of each baseline
+    """
+    return {
+        'seasonal_naive': seasonal_naive(grid, origins, m=m),
+        'drift': drift(grid, origins, lengths),
+        'simple_exponential_smoothing': simple_exponential_smoothing(
+            grid, origins
+        ),
+    }
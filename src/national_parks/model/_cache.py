@@ -0,0 +1,168 @@
+"""Functionality for reusing the artifacts of previously trained models whose
+inputs, parameters, and code are unchanged.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+def code_version(*paths):
+    """Fingerprints source code, along with the versions of the libraries
+    through which models are fit.
+
+    Args:
+        *paths (str): modules that determine the artifacts produced for each
+            series, or directories of such modules
+
+    Returns:
+        str: a hexadecimal digest
+    """
+    # Imported here so that importing this module stays cheap
+    import pmdarima
+    import statsmodels
+
+    digest = hashlib.sha256()
+    digest.update(f'{pmdarima.__version__} {statsmodels.__version__}'.encode())
+    for path in paths:
+        modules = (
+            sorted(glob.glob(os.path.join(path, '*.py')))
+            if os.path.isdir(path) else [path]
+        )
+        for module in modules:
+            with open(module, 'rb') as fi:
+                digest.update(fi.read())
+    return digest.hexdigest()
+
+
+# Params that change how a series is fit but not the model chosen (i.e., the
+# concurrency of the order search, which chooses the same model either way),
+# or only whether plots are drawn (and plots/ persists between runs), are left
+# out of its fingerprint, so that changing them doesn't invalidate the cache
+_UNKEYED_PARAMS = frozenset({'plots', 'search_jobs', 'search_min_length'})
+
+
+def series_fingerprint(ts, exog, params, version):
+    """Fingerprints everything that determines the artifacts produced for a
+    single time series.
+
+    Args:
+        ts (pd.Series): a time series indexed by period
+        exog (pd.DataFrame): the series's exogenous variables, if any
+        params (dict): the keyword arguments with which the series is modeled,
+            of which those that don't affect its artifacts are ignored
+        version (str): the output of code_version()
+
+    Returns:
+        str: a hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    digest.update(version.encode())
+    params = {k: v for k, v in params.items() if k not in _UNKEYED_PARAMS}
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(str(ts.name).encode())
+    digest.update(str(ts.index[0]).encode() if len(ts) else b'')
+    digest.update(np.ascontiguousarray(
+        ts.index.astype('int64').to_numpy()
+    ).tobytes())
+    digest.update(np.ascontiguousarray(ts.to_numpy(np.float64)).tobytes())
+    if exog is not None:
+        digest.update(json.dumps([str(c) for c in exog.columns]).encode())
+        digest.update(
+            np.ascontiguousarray(exog.to_numpy(np.float64)).tobytes()
+        )
+    return digest.hexdigest()
+
+
+def inputs_fingerprint(params, paths, version):
+    """Fingerprints a unit of work by its parameters and the contents of the
+    files from which its inputs are read.
+
+    Args:
+        params (dict): the parameters of the unit of work
+        paths (Sequence[str]): the files from which its inputs are read
+        version (str): the output of code_version()
+
+    Returns:
+        str: a hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    digest.update(version.encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    for path in paths:
+        with open(path, 'rb') as fi:
+            for block in iter(lambda: fi.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """A directory of model and plot artifacts keyed on series fingerprints.
+    Since DVC clears the models/ and plots/ directories before running the
+    train_models stage, the cache is kept elsewhere and its artifacts are
+    copied back into place on a hit.
+
+    Attributes:
+        directory (str): the directory in which artifacts are cached
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def __contains__(self, key):
+        return os.path.isdir(self._entry(key))
+
+    def restore(self, key, model_output_path, plots_output_path):
+        """Copies cached artifacts into a series's output directories.
+
+        Args:
+            key (str): a series fingerprint
+            model_output_path (str): the series's directory within models/
+            plots_output_path (str): the series's directory within plots/
+
+        Returns:
+            bool: whether the series was found in the cache
+        """
+        entry = self._entry(key)
+        if not os.path.isdir(entry):
+            return False
+        # Output directories are replaced rather than copied into, since
+        # their files may be hard links to the artifacts of an earlier run
+        for subdir, output_path in (
+                ('models', model_output_path), ('plots', plots_output_path)
+        ):
+            shutil.rmtree(output_path, ignore_errors=True)
+            shutil.copytree(os.path.join(entry, subdir), output_path)
+        return True
+
+    def store(self, key, model_output_path, plots_output_path):
+        """Copies a series's artifacts into the cache. The entry is assembled
+        in a temporary directory and renamed into place, so that concurrent
+        workers never observe a partial entry.
+
+        Args:
+            key (str): a series fingerprint
+            model_output_path (str): the series's directory within models/
+            plots_output_path (str): the series's directory within plots/
+        """
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        staging = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        for subdir, output_path in (
+                ('models', model_output_path), ('plots', plots_output_path)
+        ):
+            shutil.copytree(output_path, os.path.join(staging, subdir))
+        try:
+            os.rename(staging, entry)
+        # Another worker stored the same series first
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,280 @@
+"""Functionality for a tiered cascade of models, in which cheap baselines are
+fit to every series and AutoARIMA is reserved for those series where it is
+likely to improve on them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import logging
+import os
+import warnings
+
+from hydra.utils import to_absolute_path
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from ..utils.io import staged_model_output_dirs
+from ..utils.ragged import RaggedSeries
+from ._arima import train_and_evaluate_arima_models
+from ._baselines import (
+    forecast_baselines, mean_absolute_error, right_aligned_grid
+)
+from ._forecasts import forecast_path, write_forecast
+from ._journal import journal_unit
+from ._shards import unshard_subdir
+
+
+def _airline_forecast(train, horizon, m=12):
+    """Helper function to forecast a series with the "airline" model, a fixed
+    SARIMA(0,1,1)(0,1,1,m) specification that is cheap to fit and a common
+    stand-in for what a full ARIMA search could achieve.
+
+    Args:
+        train (np.ndarray): the series's training values
+        horizon (int): the number of periods to forecast
+        m (int): the seasonal period
+
+    Returns:
+        np.ndarray: the forecasts, or NaNs if the model could not be fit
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fit = sm.tsa.SARIMAX(
+                train, order=(0, 1, 1), seasonal_order=(0, 1, 1, m)
+            ).fit(disp=False)
+        return np.asarray(fit.forecast(int(horizon)))
+    except (ValueError, np.linalg.LinAlgError):
+        return np.full(horizon, np.nan)
+
+
+def _airline_forecasts(trains, horizons, m=12, n_jobs=1, scheduler=None,
+                       costs=None):
+    """Helper function to forecast several series with the airline model (see
+    _airline_forecast()), fanned out across the same worker processes as the
+    AutoARIMA tier.
+
+    Args:
+        trains (Sequence[np.ndarray]): each series's training values
+        horizons (Sequence[int]): the number of periods to forecast for each
+        m (int): the seasonal period
+        n_jobs (int): the number of worker processes across which to fan out
+            the fits, if no scheduler is given
+        scheduler (Scheduler): an optional pool of worker processes shared
+            across recipes, on which the fits are queued
+        costs (np.ndarray): the expected cost of each series, by which the
+            scheduler orders the fits
+
+    Returns:
+        List[np.ndarray]: each series's forecasts
+    """
+    if scheduler is not None:
+        futures = [
+            scheduler.submit(cost, _airline_forecast, train, horizon, m)
+            for train, horizon, cost in zip(trains, horizons, costs)
+        ]
+        return [future.result() for future in futures]
+    if n_jobs == 1 or len(trains) <= 1:
+        return [
+            _airline_forecast(train, horizon, m=m)
+            for train, horizon in zip(trains, horizons)
+        ]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(
+            _airline_forecast, trains, horizons, itertools.repeat(m)
+        ))
+
+
+def train_and_evaluate_cascade(
+        df,
+        outputs_subdir=None,
+        ts_cols=None,
+        exog_vars=None,
+        test_size=0.2,
+        m=12,
+        min_improvement=0.1,
+        **arima_kwargs
+):
+    """Evaluates a cascade of models for all indicated time series. First,
+    vectorized baselines (seasonal naive, drift, and simple exponential
+    smoothing) are fit to every series at once, and the best is chosen per
+    series on a validation window (the final test-set-length portion of its
+    training set). Then an airline model is fit to the same window for every
+    series with enough capta for an ARIMA; only those series where it beats
+    the best baseline by at least min_improvement go on to a full AutoARIMA
+    search. The tier chosen for every series, and the validation and test
+    errors on which that choice rests, are written to cascade_tiers.csv in
+    models/ (alongside any previous tiers of series outside ts_cols), and the
+    test-set forecasts of series left on the baselines are written alongside
+    those of the AutoARIMA tier.
+
+    Args:
+        df (pd.DataFrame | RaggedSeries): a DataFrame or RaggedSeries with one
+            or more time series and (optionally) exogenous variables
+        outputs_subdir (str): optional subdirectory within models/ and plots/
+            where output artifacts should be written
+        ts_cols (list): a list of columns (or RaggedSeries names) to be
+            modeled, defaulting to all that are not included in exog_vars
+        exog_vars (list): an optional list of columns (or features) to be
+            treated as exogenous variables in each ARIMA
+        test_size (float | int): if <1 the proportion of each time series to be
+            held out as a test set; if an integer the number of steps to be
+            held out as a test set
+        m (int): the seasonal period
+        min_improvement (float): the proportion by which the airline model's
+            validation error must fall below that of the best baseline for a
+            series to be modeled with AutoARIMA
+        **arima_kwargs: keyword arguments passed to
+            train_and_evaluate_arima_models() for the AutoARIMA tier
+
+    Returns:
+        None
+    """
+    if not (0 < test_size < 1 or test_size // 1 == test_size):
+        raise ValueError('Improper value of test_size')
+    exog_vars = [v for v in exog_vars] if exog_vars is not None else []
+    ragged = df if isinstance(df, RaggedSeries) else (
+        RaggedSeries.from_dataframe(df)
+    )
+    explicit_cols = ts_cols is not None
+    if ts_cols is None:
+        ts_cols = [c for c in ragged.names if c not in exog_vars]
+
+    # Each series's test set is its final test_cutoff periods, and its
+    # validation set the test_cutoff periods before that, where test_cutoff is
+    # taken from its number of capta (excluding missing values) just as in
+    # train_and_evaluate_arima_models()
+    grid, lengths = right_aligned_grid(ragged, ts_cols)
+    n_rows = len(grid)
+    n_capta = lengths - ragged.n_missing[
+        [ragged.index_of(c) for c in ts_cols]
+    ]
+    test_cutoffs = (
+        (test_size * n_capta).astype(np.int64) if test_size < 1
+        else np.full(len(lengths), int(test_size))
+    )
+    test_origins = n_rows - test_cutoffs
+    val_origins = test_origins - test_cutoffs
+    # Baselines require at least one full seasonal cycle of training capta
+    evaluable = (val_origins - (n_rows - lengths) >= m) & (test_cutoffs > 0)
+
+    # Fit every baseline to every series in one pass per baseline, and choose
+    # the best for each series on its validation window
+    origins = np.where(evaluable, val_origins, n_rows)
+    val_maes = {
+        name: mean_absolute_error(grid, forecasts, origins, test_cutoffs)
+        for name, forecasts in forecast_baselines(
+            grid, origins, lengths, m=m
+        ).items()
+    }
+    baseline_names = list(val_maes)
+    stacked = np.vstack([val_maes[b] for b in baseline_names])
+    best_idx = np.where(
+        np.isnan(stacked).all(axis=0), 0,
+        np.nanargmin(np.where(np.isnan(stacked), np.inf, stacked), axis=0)
+    )
+    best_val_mae = stacked[best_idx, np.arange(len(ts_cols))]
+    origins = np.where(evaluable, test_origins, n_rows)
+    test_forecasts = forecast_baselines(grid, origins, lengths, m=m)
+    test_maes = {
+        name: mean_absolute_error(grid, forecasts, origins, test_cutoffs)
+        for name, forecasts in test_forecasts.items()
+    }
+
+    # Only series with enough capta for an ARIMA (five years, as in
+    # train_and_evaluate_arima_models()) and with errors left to improve on
+    # are checked with the airline model, on the same workers as the
+    # AutoARIMA tier
+    checked = np.flatnonzero(
+        evaluable & (n_capta >= 60) & (best_val_mae > 0)
+    )
+    scheduler = arima_kwargs.get('scheduler')
+    forecasts = _airline_forecasts(
+        [grid[n_rows - lengths[i]:val_origins[i], i] for i in checked],
+        test_cutoffs[checked],
+        m=m,
+        n_jobs=arima_kwargs.get('n_jobs', 1),
+        scheduler=scheduler,
+        costs=scheduler.expected_costs(
+            [ts_cols[i] for i in checked],
+            n_capta[checked],
+            outputs_subdir=outputs_subdir
+        ) if scheduler is not None else None
+    )
+    airline_val_mae = np.full(len(ts_cols), np.nan)
+    for i, forecast in zip(checked, forecasts):
+        errors = np.abs(grid[val_origins[i]:test_origins[i], i] - forecast)
+        # A model that could not be fit never displaces the baselines
+        if not np.isnan(errors).all():
+            airline_val_mae[i] = np.nanmean(errors)
+
+    use_arima = airline_val_mae < (1 - min_improvement) * best_val_mae
+    tiers = pd.DataFrame({
+        'series': ts_cols,
+        'tier': np.where(
+            use_arima, 'arima', np.where(evaluable, 'baseline', 'skipped')
+        ),
+        'best_baseline': np.where(
+            evaluable, np.asarray(baseline_names)[best_idx], None
+        ),
+        'best_baseline_val_mae': best_val_mae,
+        'airline_val_mae': airline_val_mae,
+        'best_baseline_test_mae': np.vstack(
+            [test_maes[b] for b in baseline_names]
+        )[best_idx, np.arange(len(ts_cols))],
+    })
+    for name in baseline_names:
+        tiers[f'{name}_val_mae'] = val_maes[name]
+    tiers_dir = to_absolute_path(
+        os.path.join('models', outputs_subdir) if outputs_subdir is not None
+        else 'models'
+    )
+    os.makedirs(tiers_dir, exist_ok=True)
+    tiers_path = os.path.join(tiers_dir, 'cascade_tiers.csv')
+    # When only some series are fit (e.g., in a run selecting certain parks),
+    # the tiers of any others are carried over from the previous run
+    written = tiers
+    if explicit_cols and os.path.exists(tiers_path):
+        previous = pd.read_csv(tiers_path)
+        written = pd.concat(
+            [previous[~previous['series'].isin(ts_cols)], tiers],
+            ignore_index=True
+        )
+    written.to_csv(tiers_path, index=False)
+    for tier, count in tiers['tier'].value_counts().items():
+        logging.info(f'Cascade tier {tier}: {count} series')
+
+    # Series left on the baselines keep their best baseline's test-set
+    # forecasts, just as the AutoARIMA tier keeps its models' forecasts
+    for i in np.flatnonzero(evaluable & ~use_arima):
+        with staged_model_output_dirs(
+                ts_cols[i], outputs_subdir=outputs_subdir
+        ) as (model_output_path, _):
+            best_forecasts = test_forecasts[baseline_names[best_idx[i]]]
+            write_forecast(
+                forecast_path(model_output_path, ts_cols[i]),
+                ragged[ts_cols[i]][-test_cutoffs[i]:],
+                best_forecasts[n_rows - test_cutoffs[i]:, i]
+            )
+
+    # Series left on the baselines cost next to nothing to fit, which is
+    # recorded so that later runs don't plan for them as if for AutoARIMA
+    timings = arima_kwargs.get('timings')
+    if timings is not None:
+        for name in tiers.loc[~use_arima, 'series']:
+            timings.record(
+                journal_unit(name, unshard_subdir(outputs_subdir)), 0.0
+            )
+
+    arima_cols = tiers.loc[use_arima, 'series'].tolist()
+    if arima_cols:
+        train_and_evaluate_arima_models(
+            ragged,
+            outputs_subdir=outputs_subdir,
+            ts_cols=arima_cols,
+            exog_vars=exog_vars,
+            test_size=test_size,
+            m=m,
+            **arima_kwargs
+        )
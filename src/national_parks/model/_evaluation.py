@@ -0,0 +1,159 @@
+"""Functionality for evaluating the test-set forecasts of every series in a
+recipe at once, so that recipes can be compared across all of their series
+from a single table rather than one plot at a time.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ..utils.ragged import RaggedSeries
+from ._baselines import date_aligned_grid
+
+
+def stack_forecasts(forecasts):
+    """Lays out test-set forecasts as the columns of grids, each beginning in
+    the grids' first row (i.e., the first forecast period) and followed by
+    NaN padding.
+
+    Args:
+        forecasts (Dict[str, pd.DataFrame]): each series's test-set forecasts,
+            as returned by read_forecast()
+
+    Returns:
+        Tuple[np.ndarray, ...]: grids of the actual capta, forecasts, and
+            lower and upper interval bounds, respectively, plus the ordinal
+            of each series's first forecast period
+    """
+    n_rows = max((len(df) for df in forecasts.values()), default=0)
+    grids = np.full((4, n_rows, len(forecasts)), np.nan)
+    test_starts = np.zeros(len(forecasts), dtype=np.int64)
+    columns = ['actual', 'forecast', 'lower_bound', 'upper_bound']
+    for i, df in enumerate(forecasts.values()):
+        grids[:, :len(df), i] = df[columns].to_numpy(dtype=np.float64).T
+        test_starts[i] = df.index[0].ordinal
+    return (*grids, test_starts)
+
+
+def seasonal_scales(ragged, names, test_starts, m=1):
+    """Computes the in-sample mean absolute error of each series's seasonal
+    naive forecasts, i.e., the scale by which MASE is normalized, over the
+    periods preceding its test set.
+
+    Args:
+        ragged (RaggedSeries): the series themselves
+        names (Sequence[str]): the series for which to compute scales
+        test_starts (np.ndarray): the ordinal of each series's first test
+            period
+        m (int): the seasonal period
+
+    Returns:
+        np.ndarray: each series's scale, NaN for series not in ragged or with
+            fewer than m + 1 periods before their test sets
+    """
+    scales = np.full(len(names), np.nan)
+    found = np.array([n in ragged for n in names], dtype=bool)
+    if not found.any():
+        return scales
+    grid, first_period = date_aligned_grid(
+        ragged, [n for n, f in zip(names, found) if f]
+    )
+    # Only the differences wholly before each series's test set count
+    rows = np.arange(m, len(grid))[:, None]
+    in_sample = rows < (test_starts[found] - first_period)
+    errors = np.abs(grid[m:] - grid[:-m])
+    usable = in_sample & ~np.isnan(errors)
+    counts = usable.sum(axis=0)
+    totals = np.where(usable, errors, 0).sum(axis=0)
+    scales[found] = np.where(
+        counts > 0, totals / np.maximum(counts, 1), np.nan
+    )
+    return scales
+
+
+def evaluate_forecasts(actual, forecast, lower=None, upper=None, scales=None):
+    """Computes error metrics for every series's forecasts in a single pass
+    over grids of forecasts (e.g., from stack_forecasts()), ignoring periods
+    whose actual capta or forecasts are missing.
+
+    Args:
+        actual (np.ndarray): a grid of actual capta, one series per column
+        forecast (np.ndarray): a grid of forecasts, shaped like actual
+        lower (np.ndarray): an optional grid of lower interval bounds
+        upper (np.ndarray): an optional grid of upper interval bounds
+        scales (np.ndarray): an optional scale per series for MASE (see
+            seasonal_scales())
+
+    Returns:
+        Dict[str, np.ndarray]: each series's number of periods evaluated
+            ("n"), "mae", "mape" (over periods with nonzero actual capta),
+            "smape", "mase", and interval "coverage" (over periods with both
+            bounds), NaN where a metric is undefined
+    """
+    observed = ~(np.isnan(actual) | np.isnan(forecast))
+    n = observed.sum(axis=0)
+    abs_errors = np.where(observed, np.abs(forecast - actual), np.nan)
+    abs_actual = np.abs(actual)
+
+    def column_mean(values, mask):
+        counts = mask.sum(axis=0)
+        totals = np.where(mask, values, 0).sum(axis=0)
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae = column_mean(abs_errors, observed)
+        nonzero = observed & (abs_actual > 0)
+        mape = column_mean(abs_errors / abs_actual, nonzero)
+        denominators = abs_actual + np.abs(forecast)
+        smape = column_mean(
+            2 * abs_errors / denominators, observed & (denominators > 0)
+        )
+        mase = (
+            mae / np.where(scales > 0, scales, np.nan)
+            if scales is not None else np.full(len(n), np.nan)
+        )
+    if lower is not None and upper is not None:
+        bounded = observed & ~(np.isnan(lower) | np.isnan(upper))
+        coverage = column_mean(
+            ((actual >= lower) & (actual <= upper)).astype(np.float64),
+            bounded
+        )
+    else:
+        coverage = np.full(len(n), np.nan)
+    return {
+        'n': n,
+        'mae': mae,
+        'mape': mape,
+        'smape': smape,
+        'mase': mase,
+        'coverage': coverage,
+    }
+
+
+def leaderboard(forecasts, history=None, m=1):
+    """Evaluates every series's test-set forecasts.
+
+    Args:
+        forecasts (Dict[str, pd.DataFrame]): each series's test-set forecasts,
+            as returned by read_forecast()
+        history (pd.DataFrame | RaggedSeries): the series themselves, from
+            which MASE is scaled (if None, MASE is left undefined)
+        m (int): the seasonal period by which MASE is scaled
+
+    Returns:
+        pd.DataFrame: a row of metrics (see evaluate_forecasts()) per series,
+            ordered from the most to the least accurate by MASE and then MAE
+    """
+    names = list(forecasts)
+    actual, forecast, lower, upper, test_starts = stack_forecasts(forecasts)
+    scales = None
+    if history is not None and names:
+        ragged = history if isinstance(history, RaggedSeries) else (
+            RaggedSeries.from_dataframe(history)
+        )
+        scales = seasonal_scales(ragged, names, test_starts, m=m)
+    metrics = evaluate_forecasts(
+        actual, forecast, lower=lower, upper=upper, scales=scales
+    )
+    return pd.DataFrame({'series': names, **metrics}).sort_values(
+        ['mase', 'mae'], na_position='last', kind='stable'
+    ).reset_index(drop=True)
@@ -0,0 +1,101 @@
+"""Functionality for persisting the test-set forecasts of individual models,
+so that later recipes (e.g., forecast reconciliation) can build on them
+without refitting.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def forecast_path(model_output_path, name):
+    """Returns the path of a series's forecast file within its directory in
+    models/.
+
+    Args:
+        model_output_path (str): the series's directory within models/
+        name (str): the name of the series
+
+    Returns:
+        str
+    """
+    return os.path.join(model_output_path, f'{name}_forecast.csv')
+
+
+def write_forecast(fp, test_ts, forecast, forecast_ci=None):
+    """Writes a series's test-set forecasts alongside the actual capta.
+
+    Args:
+        fp (str): the path where the forecasts should be written
+        test_ts (pd.Series): the holdout test portion of the series, indexed
+            by period
+        forecast (array-like): the forecasts for the periods of test_ts
+        forecast_ci (array-like): an optional (n, 2) array of lower and upper
+            bounds for the forecasts
+
+    Returns:
+        None
+    """
+    forecast_ci = (
+        np.asarray(forecast_ci) if forecast_ci is not None
+        else np.full((len(test_ts), 2), np.nan)
+    )
+    pd.DataFrame({
+        'dt_pk': test_ts.index.astype(str),
+        'actual': test_ts.to_numpy(),
+        'forecast': np.asarray(forecast),
+        'lower_bound': forecast_ci[:, 0],
+        'upper_bound': forecast_ci[:, 1],
+    }).to_csv(fp, index=False)
+
+
+def read_forecast(fp, freq='M'):
+    """Reads a series's test-set forecasts.
+
+    Args:
+        fp (str): the path of a file written by write_forecast()
+        freq (str): the frequency of the series's periods
+
+    Returns:
+        pd.DataFrame: a DataFrame with columns ['actual', 'forecast',
+            'lower_bound', 'upper_bound'], indexed by period
+    """
+    df = pd.read_csv(fp)
+    df.index = pd.PeriodIndex(df.pop('dt_pk'), freq=freq, name='dt_pk')
+    return df
+
+
+def read_recipe_forecasts(model_output_dir, freq='M'):
+    """Reads every set of test-set forecasts written by a recipe, i.e., those
+    of each series's model and any reconciled forecasts.
+
+    Args:
+        model_output_dir (str): the recipe's directory within models/
+        freq (str): the frequency of the series's periods
+
+    Returns:
+        Dict[str, pd.DataFrame]: the forecasts of each series, as returned by
+            read_forecast(), keyed on the series's name
+    """
+    forecasts = {}
+    if not os.path.isdir(model_output_dir):
+        return forecasts
+    for entry in sorted(os.scandir(model_output_dir), key=lambda e: e.name):
+        fp = forecast_path(entry.path, entry.name)
+        if entry.is_dir() and os.path.exists(fp):
+            forecasts[entry.name] = read_forecast(fp, freq=freq)
+    reconciled_fp = os.path.join(model_output_dir, 'reconciled_forecasts.csv')
+    if os.path.exists(reconciled_fp):
+        reconciled = pd.read_csv(reconciled_fp)
+        for name, df in reconciled.groupby('series', sort=False):
+            forecasts[name] = pd.DataFrame(
+                {
+                    'actual': df['actual'].to_numpy(),
+                    'forecast': df['reconciled_forecast'].to_numpy(),
+                    'lower_bound': np.nan,
+                    'upper_bound': np.nan,
+                },
+                index=pd.PeriodIndex(df['dt_pk'], freq=freq, name='dt_pk')
+            )
+    return forecasts
@@ -0,0 +1,84 @@
+"""Functionality for recording the progress of model training, so that an
+interrupted run can resume where it stopped rather than starting over.
+"""
+
+import json
+import os
+
+
+class CompletionJournal(object):
+    """An append-only file of JSON lines, each recording that a unit of work
+    (e.g., a single series or a whole recipe) completed with a given
+    fingerprint of its inputs. Each entry is appended with a single write to
+    a file opened in append mode, so entries from concurrent workers never
+    interleave, and a line left incomplete by a crash is ignored on reading.
+
+    Attributes:
+        path (str): the path of the journal file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A crash part way through an entry leaves a final line without a
+        # newline, to which the next entry mustn't be appended
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb+') as fo:
+                fo.seek(-1, os.SEEK_END)
+                if fo.read(1) != b'\n':
+                    fo.write(b'\n')
+
+    def reset(self):
+        """Discards every entry, as at the start of a run that isn't resuming
+        an earlier one.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def completed(self):
+        """Reads the journal.
+
+        Returns:
+            Dict[str, str]: the fingerprint with which each unit of work most
+                recently completed, keyed on the unit
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path) as fi:
+            for line in fi:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[entry['unit']] = entry['key']
+        return entries
+
+    def record(self, unit, key):
+        """Durably appends an entry to the journal.
+
+        Args:
+            unit (str): an identifier for the unit of work
+            key (str): a fingerprint of the unit's inputs
+        """
+        line = json.dumps({'unit': unit, 'key': key}) + '\n'
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def journal_unit(name, outputs_subdir=None):
+    """Returns the identifier under which a series's completion is journaled.
+
+    Args:
+        name (str): the name of the series
+        outputs_subdir (str): the series's subdirectory within models/ and
+            plots/, if any
+
+    Returns:
+        str
+    """
+    return f'{outputs_subdir}/{name}' if outputs_subdir is not None else name
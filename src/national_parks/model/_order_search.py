@@ -0,0 +1,305 @@
+"""Functionality for searching for an ARIMA's orders with candidate models fit
+concurrently. The search follows pmdarima's stepwise search (i.e., that of
+AutoARIMA with its default settings) step for step, so that it chooses the
+same model, but fits every candidate that a step may try at once rather than
+one after another.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+import numpy as np
+from pmdarima.arima import ARIMA, AutoARIMA
+from pmdarima.arima.utils import is_constant, ndiffs, nsdiffs
+from pmdarima.utils import diff
+from sklearn.linear_model import LinearRegression
+
+
+# AutoARIMA's defaults, which the search reproduces
+_MAX_P = _MAX_Q = 5
+_MAX_P_SEASONAL = _MAX_Q_SEASONAL = 2
+_MAX_STEPS = 100
+
+# Each worker process receives the series (and any exogenous variables) once,
+# when it starts, rather than with every candidate
+_WORKER_Y = None
+_WORKER_X = None
+
+
+def _attach_worker_capta(y, X):
+    global _WORKER_Y, _WORKER_X
+    _WORKER_Y, _WORKER_X = y, X
+
+
+def _seasonal_order(P, D, Q, m):
+    """Helper function to mirror pmdarima's handling of a null seasonal order
+    for non-seasonal series.
+    """
+    return (0, 0, 0, 0) if m == 1 and P + D + Q == 0 else (P, D, Q, m)
+
+
+def _fit_candidate(order, seasonal_order, with_intercept):
+    """Helper function to fit a single candidate model in a worker process,
+    scored as in AutoARIMA: by AIC, or as infinitely bad if the model can't be
+    fit or has (nearly) non-invertible roots.
+
+    Returns:
+        Tuple[ARIMA, float]: the fitted model (None if it couldn't be fit)
+            and its score
+    """
+    model = ARIMA(
+        order=order,
+        seasonal_order=seasonal_order,
+        suppress_warnings=True,
+        with_intercept=with_intercept
+    )
+    # As in AutoARIMA, any failure to fit (e.g., of statsmodels' optimizer)
+    # merely rules the candidate out
+    try:
+        model.fit(_WORKER_Y, X=_WORKER_X)
+    except Exception:
+        return None, np.inf
+    aic = model.aic()
+    max_inverse_root = 0
+    if order[0] + seasonal_order[0] > 0:
+        max_inverse_root = max(0, *np.abs(1 / model.arroots()))
+    if order[2] + seasonal_order[2] > 0 and np.isfinite(aic):
+        max_inverse_root = max(0, *np.abs(1 / model.maroots()))
+    return model, (np.inf if max_inverse_root > 1 - 1e-2 else aic)
+
+
+def _differencing_orders(y, X, m):
+    """Helper function to choose the orders of seasonal and non-seasonal
+    differencing as AutoARIMA does, from OCSB and KPSS tests of the series
+    (net of any exogenous variables).
+
+    Returns:
+        Tuple[int, int, np.ndarray]: the non-seasonal and seasonal orders of
+            differencing, and the differenced series, net of any exogenous
+            variables
+    """
+    xx = y if X is None else y - LinearRegression().fit(X, y).predict(X)
+    D = 0
+    if m > 1:
+        D = nsdiffs(xx, m=m, test='ocsb', max_D=1)
+        if D > 0 and X is not None and np.apply_along_axis(
+                is_constant, arr=diff(X, differences=D, lag=m), axis=0
+        ).any():
+            D -= 1
+    dx = diff(xx, differences=D, lag=m) if D > 0 else xx
+    diff_x = diff(X, differences=D, lag=m) if X is not None and D > 0 else X
+    d = ndiffs(dx, test='kpss', alpha=0.05, max_d=2)
+    if d > 0 and X is not None and np.apply_along_axis(
+            is_constant, arr=diff(diff_x, differences=d, lag=1), axis=0
+    ).any():
+        d -= 1
+    return d, D, diff(dx, differences=d, lag=1) if d > 0 else dx
+
+
+class _StepwiseSearch(object):
+    """The state of a stepwise search, whose candidate models are fit on a
+    process pool.
+
+    Attributes:
+        fits (dict): the fitted model and score of each candidate that the
+            (sequential) search has tried, keyed on its orders and intercept
+        best (tuple): the key of the best candidate tried so far
+        n_fit (int): the number of candidates fit, including any that the
+            search never tried (i.e., the cost of fitting them concurrently)
+    """
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._pending = {}
+        self.fits = {}
+        self.best = None
+        self.n_fit = 0
+
+    def _submit(self, keys):
+        for key in keys:
+            if key not in self.fits and key not in self._pending:
+                self._pending[key] = self._executor.submit(
+                    _fit_candidate, *key
+                )
+                self.n_fit += 1
+
+    def _cancel(self, key):
+        future = self._pending.get(key)
+        if future is not None and future.cancel():
+            del self._pending[key]
+            self.n_fit -= 1
+
+    def _try(self, key):
+        """Tries a candidate as pmdarima's search would, returning whether it
+        became the best so far. A candidate that has been tried before never
+        does.
+        """
+        if key in self.fits:
+            return False
+        self._submit([key])
+        self.fits[key] = self._pending.pop(key).result()
+        score = self.fits[key][1]
+        if self.fits[key][0] is None or np.isinf(score):
+            return False
+        if self.best is None or score < self.fits[self.best][1]:
+            self.best = key
+            return True
+        return False
+
+    def try_first(self, candidates):
+        """Fits candidates concurrently, then tries them in order, stopping at
+        the first that improves on the best so far. Candidates after it are
+        pruned, i.e., cancelled if they have yet to start.
+
+        Args:
+            candidates (List[Tuple[tuple, object]]): the key of each candidate
+                paired with a value to return if it is the first improvement
+
+        Returns:
+            object: the value paired with the first improvement, or None
+        """
+        self._submit([key for key, _ in candidates])
+        for i, (key, value) in enumerate(candidates):
+            if len(self.fits) >= _MAX_STEPS:
+                break
+            if self._try(key):
+                for later_key, _ in candidates[i + 1:]:
+                    self._cancel(later_key)
+                return value
+        return None
+
+    def finish(self):
+        """Cancels any speculative fits yet to start."""
+        for key in list(self._pending):
+            self._cancel(key)
+
+
+def _neighbors(p, q, P, Q, d, D, m, max_p, max_q, max_P, max_Q, constant):
+    """Helper function to list the candidates that a single step of
+    pmdarima's stepwise search may try from the current orders, in the order
+    it tries them, each paired with the orders (and intercept) it leads to.
+    """
+    moves = [
+        (0, 0, -1, 0), (0, 0, 0, -1), (0, 0, 1, 0), (0, 0, 0, 1),
+        (0, 0, -1, -1), (0, 0, -1, 1), (0, 0, 1, -1), (0, 0, 1, 1),
+        (-1, 0, 0, 0), (0, -1, 0, 0), (1, 0, 0, 0), (0, 1, 0, 0),
+        (-1, -1, 0, 0), (-1, 1, 0, 0), (1, -1, 0, 0), (1, 1, 0, 0),
+    ]
+    candidates = []
+    for dp, dq, dP, dQ in moves:
+        new = (p + dp, q + dq, P + dP, Q + dQ)
+        if not (
+                0 <= new[0] <= max_p and 0 <= new[1] <= max_q
+                and 0 <= new[2] <= max_P and 0 <= new[3] <= max_Q
+        ):
+            continue
+        key = (
+            (new[0], d, new[1]), _seasonal_order(new[2], D, new[3], m),
+            constant
+        )
+        candidates.append((key, (*new, constant)))
+    # Finally, the current orders with the intercept toggled
+    candidates.append((
+        ((p, d, q), _seasonal_order(P, D, Q, m), not constant),
+        (p, q, P, Q, not constant)
+    ))
+    return candidates
+
+
+def parallel_stepwise_search(y, X=None, m=1, n_jobs=2):
+    """Chooses and fits an ARIMA by stepwise search over its orders, choosing
+    the same model as AutoARIMA(m=m) but fitting candidates on a process pool.
+    Each step of the search tries neighboring orders one at a time, moving to
+    the first that improves the AIC; here, all of a step's candidates are fit
+    at once, those after the first improvement are pruned, and every fit is
+    memoized by its orders, so that no candidate is fit twice. Series that
+    AutoARIMA treats as special cases (i.e., constant series) are left to
+    AutoARIMA itself.
+
+    Args:
+        y (pd.Series): the series to be fit
+        X (pd.DataFrame): optional exogenous variables
+        m (int): the seasonal period
+        n_jobs (int): the number of worker processes
+
+    Returns:
+        ARIMA | AutoARIMA: the fitted model, which supports AutoARIMA's
+            predict(), update(), and summary()
+
+    Raises:
+        ValueError: if no candidate model could be fit
+    """
+    y_values = np.asarray(y, dtype=np.float64)
+    X_values = np.asarray(X, dtype=np.float64) if X is not None else None
+    n_samples = len(y_values)
+    if is_constant(y_values):
+        return AutoARIMA(m=m).fit(y, X=X)
+    d, D, dx = _differencing_orders(y_values, X_values, m)
+    if is_constant(dx):
+        return AutoARIMA(m=m).fit(y, X=X)
+
+    # AutoARIMA's bounds and starting orders
+    max_p = int(min(_MAX_P, np.floor(n_samples / 3)))
+    max_q = int(min(_MAX_Q, np.floor(n_samples / 3)))
+    max_P, max_Q = (_MAX_P_SEASONAL, _MAX_Q_SEASONAL) if m > 1 else (0, 0)
+    if m > 1:
+        max_p, max_q = min(max_p, m - 1), min(max_q, m - 1)
+    p, q = min(2, max_p), min(2, max_q)
+    P, Q = min(1, max_P), min(1, max_Q)
+    if n_samples < 10:
+        p, q, P, Q = min(p, 1), min(q, 1), 0, 0
+    constant = (d + D) in (0, 1)
+
+    def key(p, q, P, Q, constant=constant):
+        return (p, d, q), _seasonal_order(P, D, Q, m), constant
+
+    with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_attach_worker_capta,
+            initargs=(y, X)
+    ) as executor:
+        search = _StepwiseSearch(executor)
+        # The initial candidates are each tried regardless of the others, so
+        # all are fit at once
+        _p = 1 if max_p > 0 else 0
+        _P = 1 if (m > 1 and max_P > 0) else 0
+        _q = 1 if max_q > 0 else 0
+        _Q = 1 if (m > 1 and max_Q > 0) else 0
+        initial = [key(p, q, P, Q), key(0, 0, 0, 0)]
+        if max_p > 0 or max_P > 0:
+            initial.append(key(_p, 0, _P, 0))
+        if max_q > 0 or max_Q > 0:
+            initial.append(key(0, _q, 0, _Q))
+        if constant:
+            initial.append(key(0, 0, 0, 0, constant=False))
+        search._submit(initial)
+        search._try(key(p, q, P, Q))
+        if search._try(key(0, 0, 0, 0)):
+            p = q = P = Q = 0
+        if (max_p > 0 or max_P > 0) and search._try(key(_p, 0, _P, 0)):
+            p, P, q, Q = _p, _P, 0, 0
+        if (max_q > 0 or max_Q > 0) and search._try(key(0, _q, 0, _Q)):
+            p, P, q, Q = 0, 0, _q, _Q
+        if constant and search._try(key(0, 0, 0, 0, constant=False)):
+            p = q = P = Q = 0
+
+        while len(search.fits) < _MAX_STEPS:
+            step = search.try_first(_neighbors(
+                p, q, P, Q, d, D, m, max_p, max_q, max_P, max_Q, constant
+            ))
+            if step is None:
+                break
+            p, q, P, Q, constant = step
+        search.finish()
+
+    fitted = [
+        (model, score) for model, score in search.fits.values()
+        if model is not None and np.isfinite(score)
+    ]
+    if not fitted:
+        raise ValueError('Could not fit a viable ARIMA model')
+    logging.info(
+        f'Stepwise search tried {len(search.fits)} candidates '
+        f'({search.n_fit - len(search.fits)} more fit speculatively)'
+    )
+    return min(fitted, key=lambda fit: fit[1])[0]
@@ -0,0 +1,416 @@
+"""Functionality for reconciling forecasts across the park -> park type
+hierarchy, so that each park type's forecasts are coherent with (i.e., the
+sums of) those of its parks rather than the product of a separately fit model.
+"""
+
+import joblib
+import logging
+import os
+
+from hydra.utils import to_absolute_path
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+
+from ..utils.park_names import get_park_type_by_code
+from ..utils.ragged import RaggedSeries
+from ._arima import _get_exog
+from ._baselines import date_aligned_grid, seasonal_naive
+from ._forecasts import forecast_path, read_forecast
+
+
+def summing_matrix(parents):
+    """Builds the sparse matrix that maps bottom-level series onto every
+    series in a two-level hierarchy.
+
+    Args:
+        parents (Sequence[str]): the aggregate series to which each
+            bottom-level series belongs
+
+    Returns:
+        Tuple[sp.csr_matrix, np.ndarray]: the summing matrix, with one row per
+            aggregate series followed by one row per bottom-level series, and
+            the names of the aggregate series in the order of its rows
+    """
+    aggregates, rows = np.unique(
+        np.asarray(parents, dtype=str), return_inverse=True
+    )
+    n_bottom = len(rows)
+    aggregation = sp.csr_matrix(
+        (np.ones(n_bottom), (rows, np.arange(n_bottom))),
+        shape=(len(aggregates), n_bottom)
+    )
+    return sp.vstack(
+        [aggregation, sp.identity(n_bottom, format='csr')], format='csr'
+    ), aggregates
+
+
+def reconcile(base, S, method='bottom_up', variances=None):
+    """Reconciles base forecasts for every series in a hierarchy. Apart from
+    bottom-up reconciliation, which simply sums the bottom-level forecasts,
+    each method is a generalized least squares projection onto the coherent
+    subspace, S (S' W^-1 S)^-1 S' W^-1, with a diagonal W:
+        * ols: identity weights
+        * wls_struct: the number of bottom-level series in each series
+        * mint_diag: each series's forecast error variance (i.e., MinT with
+            the off-diagonal covariances shrunk entirely to zero)
+    A diagonal W keeps S' W^-1 S as sparse as S itself, so the projection is
+    a sparse solve rather than a dense inversion.
+
+    Args:
+        base (np.ndarray): base forecasts of shape (series, periods), in the
+            order of the rows of S
+        S (sp.csr_matrix): a summing matrix from summing_matrix()
+        method (str): one of 'bottom_up', 'ols', 'wls_struct', or 'mint_diag'
+        variances (np.ndarray): each series's forecast error variance,
+            required if method is 'mint_diag'
+
+    Returns:
+        np.ndarray: coherent forecasts, shaped like base
+
+    Raises:
+        NotImplementedError: if the method is not recognized
+        ValueError: if method is 'mint_diag' and variances is None
+    """
+    n_bottom = S.shape[1]
+    if method == 'bottom_up':
+        return S @ base[-n_bottom:]
+    if method == 'ols':
+        weights = np.ones(S.shape[0])
+    elif method == 'wls_struct':
+        weights = np.asarray(S.sum(axis=1), dtype=np.float64).ravel()
+    elif method == 'mint_diag':
+        if variances is None:
+            raise ValueError('mint_diag reconciliation requires variances')
+        # Series without a usable variance (e.g., constant series) are given
+        # the typical variance rather than unbounded weight
+        weights = np.asarray(variances, dtype=np.float64)
+        usable = np.isfinite(weights) & (weights > 0)
+        weights = np.where(
+            usable, weights, np.median(weights[usable]) if usable.any() else 1
+        )
+    else:
+        raise NotImplementedError(
+            f'Unimplemented reconciliation method {method}'
+        )
+    weighted_st = S.T @ sp.diags(1 / weights)
+    bottom = spsolve((weighted_st @ S).tocsc(), weighted_st @ base)
+    return S @ np.asarray(bottom).reshape(n_bottom, -1)
+
+
+def _park_hierarchy(ragged):
+    """Helper function to assign parks to their types (through the same park
+    lists from which the park type capta are built) and to lay out the capta
+    of both levels by period, so that each type's capta are the sums of its
+    parks' (with periods outside a park's span contributing nothing).
+
+    Returns:
+        Tuple[list, np.ndarray, sp.csr_matrix, np.ndarray, np.ndarray, int]:
+            the parks with a recognized type, the types, the summing matrix,
+            grids of the parks' and the types' capta, and the ordinal of the
+            grids' first period, or None if no park has a recognized type
+    """
+    parks, park_types = [], []
+    for park in ragged.names:
+        try:
+            park_types.append(get_park_type_by_code(park))
+            parks.append(park)
+        except KeyError:
+            continue
+    if not parks:
+        return None
+    S, types = summing_matrix(park_types)
+    aggregation = S[:len(types)]
+    grid, first_period = date_aligned_grid(ragged, parks)
+    type_grid = (aggregation @ np.nan_to_num(grid).T).T
+    n_reporting = (aggregation @ (~np.isnan(grid)).T.astype(np.float64)).T
+    type_grid[n_reporting == 0] = np.nan
+    return parks, types, S, grid, type_grid, first_period
+
+
+def hierarchy_history(df):
+    """Builds the capta of every series in the park -> park type hierarchy
+    from those of the parks, against which reconciled forecasts of both
+    levels can be evaluated (e.g., so that MASE can be scaled for park types).
+
+    Args:
+        df (pd.DataFrame | RaggedSeries): the park-level time series, named by
+            park code
+
+    Returns:
+        RaggedSeries: the park types' time series followed by those of the
+            parks with a recognized type (or df itself, if there are none)
+    """
+    ragged = df if isinstance(df, RaggedSeries) else (
+        RaggedSeries.from_dataframe(df)
+    )
+    hierarchy = _park_hierarchy(ragged)
+    if hierarchy is None:
+        return ragged
+    parks, types, _, grid, type_grid, first_period = hierarchy
+    return RaggedSeries.from_dataframe(
+        pd.DataFrame(
+            np.hstack([type_grid, grid]),
+            index=pd.period_range(
+                start=pd.Period(ordinal=first_period, freq=ragged.freq),
+                periods=len(grid),
+                name='dt_pk'
+            ),
+            columns=np.concatenate([types, parks])
+        ),
+        freq=ragged.freq
+    )
+
+
+def _residual_variance(arima_model):
+    """Helper function to estimate an ARIMA's forecast error variance from its
+    in-sample residuals, less those of the periods consumed by differencing
+    (which reflect the model's initialization rather than its fit).
+    """
+    _, d, _ = arima_model.order
+    _, seasonal_d, _, s = arima_model.seasonal_order
+    resid = np.asarray(arima_model.resid())[d + seasonal_d * s:]
+    resid = resid[np.isfinite(resid)]
+    return np.mean(resid ** 2) if len(resid) else np.nan
+
+
+def _park_model_forecasts(
+        ragged,
+        parks,
+        base_subdir,
+        exog_vars,
+        features,
+        first_period,
+        n_rows,
+        origin
+):
+    """Helper function to forecast the rows of a date-aligned grid at and
+    after origin with the model written for each park. Since each ARIMA was
+    trained on its own series's training set, it is first brought up to date
+    (with its fitted parameters held fixed) on the capta observed between the
+    end of that training set and origin, so that every park is forecast from
+    the same origin. Parks that a cascade left on its baselines have no ARIMA,
+    and keep the test-set forecasts of their best baseline wherever those
+    were made from origin or earlier.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: a grid of forecasts, NaN
+            wherever a park has no model or its model cannot forecast from
+            origin without having seen capta from the forecast periods; the
+            forecast error variance of each park's ARIMA (see
+            _residual_variance()), NaN wherever the park has no ARIMA
+            forecasts; and the source of each park's forecasts ('arima',
+            'baseline', or None)
+    """
+    forecasts = np.full((n_rows, len(parks)), np.nan)
+    variances = np.full(len(parks), np.nan)
+    sources = np.full(len(parks), None, dtype=object)
+    horizon = n_rows - origin
+    for i, park in enumerate(parks):
+        model_output_path = to_absolute_path(
+            os.path.join('models', base_subdir, park)
+            if base_subdir is not None else os.path.join('models', park)
+        )
+        model_fp = os.path.join(model_output_path, f'{park}_arima.pkl')
+        fp = forecast_path(model_output_path, park)
+        if not os.path.exists(fp):
+            continue
+        written = read_forecast(fp, freq=ragged.freq)
+        # The first test-set period follows the last training period
+        train_end = written.index[0].ordinal
+        n_update = first_period + origin - train_end
+        if n_update < 0:
+            continue
+        if not os.path.exists(model_fp):
+            baseline = written['forecast'].reindex(pd.period_range(
+                start=pd.Period(
+                    ordinal=first_period + origin, freq=ragged.freq
+                ),
+                periods=horizon,
+                name='dt_pk'
+            ))
+            if not baseline.isna().any():
+                forecasts[origin:, i] = baseline.to_numpy()
+                sources[i] = 'baseline'
+            continue
+        ts = ragged[park].reindex(pd.period_range(
+            start=pd.Period(ordinal=train_end, freq=ragged.freq),
+            periods=n_update + horizon,
+            name='dt_pk'
+        ))
+        if ts.iloc[:n_update].isna().any():
+            continue
+        exog = _get_exog(ts, ragged, exog_vars, features=features)
+        arima_model = joblib.load(model_fp)
+        try:
+            if n_update:
+                arima_model.update(
+                    ts.iloc[:n_update],
+                    X=exog.iloc[:n_update] if exog is not None else None,
+                    maxiter=0
+                )
+            forecasts[origin:, i] = np.asarray(arima_model.predict(
+                n_periods=horizon,
+                X=exog.iloc[n_update:] if exog is not None else None
+            ))
+        # A model that cannot forecast leaves its park to seasonal naive
+        # forecasts, just as a failed airline check leaves a cascade's series
+        # on its baselines
+        except Exception as e:
+            logging.info(
+                f'Unable to forecast {park} from its ARIMA, falling back to '
+                f'seasonal naive forecasts: {e}'
+            )
+            forecasts[origin:, i] = np.nan
+            continue
+        variances[i] = _residual_variance(arima_model)
+        sources[i] = 'arima'
+    return forecasts, variances, sources
+
+
+def train_and_evaluate_reconciled(
+        df,
+        outputs_subdir=None,
+        base_subdir=None,
+        exog_vars=None,
+        method='mint_diag',
+        horizon=12,
+        m=12,
+        features=None,
+):
+    """Produces coherent park type forecasts from park-level models. Each
+    park's base forecasts for the final horizon periods come from the model
+    written by a previous recipe (in base_subdir), whether an ARIMA or the
+    best baseline of a cascade, falling back to seasonal naive forecasts for
+    parks without either, while each park type's base forecasts are seasonal
+    naive forecasts of its summed capta. The parks are mapped onto their
+    types through a sparse summing matrix, the base forecasts are reconciled,
+    and the result is written to reconciled_forecasts.csv (with the error of
+    every series's base and reconciled forecasts in
+    reconciliation_summary.csv) in models/.
+
+    Args:
+        df (pd.DataFrame | RaggedSeries): the park-level time series, named by
+            park code
+        outputs_subdir (str): optional subdirectory within models/ where
+            output artifacts should be written
+        base_subdir (str): the subdirectory within models/ where the
+            park-level models were written
+        exog_vars (list): the exogenous variables with which the park-level
+            models were fit
+        method (str): a reconciliation method (see reconcile())
+        horizon (int): the number of final periods to be reconciled, which
+            should fall within the park-level models' test sets
+        m (int): the seasonal period
+        features (FeatureStore): an optional store of precomputed features
+            from which any exog_vars that it contains are sliced
+
+    Returns:
+        None
+    """
+    ragged = df if isinstance(df, RaggedSeries) else (
+        RaggedSeries.from_dataframe(df)
+    )
+    hierarchy = _park_hierarchy(ragged)
+    if hierarchy is None:
+        return
+    parks, types, S, grid, type_grid, first_period = hierarchy
+    if len(parks) < len(ragged.names):
+        logging.info(
+            f'Excluding {len(ragged.names) - len(parks)} parks without a '
+            f'recognized type from reconciliation'
+        )
+    n_rows = len(grid)
+    origin = n_rows - horizon
+    if origin < m:
+        raise ValueError('Insufficient capta for the indicated horizon')
+
+    # Base forecasts, falling back to seasonal naive forecasts wherever the
+    # park-level models left none
+    park_forecasts, park_variances, sources = _park_model_forecasts(
+        ragged,
+        parks,
+        base_subdir,
+        [v for v in exog_vars] if exog_vars is not None else [],
+        features,
+        first_period,
+        n_rows,
+        origin
+    )
+    sources = pd.Series(sources).fillna('seasonal_naive')
+    for source, count in sources.value_counts().items():
+        logging.info(f'Reconciliation base forecasts {source}: {count} parks')
+    origins = np.full(len(parks), origin)
+    park_forecasts = np.where(
+        np.isnan(park_forecasts),
+        seasonal_naive(grid, origins, m=m),
+        park_forecasts
+    )
+    type_forecasts = seasonal_naive(
+        type_grid, np.full(len(types), origin), m=m
+    )
+    base = np.nan_to_num(
+        np.hstack([type_forecasts, park_forecasts])[origin:].T
+    )
+
+    # Forecast error variances are estimated from the in-sample errors of
+    # each series's base forecasts: the residuals of a park's ARIMA where it
+    # was forecast by one, and otherwise the errors of seasonal naive
+    # forecasts of the series's capta before origin
+    actual = np.hstack([type_grid, grid])
+    errors = actual[m:origin] - actual[:origin - m]
+    observed = ~np.isnan(errors)
+    with np.errstate(invalid='ignore'):
+        variances = (
+            np.where(observed, errors, 0) ** 2
+        ).sum(axis=0) / observed.sum(axis=0)
+    variances[len(types):] = np.where(
+        np.isnan(park_variances), variances[len(types):], park_variances
+    )
+    reconciled = reconcile(base, S, method=method, variances=variances)
+
+    names = np.concatenate([types, parks])
+    levels = np.repeat(['park_type', 'park'], [len(types), len(parks)])
+    periods = pd.period_range(
+        start=pd.Period(ordinal=first_period + origin, freq=ragged.freq),
+        periods=horizon,
+        name='dt_pk'
+    )
+    forecasts = pd.DataFrame({
+        'series': np.repeat(names, horizon),
+        'level': np.repeat(levels, horizon),
+        'dt_pk': np.tile(periods.astype(str), len(names)),
+        'actual': actual[origin:].T.ravel(),
+        'base_forecast': base.ravel(),
+        'reconciled_forecast': reconciled.ravel(),
+    })
+    forecasts['base_error'] = (
+        forecasts['base_forecast'] - forecasts['actual']
+    ).abs()
+    forecasts['reconciled_error'] = (
+        forecasts['reconciled_forecast'] - forecasts['actual']
+    ).abs()
+    summary = forecasts.groupby(['series', 'level'], sort=False)[
+        ['base_error', 'reconciled_error']
+    ].mean().rename(columns={
+        'base_error': 'base_mae', 'reconciled_error': 'reconciled_mae'
+    }).reset_index()
+
+    output_dir = to_absolute_path(
+        os.path.join('models', outputs_subdir) if outputs_subdir is not None
+        else 'models'
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    forecasts.drop(columns=['base_error', 'reconciled_error']).to_csv(
+        os.path.join(output_dir, 'reconciled_forecasts.csv'), index=False
+    )
+    summary.to_csv(
+        os.path.join(output_dir, 'reconciliation_summary.csv'), index=False
+    )
+    type_summary = summary[summary['level'] == 'park_type']
+    logging.info(
+        f'Reconciled {len(types)} park types ({method}): mean MAE '
+        f'{type_summary["base_mae"].mean():,.0f} before, '
+        f'{type_summary["reconciled_mae"].mean():,.0f} after'
+    )
@@ -0,0 +1,200 @@
+"""Functionality for scheduling the work of a train_models run, longest first,
+across a fixed number of worker processes shared by every recipe.
+"""
+
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+import functools
+import heapq
+import itertools
+import threading
+
+from ._journal import journal_unit
+from ._shards import unshard_subdir
+from ._timings import expected_costs
+
+
+class Scheduler(object):
+    """A fixed pool of worker processes shared by every recipe in a run. Work
+    submitted to it (i.e., the fit of a single series) waits in one queue
+    ordered by expected cost, and is dispatched longest first as workers come
+    free, so that the longest fits of every recipe start early rather than
+    leaving workers idle at the tail of a run. Recipes themselves are run
+    concurrently (see run_recipes()), sharing their loaded inputs.
+
+    Attributes:
+        workers (int): the number of worker processes
+        history (Dict[str, float]): past fit durations, keyed on journal_unit()
+    """
+
+    def __init__(self, workers, history=None):
+        self.workers = workers
+        self.history = history if history is not None else {}
+        self._executor = None
+        self._dispatcher = None
+        self._queue = []
+        self._counter = itertools.count()
+        self._in_flight = 0
+        self._closed = False
+        self._abandoned = False
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel_queued()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown()
+        return False
+
+    def expected_costs(self, names, lengths, outputs_subdir=None):
+        """Estimates the cost of fitting each of a recipe's series from past
+        runs (see national_parks.model._timings.expected_costs()).
+
+        Args:
+            names (Sequence[str]): the names of the series
+            lengths (Sequence[int]): the number of capta in each series
+            outputs_subdir (str): the recipe's outputs_subdir, if any
+
+        Returns:
+            np.ndarray: each series's expected cost
+        """
+        outputs_subdir = unshard_subdir(outputs_subdir)
+        return expected_costs(
+            [journal_unit(name, outputs_subdir) for name in names],
+            lengths,
+            self.history
+        )
+
+    def submit(self, cost, fn, *args):
+        """Queues a call to be made on a worker process once every call of a
+        greater expected cost has started.
+
+        Args:
+            cost (float): the expected cost of the call
+            fn (Callable): a picklable function
+            *args: picklable arguments passed to fn
+
+        Returns:
+            concurrent.futures.Future: the result of the call
+        """
+        future = Future()
+        with self._condition:
+            if self._abandoned:
+                future.cancel()
+                return future
+            heapq.heappush(
+                self._queue, (-cost, next(self._counter), future, fn, args)
+            )
+            self._condition.notify_all()
+        return future
+
+    def cancel_queued(self, abandon=False):
+        """Cancels every call that has yet to start.
+
+        Args:
+            abandon (bool): whether calls submitted later should be cancelled
+                as well (e.g., once a recipe has failed and the run will be
+                abandoned)
+        """
+        with self._condition:
+            self._abandoned = self._abandoned or abandon
+            queue, self._queue = self._queue, []
+        for _, _, future, _, _ in queue:
+            future.cancel()
+
+    def _dispatch(self):
+        """Passes queued calls to the worker processes, most costly first,
+        keeping no more in flight than there are workers.
+        """
+        while True:
+            with self._condition:
+                while not self._closed and (
+                        not self._queue or self._in_flight >= self.workers
+                ):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                _, _, future, fn, args = heapq.heappop(self._queue)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._in_flight += 1
+            self._executor.submit(fn, *args).add_done_callback(
+                functools.partial(self._complete, future)
+            )
+
+    def _complete(self, future, call):
+        """Frees a worker and passes the result of a call on to its future."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+        if call.cancelled():
+            future.cancel()
+        elif call.exception() is not None:
+            future.set_exception(call.exception())
+        else:
+            future.set_result(call.result())
+
+    def run_recipes(self, recipes, build, dependencies, costs):
+        """Builds recipes concurrently, each once every recipe on which it
+        depends has been built, starting the most costly of those ready first.
+        A recipe is passed whether any of its dependencies was rebuilt, since
+        it must then be rebuilt too.
+
+        Args:
+            recipes (Sequence[str]): the names of the recipes
+            build (Callable[[str, bool], bool]): a function that builds a
+                recipe, given whether any of its dependencies was rebuilt,
+                and returns whether the recipe was rebuilt
+            dependencies (Dict[str, Set[str]]): the recipes on which each
+                recipe depends
+            costs (Dict[str, float]): each recipe's expected cost
+
+        Returns:
+            Dict[str, bool]: whether each recipe was rebuilt
+
+        Raises:
+            ValueError: if the recipes' dependencies are circular
+        """
+        rebuilt = {}
+        pending = list(recipes)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1)) as threads:
+            try:
+                while pending or running:
+                    ready = sorted(
+                        [
+                            r for r in pending
+                            if dependencies[r].issubset(rebuilt)
+                        ],
+                        key=lambda r: -costs[r]
+                    )
+                    for recipe in ready:
+                        pending.remove(recipe)
+                        running[threads.submit(
+                            build,
+                            recipe,
+                            any(rebuilt[d] for d in dependencies[recipe])
+                        )] = recipe
+                    if not running:
+                        raise ValueError(
+                            f'Circular dependencies among recipes {pending}'
+                        )
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rebuilt[running.pop(future)] = future.result()
+            except BaseException:
+                # Recipes still running are left to fail fast rather than
+                # fitting series whose results would be abandoned
+                self.cancel_queued(abandon=True)
+                raise
+        return rebuilt
@@ -0,0 +1,224 @@
+"""Functionality for splitting a train_models run across several machines,
+each of which fits its own shard of the series and writes its artifacts to
+its own shard of models/ and plots/, to be merged into place afterwards.
+"""
+
+import os
+import re
+import shutil
+
+from hydra.utils import to_absolute_path
+import numpy as np
+import pandas as pd
+
+from ._journal import journal_unit
+from ._timings import expected_costs
+
+
+# Shards' artifacts are kept apart from the merged layout in this
+# subdirectory of models/ and plots/
+SHARDS_SUBDIR = '_shards'
+
+
+def parse_shard(spec):
+    """Parses a shard specification.
+
+    Args:
+        spec (str): a specification of the form "i/N", for the ith (counting
+            from zero) of N shards
+
+    Returns:
+        Tuple[int, int]: the shard's index and the number of shards
+
+    Raises:
+        ValueError: if the specification is malformed
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', str(spec))
+    if match is None or not int(match[1]) < int(match[2]):
+        raise ValueError(f'Invalid shard {spec}, expected e.g. "0/4"')
+    return int(match[1]), int(match[2])
+
+
+def shard_subdir(outputs_subdir, shard):
+    """Returns the subdirectory of models/ and plots/ in which a shard writes
+    the artifacts for a recipe's outputs_subdir.
+
+    Args:
+        outputs_subdir (str): the recipe's outputs_subdir, if any
+        shard (Tuple[int, int]): the shard's index and the number of shards
+
+    Returns:
+        str
+    """
+    return os.path.join(
+        SHARDS_SUBDIR, f'{shard[0]}-of-{shard[1]}', outputs_subdir or ''
+    ).rstrip(os.sep)
+
+
+def unshard_subdir(outputs_subdir):
+    """Inverts shard_subdir(), so that a series is identified the same way
+    whether or not it was fit in a shard.
+
+    Args:
+        outputs_subdir (str): a subdirectory of models/ and plots/, if any
+
+    Returns:
+        str: outputs_subdir without any shard prefix, or None if nothing is
+            left of it
+    """
+    if outputs_subdir is None:
+        return None
+    parts = outputs_subdir.split(os.sep)
+    if len(parts) >= 2 and parts[0] == SHARDS_SUBDIR:
+        return os.sep.join(parts[2:]) or None
+    return outputs_subdir
+
+
+def partition(costs, n_shards):
+    """Deterministically assigns units of work to shards so as to balance
+    their total expected costs, by placing each unit (from the most to the
+    least costly) on the shard with the least work so far.
+
+    Args:
+        costs (Dict[str, float]): the expected cost of each unit of work
+        n_shards (int): the number of shards
+
+    Returns:
+        Dict[str, int]: the shard to which each unit is assigned
+    """
+    loads = np.zeros(n_shards)
+    assignments = {}
+    for unit in sorted(costs, key=lambda u: (-costs[u], u)):
+        shard = int(np.argmin(loads))
+        assignments[unit] = shard
+        loads[shard] += costs[unit]
+    return assignments
+
+
+def assign_series(recipes, shard, history):
+    """Deterministically assigns the series of every recipe to shards, so as
+    to balance the shards' expected costs of fitting (see expected_costs()),
+    and returns those assigned to a given shard. Every shard that plans from
+    the same history and capta makes the same assignments.
+
+    Args:
+        recipes (Dict[str, Tuple[str, Sequence[str], Sequence[int]]]): each
+            recipe's outputs_subdir, series, and series lengths, keyed on the
+            recipe's name
+        shard (Tuple[int, int]): the shard's index and the number of shards
+        history (Dict[str, float]): past fit durations, keyed on journal_unit()
+
+    Returns:
+        Dict[str, List[str]]: each recipe's series assigned to the shard, in
+            their original order
+    """
+    costs = {}
+    for recipe_name, (outputs_subdir, names, lengths) in recipes.items():
+        units = [journal_unit(name, outputs_subdir) for name in names]
+        for name, cost in zip(names, expected_costs(units, lengths, history)):
+            costs[f'{recipe_name}:{name}'] = cost
+    assignments = partition(costs, shard[1])
+    return {
+        recipe_name: [
+            name for name in names
+            if assignments[f'{recipe_name}:{name}'] == shard[0]
+        ]
+        for recipe_name, (_, names, _) in recipes.items()
+    }
+
+
+def find_shards():
+    """Finds the shards whose artifacts await merging.
+
+    Returns:
+        int: the number of shards, or 0 if there are none
+
+    Raises:
+        ValueError: if the shards are of differing runs or any are missing
+    """
+    shards = set()
+    for root in ('models', 'plots'):
+        shards_dir = to_absolute_path(os.path.join(root, SHARDS_SUBDIR))
+        if os.path.isdir(shards_dir):
+            shards.update(
+                tuple(int(x) for x in entry.split('-of-'))
+                for entry in os.listdir(shards_dir)
+                if re.fullmatch(r'\d+-of-\d+', entry)
+            )
+    if not shards:
+        return 0
+    n_shards = {n for _, n in shards}
+    if len(n_shards) > 1:
+        raise ValueError(f'Found shards of differing runs: {sorted(shards)}')
+    n_shards = n_shards.pop()
+    missing = sorted(set(range(n_shards)) - {i for i, _ in shards})
+    if missing:
+        raise ValueError(f'Missing shards {missing} of {n_shards}')
+    return n_shards
+
+
+def merge_shards(outputs_subdir, n_shards, other_subdirs=()):
+    """Moves every shard's artifacts for a recipe into the recipe's
+    subdirectories of models/ and plots/. Each series's directory replaces any
+    previous one, while recipe-level CSVs (e.g., cascade_tiers.csv) are
+    concatenated across shards and abandoned staging directories are removed.
+
+    Args:
+        outputs_subdir (str): the recipe's outputs_subdir, if any
+        n_shards (int): the number of shards
+        other_subdirs (Sequence[str]): other recipes' outputs_subdirs, which
+            share the top level of each shard with a recipe that has none
+
+    Returns:
+        int: the number of series directories merged
+    """
+    n_merged = 0
+    for root in ('models', 'plots'):
+        output_dir = to_absolute_path(
+            os.path.join(root, outputs_subdir or '')
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        tables = {}
+        for i in range(n_shards):
+            shard_dir = to_absolute_path(os.path.join(
+                root, shard_subdir(outputs_subdir, (i, n_shards))
+            ))
+            if not os.path.isdir(shard_dir):
+                continue
+            for entry in sorted(os.scandir(shard_dir), key=lambda e: e.name):
+                # Staging directories left by an interrupted shard (see
+                # staged_model_output_dirs()) hold no finished series
+                if entry.name.startswith('.partial-'):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                if outputs_subdir is None and any(
+                        entry.name == subdir.split(os.sep)[0]
+                        for subdir in other_subdirs if subdir
+                ):
+                    continue
+                destination = os.path.join(output_dir, entry.name)
+                if entry.is_dir():
+                    if os.path.isdir(destination):
+                        shutil.rmtree(destination)
+                    os.replace(entry.path, destination)
+                    n_merged += root == 'models'
+                elif entry.name.endswith('.csv'):
+                    tables.setdefault(entry.name, []).append(
+                        pd.read_csv(entry.path)
+                    )
+                else:
+                    os.replace(entry.path, destination)
+        for name, dfs in tables.items():
+            pd.concat(dfs, ignore_index=True).to_csv(
+                os.path.join(output_dir, name), index=False
+            )
+    return n_merged
+
+
+def remove_shards():
+    """Removes the (merged) shards' directories from models/ and plots/."""
+    for root in ('models', 'plots'):
+        shutil.rmtree(
+            to_absolute_path(os.path.join(root, SHARDS_SUBDIR)),
+            ignore_errors=True
+        )
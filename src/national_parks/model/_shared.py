@@ -0,0 +1,111 @@
+"""Functionality for sharing modeling capta among worker processes without
+copying them.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from ..utils.ragged import RaggedSeries
+
+
+class SharedSeriesStore(object):
+    """A RaggedSeries whose values are written once to a memory-mapped file,
+    so that any number of worker processes can attach to it and slice their
+    series from the same physical pages. Only the per-series metadata (names,
+    offsets, lengths, etc.) are ever pickled, and memory use stays flat as
+    workers are added.
+
+    Attributes:
+        series (RaggedSeries): the shared series, whose values are a read-only
+            memory map
+        path (str): the path of the memory-mapped values
+    """
+
+    def __init__(self, series, path, owner=False):
+        self.series = series
+        self.path = path
+        self._owner = owner
+
+    @classmethod
+    def create(cls, ragged, directory=None):
+        """Places a RaggedSeries into shared memory.
+
+        Args:
+            ragged (RaggedSeries): the series to share
+            directory (str): an optional directory in which to place the
+                memory-mapped file (e.g., /dev/shm), defaulting to the system's
+                temporary directory
+
+        Returns:
+            SharedSeriesStore: a store that removes the file when closed
+        """
+        fd, path = tempfile.mkstemp(suffix='.npy', dir=directory)
+        with os.fdopen(fd, 'wb') as fo:
+            np.save(fo, ragged.values)
+        store = cls.attach({
+            'path': path,
+            'names': ragged.names,
+            'offsets': ragged.offsets,
+            'lengths': ragged.lengths,
+            'starts': ragged.starts,
+            'n_missing': ragged.n_missing,
+            'freq': ragged.freq,
+        })
+        store._owner = True
+        return store
+
+    @property
+    def handle(self):
+        """A small, picklable description of the store, with which a worker
+        process may attach to it.
+
+        Returns:
+            dict
+        """
+        return {
+            'path': self.path,
+            'names': self.series.names,
+            'offsets': self.series.offsets,
+            'lengths': self.series.lengths,
+            'starts': self.series.starts,
+            'n_missing': self.series.n_missing,
+            'freq': self.series.freq,
+        }
+
+    @classmethod
+    def attach(cls, handle):
+        """Attaches to an existing store without copying its values.
+
+        Args:
+            handle (dict): the handle of an existing store
+
+        Returns:
+            SharedSeriesStore: a store that leaves its file in place on close
+        """
+        values = np.load(handle['path'], mmap_mode='r')
+        series = RaggedSeries(
+            names=handle['names'],
+            values=values,
+            offsets=handle['offsets'],
+            lengths=handle['lengths'],
+            starts=handle['starts'],
+            n_missing=handle['n_missing'],
+            freq=handle['freq']
+        )
+        return cls(series, handle['path'])
+
+    def close(self):
+        """Releases the store, removing the underlying file if this store
+        created it. Processes that are still attached keep their mappings.
+        """
+        self.series = None
+        if self._owner and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,128 @@
+"""Functionality for recording how long each series took to fit, so that work
+can be planned (e.g., split across shards) by its expected cost.
+"""
+
+import glob
+import json
+import os
+
+import numpy as np
+
+
+class FitTimings(object):
+    """Durations of per-series fits. A run appends each fit's duration to its
+    own log of JSON lines, while the durations of past runs are read from a
+    history into which completed runs' logs are consolidated. Since a run
+    never reads its own or concurrent runs' logs, every run (e.g., every shard
+    of a sharded run) that starts from the same history plans its work
+    identically.
+
+    Attributes:
+        directory (str): the directory holding the history and logs
+        path (str): the path of this run's log
+    """
+
+    def __init__(self, directory, name='timings'):
+        self.directory = directory
+        self.path = os.path.join(directory, f'{name}.jsonl')
+        os.makedirs(directory, exist_ok=True)
+        # Anything already in the log was written by an earlier (e.g.,
+        # interrupted) run
+        self._start = (
+            os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        )
+
+    @property
+    def _history_path(self):
+        return os.path.join(self.directory, 'history.json')
+
+    def record(self, unit, seconds):
+        """Appends a fit's duration to this run's log.
+
+        Args:
+            unit (str): an identifier for the series (see journal_unit())
+            seconds (float): the duration of the fit
+        """
+        line = json.dumps({'unit': unit, 'seconds': seconds}) + '\n'
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+
+    def fitted(self):
+        """Reads the units that this run has actually fit so far, as opposed
+        to, e.g., restoring them from a cache or leaving them on a cascade's
+        baselines (recorded as taking no time).
+
+        Returns:
+            Set[str]: the units fit
+        """
+        if not os.path.exists(self.path):
+            return set()
+        units = set()
+        with open(self.path) as fi:
+            fi.seek(self._start)
+            for line in fi:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry['seconds'] > 0:
+                    units.add(entry['unit'])
+        return units
+
+    def history(self):
+        """Reads the durations of past runs' fits.
+
+        Returns:
+            Dict[str, float]: the most recent duration of each unit's fit
+        """
+        if not os.path.exists(self._history_path):
+            return {}
+        with open(self._history_path) as fi:
+            return json.load(fi)
+
+    def consolidate(self):
+        """Folds every run's log into the history, e.g., once a run (or every
+        shard of a sharded run) has completed.
+        """
+        history = self.history()
+        logs = sorted(glob.glob(os.path.join(self.directory, '*.jsonl')))
+        for log in logs:
+            with open(log) as fi:
+                for line in fi:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    history[entry['unit']] = entry['seconds']
+        partial_path = f'{self._history_path}.partial'
+        with open(partial_path, 'w') as fo:
+            json.dump(history, fo, sort_keys=True)
+        os.replace(partial_path, self._history_path)
+        for log in logs:
+            os.remove(log)
+
+
+def expected_costs(units, lengths, history):
+    """Estimates the cost of fitting each of a set of series: its past fit
+    duration where one is known, or else its length times the median duration
+    per period of those series that have been timed (other than those whose
+    fits took no time, e.g., series left on a cascade's baselines).
+
+    Args:
+        units (Sequence[str]): an identifier for each series
+        lengths (Sequence[int]): the length of each series
+        history (Dict[str, float]): past fit durations, keyed on unit
+
+    Returns:
+        np.ndarray: each series's expected cost in seconds (or, if no series
+            has been timed, in periods)
+    """
+    lengths = np.asarray(lengths, dtype=np.float64)
+    known = np.array([u in history for u in units], dtype=bool)
+    seconds = np.array([history.get(u, np.nan) for u in units])
+    timed = known & (lengths > 0) & (seconds > 0)
+    rate = np.median(seconds[timed] / lengths[timed]) if timed.any() else 1.0
+    return np.where(known, seconds, lengths * rate)
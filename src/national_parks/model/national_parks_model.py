@@ -1,11 +1,28 @@
 """Class for managing model training. Note that all "helper" training functions
-must take a DataFrame as input, as well as an optional argument named
-outputs_subdir, which specifies identically named subdirectories of models/ and
-plots/ where relevant artifacts may be written. Additional keyword arguments
-may also be required and are passed in with the ** unpacking operator.
+must take a DataFrame (or a RaggedSeries) as input, as well as an optional
+argument named outputs_subdir, which specifies identically named subdirectories
+of models/ and plots/ where relevant artifacts may be written. Additional
+keyword arguments may also be required and are passed in with the ** unpacking
+operator, while inputs shared by every recipe in a run (features, cache_dir,
+journal, resume, timings, and scheduler) are only passed to functions that
+accept them.
 """
 
+import inspect
+import os
+
+from hydra.utils import to_absolute_path
+from omegaconf import OmegaConf
+
+from .. import visualization
+from ..utils.ragged import RaggedSeries
+from ..visualization.report import write_report
 from ._arima import train_and_evaluate_arima_models
+from ._cache import code_version, inputs_fingerprint
+from ._cascade import train_and_evaluate_cascade
+from ._evaluation import leaderboard
+from ._forecasts import read_recipe_forecasts
+from ._reconcile import hierarchy_history, train_and_evaluate_reconciled
 
 
 class NationalParksModel(object):
@@ -17,11 +34,15 @@ class NationalParksModel(object):
             plots/ where output artifacts should be written
         params (dict): a dictionary of parameters to be passed to the relevant
             algorithm
+        shardable (bool): whether the algorithm fits each series on its own,
+            so that its series may be split across shards of a run
     """
 
     def __init__(self, algorithm_name, outputs_subdir, params=None):
         _allowable_algorithms = {
-            'arima': train_and_evaluate_arima_models
+            'arima': train_and_evaluate_arima_models,
+            'cascade': train_and_evaluate_cascade,
+            'reconcile': train_and_evaluate_reconciled,
         }
         if algorithm_name not in _allowable_algorithms:
             raise NotImplementedError(
@@ -31,16 +52,177 @@ class NationalParksModel(object):
         self._algorithm = _allowable_algorithms[algorithm_name]
         self.outputs_subdir = outputs_subdir
         self.params = params if params is not None else {}
+        # Reconciliation fits every series in a hierarchy together
+        self.shardable = algorithm_name in {'arima', 'cascade'}
+
+    def check_params(self):
+        """Checks that the model's params can be passed to its algorithm (and
+        on to the ARIMA tier, for a cascade), without fitting anything.
+
+        Raises:
+            TypeError: if the params don't match the algorithm's signature
+        """
+        try:
+            bound = inspect.signature(self._algorithm).bind(
+                None, self.outputs_subdir, **self.params
+            )
+            # A cascade passes any params that it doesn't take itself on to
+            # train_and_evaluate_arima_models()
+            if self.algorithm_name == 'cascade':
+                inspect.signature(train_and_evaluate_arima_models).bind(
+                    None, **bound.arguments.get('arima_kwargs', {})
+                )
+        except TypeError as e:
+            raise TypeError(
+                f'Invalid params for algorithm {self.algorithm_name} - {e}'
+            ) from None
 
-    def fit_and_evaluate(self, df):
+    def fingerprint(self, *paths):
+        """Fingerprints everything that determines the model's artifacts: its
+        algorithm and parameters, the modeling code, and the contents of the
+        files from which its inputs are read.
+
+        Args:
+            *paths (str): the files from which the model's inputs are read
+
+        Returns:
+            str: a hexadecimal digest
+        """
+        params = (
+            OmegaConf.to_container(self.params)
+            if OmegaConf.is_config(self.params) else self.params
+        )
+        return inputs_fingerprint(
+            {
+                'algorithm': self.algorithm_name,
+                'outputs_subdir': self.outputs_subdir,
+                'params': params,
+            },
+            paths,
+            code_version(
+                os.path.dirname(__file__),
+                os.path.dirname(visualization.__file__)
+            )
+        )
+
+    def fit_and_evaluate(
+            self,
+            df,
+            features=None,
+            cache_dir=None,
+            journal=None,
+            resume=False,
+            timings=None,
+            scheduler=None
+    ):
         """Applies the indicated ML training algorithm to a DataFrame and
         evaluates the result, including writing any artifacts to models/ and
         plots/.
 
         Args:
-            df (pd.DataFrame): a DataFrame to be fit
+            df (pd.DataFrame | RaggedSeries): the time series to be fit
+            features (FeatureStore): an optional store of precomputed
+                exogenous features
+            cache_dir (str): an optional directory in which the algorithm may
+                cache per-series results
+            journal (CompletionJournal): an optional journal in which the
+                algorithm may record the completion of each series
+            resume (bool): whether the algorithm should skip series that
+                journal records as completed in an interrupted run
+            timings (FitTimings): an optional record in which the algorithm
+                may log how long each series took to fit
+            scheduler (Scheduler): an optional pool of worker processes,
+                shared with other recipes, on which the algorithm may fit
+                its series
 
         Returns:
             None
         """
-        self._algorithm(df, self.outputs_subdir, **self.params)
+        # Each of these is only passed to algorithms that accept it
+        optional_params = {
+            'features': features,
+            'cache_dir': cache_dir,
+            'journal': journal,
+            'resume': resume or None,
+            'timings': timings,
+            'scheduler': scheduler,
+        }
+        accepted = inspect.signature(self._algorithm).parameters
+        accepts_any = any(
+            p.kind == inspect.Parameter.VAR_KEYWORD for p in accepted.values()
+        )
+        params = dict(self.params)
+        for k, v in optional_params.items():
+            if v is not None and (accepts_any or k in accepted):
+                params[k] = v
+        self._algorithm(df, self.outputs_subdir, **params)
+
+    def _read_forecasts(self, df):
+        """Helper function to read the test-set forecasts that the model wrote
+        to models/.
+        """
+        freq = df.freq if isinstance(df, RaggedSeries) else df.index.freqstr
+        model_output_dir = to_absolute_path(
+            os.path.join('models', self.outputs_subdir or '')
+        )
+        return read_recipe_forecasts(model_output_dir, freq=freq)
+
+    def _history(self, df):
+        """Helper function to retrieve the capta of every series that the
+        model forecast, which for reconciled forecasts include the park types
+        summed from df's parks.
+        """
+        if self.algorithm_name == 'reconcile':
+            return hierarchy_history(df)
+        return df
+
+    def evaluate(self, df):
+        """Evaluates the test-set forecasts that the model wrote to models/,
+        writing a leaderboard of their errors (see
+        national_parks.model._evaluation.evaluate_forecasts()) to
+        leaderboard.csv alongside them.
+
+        Args:
+            df (pd.DataFrame | RaggedSeries): the time series that were fit
+
+        Returns:
+            pd.DataFrame: the leaderboard, with a row per series
+        """
+        board = leaderboard(
+            self._read_forecasts(df),
+            history=self._history(df),
+            m=self.params.get('m', 1)
+        )
+        model_output_dir = to_absolute_path(
+            os.path.join('models', self.outputs_subdir or '')
+        )
+        os.makedirs(model_output_dir, exist_ok=True)
+        board.to_csv(
+            os.path.join(model_output_dir, 'leaderboard.csv'), index=False
+        )
+        return board
+
+    def write_report(self, df, fp, title=None, metrics=None):
+        """Writes a single HTML report charting the test-set forecasts that
+        the model wrote to models/, alongside the series preceding them.
+
+        Args:
+            df (pd.DataFrame | RaggedSeries): the time series that were fit
+            fp (str): the path where the report should be written
+            title (str): the report's title, defaulting to the algorithm name
+            metrics (pd.DataFrame): an optional leaderboard from evaluate(),
+                whose metrics are tabulated in the report
+
+        Returns:
+            int: the number of series in the report
+        """
+        forecasts = self._read_forecasts(df)
+        write_report(
+            forecasts,
+            fp,
+            title=title if title is not None else self.algorithm_name,
+            history=self._history(df),
+            train_limit=self.params.get('plot_train_limit', 2),
+            metrics=metrics
+        )
+        return len(forecasts)
@@ -4,3 +4,4 @@
 
 from .captaset import NPSCaptaset
 from .park_scraper import NPSParkScraper
+from .synthetic import generate_monthly_use, generate_monthly_visitors
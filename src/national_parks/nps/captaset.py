@@ -1,10 +1,20 @@
 """Class for managing source capta from the National Parks Service."""
 
+import logging
+import os
+import random
+import time
 from typing import Dict
 
 import pandas as pd
+import requests
 
-from .park_scraper import NPSParkScraper
+from ..utils.dtypes import apply_dtype_policy
+from .park_scraper import NPSParkScraper, TransientHTTPError
+
+
+# Failures that may not recur, and are thus retried
+_TRANSIENT_ERRORS = (TransientHTTPError, requests.RequestException)
 
 
 class NPSCaptaset(object):
@@ -15,31 +25,150 @@ class NPSCaptaset(object):
         max_year (int): the latest year of capta to retrieve
         visitor_base_url (str): a base URL for retrieving monthly
             visitor information for every park
+        use_base_url (str): an optional base URL for retrieving monthly
+            visitor use information for every park
+        request_delay (float): seconds to wait after each request, to avoid
+            spamming the NPS servers
+        fetch_mode (str): how reports are retrieved, either "csv" (the
+            report's CSV export, falling back to HTML) or "html"
+        max_retries (int): the number of times a transient failure (a
+            server error, rate limiting, or a connection error) is retried
+        backoff_base (float): seconds to wait before the first retry, which
+            doubles for every subsequent retry
+        backoff_cap (float): the maximum number of seconds to wait before a
+            retry
+        session (requests.Session): the HTTP session shared by every park's
+            requests, so that connections to the NPS servers are reused
         parks (Dict[str, NPSParkScraper]): an indexed collection of
             NPSParkScraper objects
+        failed_parks (Dict[str, Dict[str, str]]): the type of each park that
+            could not be added, and the error encountered, keyed on the park's
+            name
+        failed_use (Dict[str, Dict[str, str]]): the type of each park that
+            was added but whose visitor use could not be scraped, and the
+            error encountered, keyed on the park's name
     """
 
-    def __init__(self, min_year, max_year, visitor_base_url):
+    def __init__(
+            self,
+            min_year,
+            max_year,
+            visitor_base_url,
+            request_delay=1,
+            fetch_mode='html',
+            use_base_url=None,
+            max_retries=3,
+            backoff_base=1,
+            backoff_cap=30,
+            seed=None,
+    ):
         self.min_year = min_year
         self.max_year = max_year
         self.visitor_base_url = visitor_base_url
+        self.use_base_url = use_base_url
+        self.request_delay = request_delay
+        self.fetch_mode = fetch_mode
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.session = requests.Session()
         self.parks = {}
+        self.failed_parks = {}
+        self.failed_use = {}
+        self._rng = random.Random(seed)
+
+    def _with_retries(self, scrape, description):
+        """Helper function to call a scraping function, retrying transient
+        failures after a jittered, exponentially growing delay (or however
+        long the server asked to wait, if longer, up to backoff_cap), so that
+        parks retried at once don't return to the server in lockstep.
+
+        Args:
+            scrape (Callable): a function of no arguments
+            description (str): a description of what is being scraped, for
+                logging
+
+        Returns:
+            the result of scrape()
+
+        Raises:
+            ValueError: if scrape() still fails transiently after max_retries
+                retries
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return scrape()
+            except _TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise ValueError(
+                        f'{description} failed after {attempt + 1} attempts'
+                        f' - {e}'
+                    ) from e
+                delay = self._rng.uniform(
+                    0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+                )
+                retry_after = getattr(e, 'retry_after', None) or 0
+                delay = max(delay, min(retry_after, self.backoff_cap))
+                logging.info(
+                    f'Retrying {description} in {delay:.1f}s - {e}'
+                )
+                time.sleep(delay)
 
     def add_and_populate_park(self, name, park_type):
-        """Adds a populated NPSParkScraper to the captaset.
+        """Adds a populated NPSParkScraper to the captaset, retrying any
+        transient failures. A park is added as soon as its visitor capta are
+        scraped, so that it is retained even if its visitor use capta cannot
+        be. Parks that still fail are recorded in failed_parks, and parks
+        whose visitor use still fails are recorded in failed_use (without
+        raising, since the park itself was added).
 
         Args:
             name (str): the abbreviated name for a park (e.g., 'ACAD')
             park_type (str): the type of park (must be listed in
                 config/refresh_source_capta/park_types.yaml, e.g., 'NP')
+
+        Raises:
+            ValueError: if no HTTP response is received, or if transient
+                failures persist through every retry
+            KeyError: if no capta table can be located in a response
         """
-        park = NPSParkScraper(name=name, park_type=park_type)
-        park_url = self.visitor_base_url.replace('{park}', name)
-        park.scrape_monthly_visitors(
-            park_url=park_url, max_year=self.max_year, min_year=self.min_year
+        park = NPSParkScraper(
+            name=name, park_type=park_type, session=self.session
         )
-        # TODO (WW): call additional populate methods
+        try:
+            self._with_retries(
+                lambda: park.scrape_monthly_visitors(
+                    park_url=self.visitor_base_url.replace('{park}', name),
+                    max_year=self.max_year,
+                    min_year=self.min_year,
+                    request_delay=self.request_delay,
+                    fetch_mode=self.fetch_mode
+                ),
+                f'monthly visitors for {name}'
+            )
+        except (KeyError, ValueError) as e:
+            self.failed_parks[name] = {'park_type': park_type, 'error': str(e)}
+            raise
         self.parks[name] = park
+        self.failed_parks.pop(name, None)
+        if self.use_base_url is None:
+            return
+        try:
+            self._with_retries(
+                lambda: park.scrape_monthly_use(
+                    park_url=self.use_base_url.replace('{park}', name),
+                    max_year=self.max_year,
+                    min_year=self.min_year,
+                    request_delay=self.request_delay,
+                    fetch_mode=self.fetch_mode
+                ),
+                f'monthly visitor use for {name}'
+            )
+        except (KeyError, ValueError) as e:
+            logging.info(f'Unable to scrape visitor use for {name} - {e}')
+            self.failed_use[name] = {'park_type': park_type, 'error': str(e)}
+            return
+        self.failed_use.pop(name, None)
 
     def clear_parks(self):
         self.parks.clear()
@@ -50,24 +179,131 @@ class NPSCaptaset(object):
         Returns:
             pd.DataFrame: a DataFrame with monthly visitors across all parks,
                 with columns ['full_park_name', 'park_name', 'park_type',
-                'year', 'month', 'visitors']
+                'year', 'month', 'visitors'], or None if no park was added
+        """
+        if not len(self.parks):
+            return None
+        # Categorical columns with differing categories are concatenated as
+        # objects, so the dtype policy must be reapplied
+        return apply_dtype_policy(
+            pd.concat(
+                [park.get_monthly_visitors() for park in self.parks.values()],
+                ignore_index=True,
+            ),
+            name='source monthly visitors'
+        )
+
+    def _collect_monthly_use(self):
+        """Helper function to collect monthly visitor use, from those parks
+        for which it has been scraped.
+
+        Returns:
+            pd.DataFrame: a DataFrame with monthly visitor use across all
+                parks, with columns ['Year', 'Month', ..., 'park_name',
+                'park_type'], or None if no park's has been scraped
         """
-        return pd.concat(
-            [park.get_monthly_visitors() for park in self.parks.values()],
-            ignore_index=True,
+        use_dfs = [
+            park.get_monthly_use() for park in self.parks.values()
+            if park._monthly_use is not None
+        ]
+        if not len(use_dfs):
+            return None
+        return apply_dtype_policy(
+            pd.concat(use_dfs, ignore_index=True),
+            name='source monthly visitor use'
         )
 
-    def write_source_capta(self, visitors_fp):
+    def _merge_into(self, df, fp, name):
+        """Helper function to merge newly scraped capta into those previously
+        written to a file, replacing any rows for the same parks.
+
+        Returns:
+            pd.DataFrame: the merged capta
+        """
+        if not os.path.exists(fp):
+            return df
+        existing_df = pd.read_csv(fp)
+        existing_df = existing_df[
+            ~existing_df['park_name'].isin(list(self.parks))
+        ]
+        return apply_dtype_policy(
+            pd.concat([existing_df, df], ignore_index=True), name=name
+        )
+
+    def write_source_capta(self, visitors_fp, use_fp=None, merge=False):
         """Writes all accumulated source capta.
 
         Args:
             visitors_fp (str): the filepath where monthly visitor capta should
                 be written
+            use_fp (str): the filepath where monthly visitor use capta should
+                be written, if they were scraped
+            merge (bool): whether to merge the accumulated capta into those
+                already written to these filepaths (e.g., when retrying parks
+                that failed in an earlier refresh) rather than replace them
 
         Returns:
             None
         """
-        # Monthly visitors
+        # Monthly visitors (and thus visitor use) are only written if any park
+        # was added, leaving existing outputs as they are otherwise
         monthly_visitors_df = self._collect_monthly_visitors()
+        if monthly_visitors_df is None:
+            logging.info('No parks added, skipping source capta outputs')
+            return
+        if merge:
+            monthly_visitors_df = self._merge_into(
+                monthly_visitors_df, visitors_fp, 'source monthly visitors'
+            )
         monthly_visitors_df.to_csv(visitors_fp, index=False)
-        # TODO (WW): usage
+        # Monthly visitor use
+        if use_fp is not None and self.use_base_url is not None:
+            monthly_use_df = self._collect_monthly_use()
+            if monthly_use_df is None:
+                logging.info('No visitor use scraped, skipping its output')
+                return
+            if merge:
+                monthly_use_df = self._merge_into(
+                    monthly_use_df, use_fp, 'source monthly visitor use'
+                )
+            monthly_use_df.to_csv(use_fp, index=False)
+
+    def write_failure_journal(self, fp):
+        """Writes the parks that could not be added (or whose visitor use
+        could not be scraped), along with the report that failed, so that they
+        can be retried without refreshing every park (see
+        read_failure_journal()).
+        The journal is written even if empty, so that a stale journal never
+        outlives the failures it records.
+
+        Args:
+            fp (str): the filepath where the journal should be written
+
+        Returns:
+            None
+        """
+        pd.DataFrame(
+            [
+                {'park_name': name, 'report': report, **failure}
+                for report, failures in [
+                    ('visitors', self.failed_parks), ('use', self.failed_use)
+                ]
+                for name, failure in failures.items()
+            ],
+            columns=['park_name', 'park_type', 'report', 'error']
+        ).to_csv(fp, index=False)
+
+    @staticmethod
+    def read_failure_journal(fp):
+        """Reads the parks recorded by write_failure_journal().
+
+        Args:
+            fp (str): the filepath of the journal
+
+        Returns:
+            Dict[str, str]: the type of each park, keyed on the park's name
+        """
+        if not os.path.exists(fp):
+            return {}
+        journal_df = pd.read_csv(fp, dtype=str)
+        return dict(zip(journal_df['park_name'], journal_df['park_type']))
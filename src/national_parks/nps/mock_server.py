@@ -0,0 +1,391 @@
+"""A local stand-in for the National Parks Service's IRMA statistics site, for
+measuring scraper throughput and failure handling without network access.
+
+The server mimics the two pages that NPSParkScraper retrieves for each park's
+reports: a "wrapper" page containing an iframe, and the report page that the
+iframe points to, which contains the capta table (14 columns for monthly
+visitors, 13 for monthly visitor use). Requests for an SSRS export rendering
+(i.e., with an "rs:Format=CSV" query parameter) receive the report's CSV
+export. Report pages are either read from a directory of recorded pages (one
+"{park}.html" and one "{park}_use.html" file per park) or rendered from
+synthetic capta. Latency, server errors, and rate limiting can all be
+injected.
+
+Run standalone with `python -m national_parks.nps.mock_server --help`.
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from omegaconf import OmegaConf
+import pandas as pd
+
+from ..utils.logging import setup_logging
+from .synthetic import (
+    MONTH_COLUMNS, USE_COLUMNS, generate_monthly_use, generate_monthly_visitors
+)
+
+
+# Mirrors the path of the real site, so that only the host of the configured
+# base_url needs to change
+WRAPPER_PATH = (
+    '/STATS/SSRSReports/Park%20Specific%20Reports/Recreation%20Visitors%20By'
+    + '%20Month%20(1979%20-%20Last%20Calendar%20Year)'
+)
+USE_WRAPPER_PATH = (
+    '/STATS/SSRSReports/Park%20Specific%20Reports/Summary%20of%20Visitor%20Use'
+    + '%20By%20Month%20and%20Year%20(1979%20-%20Last%20Calendar%20Year)'
+)
+REPORT_PATH = '/Stats/Report'
+
+
+def render_report_page(df):
+    """Renders a page resembling an NPS visitor report for a single park, whose
+    capta table has 14 columns (year, twelve months, and an annual total) and
+    numbers written with thousands separators.
+
+    Args:
+        df (pd.DataFrame): a DataFrame with columns ['Year', 'JAN', ...,
+            'DEC'], as produced by generate_monthly_visitors()
+
+    Returns:
+        str: the page's HTML
+    """
+    df = df[['Year'] + [c for c in df.columns if c not in (
+        'Year', 'park_name', 'park_type'
+    )]].copy()
+    df['Total'] = df.drop(columns='Year').sum(axis=1)
+    header = ''.join(f'<td>{c}</td>' for c in df.columns)
+    rows = ''.join(
+        '<tr>'
+        + f'<td>{row[0]}</td>'
+        + ''.join(f'<td>{v:,}</td>' for v in row[1:])
+        + '</tr>'
+        for row in df.itertuples(index=False)
+    )
+    return (
+        '<html><body><div><table><tr><td>Report</td></tr></table>'
+        + f'<table cols="14"><tr>{header}</tr>{rows}</table>'
+        + '</div></body></html>'
+    )
+
+
+def render_report_csv(df):
+    """Renders a CSV export resembling that of an NPS visitor report for a
+    single park, as produced by SSRS (i.e., with internal textbox names as
+    headers and unformatted numbers).
+
+    Args:
+        df (pd.DataFrame): a DataFrame with columns ['Year', 'JAN', ...,
+            'DEC'], as produced by generate_monthly_visitors()
+
+    Returns:
+        str: the CSV's contents
+    """
+    df = df[['Year'] + [c for c in df.columns if c not in (
+        'Year', 'park_name', 'park_type'
+    )]].copy()
+    df['Total'] = df.drop(columns='Year').sum(axis=1)
+    df.columns = [f'Textbox{i}' for i in range(len(df.columns))]
+    return df.to_csv(index=False)
+
+
+def _with_annual_totals(df):
+    """Helper function to intersperse a visitor use DataFrame's monthly rows
+    with annual totals, as in NPS visitor use reports."""
+    df = df[['Year', 'Month'] + USE_COLUMNS]
+    totals = df.groupby('Year', as_index=False)[USE_COLUMNS].sum()
+    totals.insert(1, 'Month', 13)
+    return pd.concat([df, totals]).sort_values(['Year', 'Month'])
+
+
+def render_use_report_page(df):
+    """Renders a page resembling an NPS visitor use report for a single park,
+    whose capta table has 13 columns (year, month, and eleven categories of
+    use), months written as abbreviations, annual totals, and numbers written
+    with thousands separators.
+
+    Args:
+        df (pd.DataFrame): a DataFrame with columns ['Year', 'Month',
+            'RecreationVisits', ...], as produced by generate_monthly_use()
+
+    Returns:
+        str: the page's HTML
+    """
+    month_labels = dict(enumerate(MONTH_COLUMNS + ['Total'], start=1))
+    header = ''.join(f'<td>{c}</td>' for c in ['Year', 'Month'] + USE_COLUMNS)
+    rows = ''.join(
+        '<tr>'
+        + f'<td>{row[0]}</td><td>{month_labels[row[1]]}</td>'
+        + ''.join(f'<td>{v:,}</td>' for v in row[2:])
+        + '</tr>'
+        for row in _with_annual_totals(df).itertuples(index=False)
+    )
+    return (
+        '<html><body><div><table><tr><td>Report</td></tr></table>'
+        + f'<table cols="13"><tr>{header}</tr>{rows}</table>'
+        + '</div></body></html>'
+    )
+
+
+def render_use_report_csv(df):
+    """Renders a CSV export resembling that of an NPS visitor use report for a
+    single park, as produced by SSRS.
+
+    Args:
+        df (pd.DataFrame): a DataFrame with columns ['Year', 'Month',
+            'RecreationVisits', ...], as produced by generate_monthly_use()
+
+    Returns:
+        str: the CSV's contents
+    """
+    df = _with_annual_totals(df)
+    df['Month'] = df['Month'].astype(object).where(df['Month'] <= 12, 'Total')
+    df.columns = [f'Textbox{i}' for i in range(len(df.columns))]
+    return df.to_csv(index=False)
+
+
+def _render_wrapper_page(park, report):
+    return (
+        '<html><body><iframe src="'
+        + f'{REPORT_PATH.lstrip("/")}?Park={park}&amp;Report={report}'
+        + '"></iframe></body></html>'
+    )
+
+
+class MockNPSServer(object):
+    """A threaded HTTP server imitating the NPS IRMA statistics site.
+
+    Attributes:
+        parks (Iterable[str]): the park codes for which synthetic reports are
+            served, ignored if recordings_dir is given
+        recordings_dir (str): an optional directory of recorded report pages,
+            one "{park}.html" file per park and one "{park}_use.html" file per
+            park for visitor use (and optionally "{park}.csv" and
+            "{park}_use.csv" files for CSV exports)
+        latency (float): seconds to wait before every response
+        error_rate (float): the probability of responding with a 500
+        rate_limit_rate (float): the probability of responding with a 429
+        unavailable_rate (float): the probability of responding with a 503
+        host (str): the host on which to listen
+        port (int): the port on which to listen (0 picks a free port)
+        seed (int): a seed for synthetic capta and injected failures
+        stats (Dict[int, int]): the number of responses sent, by status code
+    """
+
+    def __init__(
+            self,
+            parks=(),
+            recordings_dir=None,
+            latency=0.0,
+            error_rate=0.0,
+            rate_limit_rate=0.0,
+            unavailable_rate=0.0,
+            host='127.0.0.1',
+            port=0,
+            seed=0,
+    ):
+        self.recordings_dir = recordings_dir
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.unavailable_rate = unavailable_rate
+        self.stats = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Rendered pages, keyed on (report, park) and (report, park, format)
+        self._reports = {}
+        self._exports = {}
+        parks = list(parks)
+        if recordings_dir is None and len(parks):
+            visitors_df = generate_monthly_visitors(len(parks), seed=seed)
+            use_df = generate_monthly_use(visitors_df, seed=seed)
+            codes = dict(zip(visitors_df['park_name'].cat.categories, parks))
+            for report, df, render_page, render_csv in (
+                    ('visitors', visitors_df, render_report_page,
+                     render_report_csv),
+                    ('use', use_df, render_use_report_page,
+                     render_use_report_csv),
+            ):
+                for code, park_df in df.groupby('park_name', observed=True):
+                    park = codes[code]
+                    self._reports[report, park] = render_page(park_df)
+                    self._exports[report, park, 'CSV'] = render_csv(park_df)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """A monthly visitors base URL, in the form of that configured in
+        config/main.yaml, pointing to this server.
+        """
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}{WRAPPER_PATH}?Park={{park}}'
+
+    @property
+    def use_base_url(self):
+        """A visitor use base URL, in the form of that configured in
+        config/main.yaml, pointing to this server.
+        """
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}{USE_WRAPPER_PATH}?Park={{park}}'
+
+    def _get_report(self, park, report='visitors', export_format=None):
+        if self.recordings_dir is not None:
+            suffix = '' if report == 'visitors' else f'_{report}'
+            extension = 'html' if export_format is None else (
+                export_format.lower()
+            )
+            fp = os.path.join(
+                self.recordings_dir, f'{park}{suffix}.{extension}'
+            )
+            if not os.path.exists(fp):
+                return None
+            with open(fp) as fi:
+                return fi.read()
+        if export_format is None:
+            return self._reports.get((report, park))
+        return self._exports.get((report, park, export_format.upper()))
+
+    def _draw_failure(self):
+        """Returns an HTTP status code for an injected failure, or None."""
+        with self._lock:
+            draw = self._rng.random()
+        for status, rate in (
+                (500, self.error_rate),
+                (429, self.rate_limit_rate),
+                (503, self.unavailable_rate),
+        ):
+            if draw < rate:
+                return status
+            draw -= rate
+        return None
+
+    def _record(self, status):
+        with self._lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            def _respond(self, status, body='', headers=None):
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+                server._record(status)
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                failure = server._draw_failure()
+                if failure is not None:
+                    headers = {'Retry-After': '1'} if failure != 500 else None
+                    self._respond(failure, headers=headers)
+                    return
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                park = query.get('Park', [''])[0]
+                export_format = query.get('rs:Format', [None])[0]
+                wrapper_report = {
+                    unquote(WRAPPER_PATH): 'visitors',
+                    unquote(USE_WRAPPER_PATH): 'use',
+                }.get(unquote(url.path))
+                if url.path.lower() == REPORT_PATH.lower():
+                    # As on the real site, unrecognized parks yield a page
+                    # without a capta table rather than an HTTP error
+                    page = server._get_report(
+                        park, query.get('Report', ['visitors'])[0]
+                    )
+                    self._respond(200, page or '<html></html>')
+                elif wrapper_report is None:
+                    self._respond(404)
+                elif export_format is not None:
+                    # SSRS responds to unrenderable requests with an error
+                    export = server._get_report(
+                        park, wrapper_report, export_format
+                    )
+                    if export is None:
+                        self._respond(404)
+                    else:
+                        self._respond(200, export)
+                else:
+                    self._respond(
+                        200, _render_wrapper_page(park, wrapper_report)
+                    )
+
+            def log_message(self, format, *args):
+                pass
+
+        return _Handler
+
+    def start(self):
+        """Starts serving on a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and releases the port."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--parks-file', default=None)
+    parser.add_argument('--recordings-dir', default=None)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--unavailable-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    setup_logging('mock_server')
+    # Park lists (e.g., config/refresh_source_capta/all_parks.yaml) are YAML
+    # mappings of codes to names
+    parks = []
+    if args.parks_file is not None:
+        parks = list(OmegaConf.load(args.parks_file).keys())
+    server = MockNPSServer(
+        parks=parks,
+        recordings_dir=args.recordings_dir,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        unavailable_rate=args.unavailable_rate,
+        port=args.port,
+    )
+    logging.info(f'Serving visitors at {server.base_url}')
+    logging.info(f'Serving visitor use at {server.use_base_url}')
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
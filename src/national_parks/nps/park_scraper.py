@@ -1,25 +1,84 @@
 """Class for managing scraping functionality for a single national park."""
 
 from copy import deepcopy
+import csv
+import io
+import logging
 import requests
 import time
+from urllib.parse import urlsplit
 
 from bs4 import BeautifulSoup
-# from selenium import webdriver
-# from selenium.webdriver.chrome.service import Service
-# from selenium.webdriver.common.by import By
-# from webdriver_manager.chrome import ChromeDriverManager
 
 import pandas as pd
 
+from ..utils.dtypes import apply_dtype_policy
+from .synthetic import MONTH_COLUMNS, USE_COLUMNS
 
-def _scrape_url(url, sleep_t=1):
+
+# The visitor reports have 14 columns: one for the year, one for each month's
+# visitor counts, and one for the total annual visitor count
+_REPORT_COLUMNS = ['Year'] + MONTH_COLUMNS + ['Total']
+# The visitor use reports have one row per year and month (interspersed with
+# annual totals) and one column per category of use
+_USE_REPORT_COLUMNS = ['Year', 'Month'] + USE_COLUMNS
+
+
+class TransientHTTPError(ValueError):
+    """Raised for an HTTP response indicating a failure that may not recur
+    (a server error or rate limiting), and which is thus worth retrying.
+
+    Attributes:
+        status_code (int): the response's status code
+        retry_after (float): the number of seconds after which the server
+            asked to be retried, if it did
+    """
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f'HTTP {status_code} received')
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _scrape_url(url, sleep_t=1, session=None):
     """Simple helper function that avoids spamming client servers"""
-    response = requests.get(url)
+    response = (requests if session is None else session).get(url)
     time.sleep(sleep_t)
     return response
 
 
+def _check_response(response):
+    """Helper function to raise an error for an unsuccessful HTTP response.
+
+    Args:
+        response (requests.Response): an HTTP response
+
+    Raises:
+        TransientHTTPError: if the response is a server error or indicates
+            rate limiting
+        ValueError: if the response is otherwise unsuccessful
+    """
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = response.headers.get('Retry-After')
+        raise TransientHTTPError(
+            response.status_code,
+            retry_after=(
+                float(retry_after)
+                if retry_after is not None and retry_after.isdigit()
+                else None
+            )
+        )
+    if not response:
+        raise ValueError('No HTTP response received')
+
+
+def _get_site_root(url):
+    """Helper function to retrieve the scheme and host of a URL (e.g.,
+    "https://irma.nps.gov/")."""
+    split_url = urlsplit(url)
+    return f'{split_url.scheme}://{split_url.netloc}/'
+
+
 def _bs_table_to_pandas(html_table, header=True):
     """Helper function for parsing BeautifulSoup tables to pandas.
 
@@ -43,6 +102,82 @@ def _bs_table_to_pandas(html_table, header=True):
     return df
 
 
+def _csv_report_to_pandas(text, columns=None):
+    """Helper function for parsing the CSV export of an SSRS report. The
+    export's header row contains internal textbox names rather than the column
+    labels shown on the site, so capta rows are instead identified by their
+    width and a leading four-digit year, and labeled positionally. As with
+    HTML tables, rows containing any empty value are ignored.
+
+    Args:
+        text (str): the body of a CSV export
+        columns (list): the labels of the report table's columns
+
+    Returns:
+        pd.DataFrame
+
+    Raises:
+        KeyError: if no capta rows can be located in the export
+    """
+    columns = _REPORT_COLUMNS if columns is None else columns
+    df_rows = [
+        row for row in csv.reader(io.StringIO(text))
+        if len(row) == len(columns)
+        and len(row[0].strip()) == 4
+        and row[0].strip().isdigit()
+        and min(len(c.strip()) for c in row)
+    ]
+    if not len(df_rows):
+        raise KeyError('Could not retrieve capta')
+    return pd.DataFrame(df_rows, columns=columns)
+
+
+def _clean_report_table(capta_df, min_year, max_year):
+    """Helper function for cleaning a parsed report table, whether it was
+    retrieved as HTML or as a CSV export.
+
+    Args:
+        capta_df (pd.DataFrame): a parsed report table, with a "Year" column
+            and (optionally) a redundant "Total" column
+        min_year (int): the earliest year of capta to retain
+        max_year (int): the latest year of capta to retain
+
+    Returns:
+        pd.DataFrame
+    """
+    # The 'Total' column is redundant information and can always be
+    # recalculated, so there's no need to store it
+    capta_df = capta_df.drop(columns='Total', errors='ignore')
+    # Convert to numeric where possible, catching numbers written with commas
+    capta_df = capta_df.apply(
+        lambda x: pd.to_numeric(
+            x.astype(str).str.replace(',', ''), errors='ignore'
+        )
+    )
+    # Filter out any years outside those specified in the configuration files
+    capta_df = capta_df.query(f'{min_year} <= Year <= {max_year}')
+    return apply_dtype_policy(capta_df)
+
+
+def _month_numbers(months):
+    """Helper function to convert months written as numbers or as names (e.g.,
+    "1", "Jan", or "January") to numbers, and anything else (e.g., the label
+    of an annual total) to NaN."""
+    months = months.astype(str).str.strip()
+    return pd.to_numeric(months, errors='coerce').fillna(
+        months.str[:3].str.upper().map(
+            {m: i + 1 for i, m in enumerate(MONTH_COLUMNS)}
+        )
+    )
+
+
+def _get_export_url(report_url, export_format='CSV'):
+    """Helper function to build the SSRS URL-access request for a report's
+    machine-readable rendering."""
+    separator = '&' if urlsplit(report_url).query else '?'
+    return f'{report_url}{separator}rs:Format={export_format}'
+
+
 class NPSParkScraper(object):
     """Webscraping and capta storage class for an individual national park.
 
@@ -50,63 +185,156 @@ class NPSParkScraper(object):
         name (str): the abbreviated name or 'code' for a park (e.g., "ACAD")
         park_type (str): the type of park (must be listed in
             config/refresh_source_capta/park_types.yaml, e.g., "NP")
+        session (requests.Session): an optional HTTP session through which
+            all requests are made, so that connections can be reused (e.g.,
+            across every park in an NPSCaptaset)
         _monthly_visitors (pd.DataFrame): a DataFrame (NB: use
             get_monthly_visitors() to retrieve capta associated with this
             object, do not retrieve it directly)
+        _monthly_use (pd.DataFrame): a DataFrame (NB: use get_monthly_use()
+            to retrieve capta associated with this object, do not retrieve it
+            directly)
     """
 
-    def __init__(self, name, park_type):
+    def __init__(self, name, park_type, session=None):
         self.name = name
         self.park_type = park_type
+        self.session = session
         self._monthly_visitors = None
+        self._monthly_use = None
+
+    def _scrape_html_report(self, park_url, request_delay, columns):
+        """Retrieves a report table by scraping the rendered HTML report.
+
+        Args:
+            park_url (str): the URL of the report's page on the NPS site
+            request_delay (float): seconds to wait after each request
+            columns (list): the labels of the report table's columns
 
-    def scrape_monthly_visitors(self, park_url, min_year, max_year):
+        Returns:
+            pd.DataFrame: the unprocessed report table
+
+        Raises:
+            TransientHTTPError: if a server error or rate limiting is
+                encountered
+            ValueError: if no HTTP response is received
+            KeyError: if no capta table can be located in the response
+        """
+        # Initial query to NPS
+        park_response = _scrape_url(
+            park_url, sleep_t=request_delay, session=self.session
+        )
+        _check_response(park_response)
+        park_soup = BeautifulSoup(park_response.content, 'html.parser')
+        # The publicly viewable NPS website is itself really just a 'view' -
+        # i.e., an iframe wrapped around another website with the actual capta
+        park_suburl = park_soup.find('iframe')['src']
+        capta_url = _get_site_root(park_url) + park_suburl
+        capta_response = _scrape_url(
+            capta_url, sleep_t=request_delay, session=self.session
+        )
+        _check_response(capta_response)
+        capta_soup = BeautifulSoup(capta_response.content, 'html.parser')
+        # The desired table is identified by its number of columns, and its
+        # displayed headers are replaced by the canonical column labels
+        capta_table = capta_soup.find('table', cols=str(len(columns)))
+        if capta_table is None:
+            raise KeyError('Could not retrieve capta')
+        capta_df = _bs_table_to_pandas(capta_table)
+        capta_df.columns = columns
+        return capta_df
+
+    def _fetch_csv_report(self, park_url, request_delay, columns):
+        """Retrieves a report table from the report's CSV export rendering,
+        which requires a single, much smaller response than the HTML report.
+
+        Args:
+            park_url (str): the URL of the report's page on the NPS site
+            request_delay (float): seconds to wait after each request
+            columns (list): the labels of the report table's columns
+
+        Returns:
+            pd.DataFrame: the unprocessed report table
+
+        Raises:
+            TransientHTTPError: if a server error or rate limiting is
+                encountered
+            ValueError: if no HTTP response is received
+            KeyError: if no capta rows can be located in the response
+        """
+        export_response = _scrape_url(
+            _get_export_url(park_url),
+            sleep_t=request_delay,
+            session=self.session
+        )
+        _check_response(export_response)
+        return _csv_report_to_pandas(export_response.text, columns=columns)
+
+    def _fetch_report(self, park_url, request_delay, fetch_mode, columns):
+        """Retrieves a report table, from its CSV export if requested and from
+        the rendered HTML report otherwise (or if the export fails).
+
+        Args:
+            park_url (str): the URL of the report's page on the NPS site
+            request_delay (float): seconds to wait after each request
+            fetch_mode (str): either "csv" or "html"
+            columns (list): the labels of the report table's columns
+
+        Returns:
+            pd.DataFrame: the unprocessed report table
+
+        Raises:
+            TransientHTTPError: if a server error or rate limiting is
+                encountered
+            ValueError: if no HTTP response is received
+            KeyError: if no capta table can be located in the response
+        """
+        if fetch_mode not in ('csv', 'html'):
+            raise NotImplementedError(f'Unimplemented fetch mode {fetch_mode}')
+        if fetch_mode == 'csv':
+            try:
+                return self._fetch_csv_report(park_url, request_delay, columns)
+            # Transient failures are left to the caller to retry, since the
+            # HTML report is served by the same (struggling) server
+            except TransientHTTPError:
+                raise
+            except (KeyError, ValueError) as e:
+                logging.info(
+                    f'CSV export failed for {self.name} ({e}), scraping HTML'
+                )
+        return self._scrape_html_report(park_url, request_delay, columns)
+
+    def scrape_monthly_visitors(
+            self,
+            park_url,
+            min_year,
+            max_year,
+            request_delay=1,
+            fetch_mode='html',
+    ):
         """Scrapes and caches monthly visitors from the relevant NPS site.
 
         Args:
             park_url (str): the URL for retrieving monthly visitor data
             min_year (int): the earliest year of capta to retrieve
             max_year (int): the latest year of capta to retrieve
+            request_delay (float): seconds to wait after each request
+            fetch_mode (str): "csv" to request the report's CSV export,
+                falling back to scraping the HTML report if that fails, or
+                "html" to scrape the HTML report directly
 
         Raises:
+            TransientHTTPError: if a server error or rate limiting is
+                encountered
             ValueError: if no HTTP response is received
             KeyError: if no capta table can be located in the response
         """
-        # Initial query to NPS
-        park_response = _scrape_url(park_url)
-        if park_response:
-            park_soup = BeautifulSoup(park_response.content, 'html.parser')
-            # The publicly viewable NPS website is itself really just a
-            # 'view' - i.e., an iframe wrapped around another website with
-            # the actual capta
-            park_suburl = park_soup.find('iframe')['src']
-            capta_url = 'https://irma.nps.gov/' + park_suburl
-            capta_response = _scrape_url(capta_url)
-            capta_soup = BeautifulSoup(capta_response.content, 'html.parser')
-            # The desired table has 14 columns: one for the year, one for
-            # each month's visitor counts, and one for the total annual
-            # visitor count
-            capta_table = capta_soup.find('table', cols='14')
-            if capta_table is not None:
-                capta_df = _bs_table_to_pandas(capta_table)
-                # The 'Total' column is redundant information and can always be
-                # recalculated, so there's no need to store it
-                capta_df = capta_df.drop(columns='Total')
-                # Convert to numeric where possible, catching numbers written
-                # with commas
-                capta_df = capta_df.apply(
-                    lambda x: pd.to_numeric(
-                        x.astype(str).str.replace(',', ''), errors='ignore'
-                    )
-                )
-                # Filter out any years outside those specified in the
-                # configuration files
-                capta_df = capta_df.query(f'{min_year} <= Year <= {max_year}')
-                self._monthly_visitors = capta_df
-            else:
-                raise KeyError('Could not retrieve capta')
-        else:
-            raise ValueError('No HTTP response received')
+        capta_df = self._fetch_report(
+            park_url, request_delay, fetch_mode, _REPORT_COLUMNS
+        )
+        self._monthly_visitors = _clean_report_table(
+            capta_df, min_year, max_year
+        )
 
     def get_monthly_visitors(self):
         """Adds metadata columns to the cached DataFrame and returns it.
@@ -123,19 +351,57 @@ class NPSParkScraper(object):
         return_df = deepcopy(self._monthly_visitors)
         return_df['park_name'] = self.name
         return_df['park_type'] = self.park_type
-        return return_df
+        return apply_dtype_policy(return_df)
 
-    def scrape_monthly_use(self, park_url, min_year, max_year):
+    def scrape_monthly_use(
+            self,
+            park_url,
+            min_year,
+            max_year,
+            request_delay=1,
+            fetch_mode='html',
+    ):
         """Scrapes and caches usage information from the relevant NPS site.
 
         Args:
-            park_url (str): the URL for retrieving monthly visitor data
+            park_url (str): the URL for retrieving monthly visitor use data
             min_year (int): the earliest year of capta to retrieve
             max_year (int): the latest year of capta to retrieve
+            request_delay (float): seconds to wait after each request
+            fetch_mode (str): "csv" to request the report's CSV export,
+                falling back to scraping the HTML report if that fails, or
+                "html" to scrape the HTML report directly
 
         Raises:
+            TransientHTTPError: if a server error or rate limiting is
+                encountered
             ValueError: if no HTTP response is received
             KeyError: if no capta table can be located in the response
         """
-        # driver = webdriver.Chrome(ChromeDriverManager(path='.').install())
-        # TODO (WW): for another feature branch
+        capta_df = self._fetch_report(
+            park_url, request_delay, fetch_mode, _USE_REPORT_COLUMNS
+        )
+        # Rows without a recognizable month hold annual totals, which can
+        # always be recalculated
+        capta_df['Month'] = _month_numbers(capta_df['Month'])
+        capta_df = capta_df.dropna(subset=['Month'])
+        capta_df['Month'] = capta_df['Month'].astype('int8')
+        self._monthly_use = _clean_report_table(capta_df, min_year, max_year)
+
+    def get_monthly_use(self):
+        """Adds metadata columns to the cached DataFrame and returns it.
+
+        Returns:
+            pd.DataFrame: a DataFrame with columns ['Year', 'Month', ...,
+                'park_name', 'park_type'], with one column per category of
+                use
+
+        Raises:
+            AttributeError: if visitor use capta has not been scraped yet
+        """
+        if self._monthly_use is None:
+            raise AttributeError('Monthly visitor use has not been scraped')
+        return_df = deepcopy(self._monthly_use)
+        return_df['park_name'] = self.name
+        return_df['park_type'] = self.park_type
+        return apply_dtype_policy(return_df)
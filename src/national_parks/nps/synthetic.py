@@ -0,0 +1,133 @@
+"""Functionality for generating synthetic source capta, for testing the
+pipeline offline and at scales beyond that of the real National Parks Service
+capta.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ..utils.dtypes import apply_dtype_policy
+
+
+MONTH_COLUMNS = [
+    'JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+    'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'
+]
+# The categories of use reported in NPS visitor use reports
+USE_COLUMNS = [
+    'RecreationVisits', 'NonRecreationVisits', 'RecreationHours',
+    'NonRecreationHours', 'ConcessionerLodging', 'ConcessionerCamping',
+    'TentCampers', 'RVCampers', 'Backcountry', 'NonRecreationOvernightStays',
+    'MiscellaneousOvernightStays'
+]
+
+
+def generate_monthly_visitors(
+        n_parks,
+        min_year=1979,
+        max_year=2021,
+        park_types=('NP',),
+        ragged_share=0.3,
+        min_years_of_capta=5,
+        seed=0,
+):
+    """Generates synthetic monthly visitor counts with the same schema as the
+    capta written by NPSCaptaset.write_source_capta(). Each park's series is
+    the product of a base level, a compounding annual trend, a sinusoidal
+    seasonal cycle peaking in a random month, and multiplicative noise.
+
+    Args:
+        n_parks (int): the number of parks to generate
+        min_year (int): the earliest year of capta
+        max_year (int): the latest year of capta
+        park_types (Sequence[str]): park types from which each park's type is
+            drawn uniformly (repeat entries to weight them)
+        ragged_share (float): the share of parks whose capta begin after
+            min_year, as if they were established later
+        min_years_of_capta (int): the minimum number of years of capta for
+            parks whose capta begin after min_year
+        seed (int): a seed for the random number generator
+
+    Returns:
+        pd.DataFrame: a DataFrame with columns ['Year', 'JAN', ..., 'DEC',
+            'park_name', 'park_type'] and one row per park and year
+    """
+    rng = np.random.default_rng(seed)
+    years = np.arange(min_year, max_year + 1)
+    n_years = len(years)
+    t = (np.arange(n_years * 12) / 12).reshape(n_years, 12)
+
+    # Park-level parameters, broadcast over a (park, year, month) grid
+    level = rng.lognormal(mean=10, sigma=1.5, size=(n_parks, 1, 1))
+    growth = rng.normal(0.01, 0.03, size=(n_parks, 1, 1))
+    amplitude = rng.uniform(0.1, 0.9, size=(n_parks, 1, 1))
+    peak_month = rng.normal(6.5, 1.5, size=(n_parks, 1, 1))
+    noise_scale = rng.uniform(0.05, 0.3, size=(n_parks, 1, 1))
+    month = np.arange(12)
+    seasonality = 1 + amplitude * np.cos(2 * np.pi * (month - peak_month) / 12)
+    noise = rng.lognormal(
+        mean=0, sigma=noise_scale, size=(n_parks, n_years, 12)
+    )
+    visitors = np.round(level * (1 + growth) ** t * seasonality * noise)
+
+    # Some parks are only "established" partway through the date range
+    last_start = max(min_year, max_year - min_years_of_capta + 1)
+    start_years = np.where(
+        rng.random(n_parks) < ragged_share,
+        rng.integers(min_year, last_start + 1, size=n_parks),
+        min_year
+    )
+    keep = (years[None, :] >= start_years[:, None]).ravel()
+
+    df = pd.DataFrame(
+        visitors.reshape(n_parks * n_years, 12)[keep].astype(np.int64),
+        columns=MONTH_COLUMNS
+    )
+    df.insert(0, 'Year', np.tile(years, n_parks)[keep])
+    codes = np.array([f'S{i:05d}' for i in range(n_parks)])
+    df['park_name'] = np.repeat(codes, n_years)[keep]
+    df['park_type'] = np.repeat(
+        rng.choice(np.asarray(park_types), size=n_parks), n_years
+    )[keep]
+    return apply_dtype_policy(df)
+
+
+def generate_monthly_use(visitors_df, seed=0):
+    """Generates synthetic monthly visitor use consistent with synthetic
+    monthly visitor counts, with the same schema as the capta written by
+    NPSCaptaset.write_source_capta(). Recreation visits equal the visitor
+    counts, and every other category of use is a park-specific share (or, for
+    hours, multiple) of them.
+
+    Args:
+        visitors_df (pd.DataFrame): a DataFrame as produced by
+            generate_monthly_visitors()
+        seed (int): a seed for the random number generator
+
+    Returns:
+        pd.DataFrame: a DataFrame with columns ['Year', 'Month',
+            'RecreationVisits', ..., 'park_name', 'park_type'] and one row per
+            park, year, and month
+    """
+    rng = np.random.default_rng(seed)
+    visits = visitors_df[MONTH_COLUMNS].to_numpy(dtype=np.float64).ravel()
+    n_rows = len(visitors_df)
+    park_codes = visitors_df['park_name'].astype('category').cat.codes
+    park_idx = np.repeat(park_codes.to_numpy(), 12)
+    n_parks = park_idx.max() + 1 if n_rows else 0
+
+    # Ratios of each category of use to recreation visits, drawn per park
+    ratios = np.column_stack([
+        np.ones(n_parks),
+        rng.uniform(0, 0.2, n_parks),
+        rng.uniform(2, 8, n_parks),
+        rng.uniform(0, 0.5, n_parks),
+    ] + [rng.uniform(0, 0.05, n_parks) for _ in USE_COLUMNS[4:]])
+    use = np.round(visits[:, None] * ratios[park_idx]).astype(np.int64)
+
+    df = pd.DataFrame(use, columns=USE_COLUMNS)
+    df.insert(0, 'Year', np.repeat(visitors_df['Year'].to_numpy(), 12))
+    df.insert(1, 'Month', np.tile(np.arange(1, 13, dtype=np.int8), n_rows))
+    df['park_name'] = np.repeat(visitors_df['park_name'].to_numpy(), 12)
+    df['park_type'] = np.repeat(visitors_df['park_type'].to_numpy(), 12)
+    return apply_dtype_policy(df)
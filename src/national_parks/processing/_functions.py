@@ -2,9 +2,16 @@
 Transformation class.
 """
 
+import numpy as np
 import pandas as pd
 
 
+_MONTH_MAP = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+
 def columns_to_lowercase(df):
     """Changes all column names in a DataFrame to lowercase.
 
@@ -41,11 +48,7 @@ def create_dt_pk(df, year_col, month_col, day_col=None):
     df = df.rename(
         columns={year_col: 'year', month_col: 'month', day_col: 'day'}
     )
-    month_map = {
-        'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-        'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-    }
-    df['month'] = df['month'].replace(month_map)
+    df['month'] = df['month'].replace(_MONTH_MAP)
     df['dt_pk'] = pd.to_datetime(df[['year', 'month', 'day']])
     return df.drop(columns=['year', 'month', 'day'])
 
@@ -55,6 +58,128 @@ def identity(df):
     return df
 
 
+def pivot_monthly_grid(df, columns, year_col='year', sum_duplicates=False):
+    """Reshapes a "wide" year x month grid (one row per series and year, one
+    column per month) directly into a time series DataFrame indexed by "dt_pk",
+    with one column per unique value of the indicated column. This is
+    equivalent to melting the grid, creating "dt_pk", (optionally) summing
+    duplicates, and pivoting, but avoids materializing the tall intermediate.
+
+    Args:
+        df (pd.DataFrame): a DataFrame with a year column and one column per
+            month, named with three-letter strings (case-insensitive)
+        columns (str): the name of the column whose values should become the
+            columns of the output (e.g., "park_name")
+        year_col (str): the name of the column containing years
+        sum_duplicates (bool): whether to sum rows sharing the same value of
+            columns and year_col (as with sum_by), rather than raising an error
+            (as with pd.pivot)
+
+    Returns:
+        pd.DataFrame: a transformed copy of df
+
+    Raises:
+        ValueError: if duplicate entries are found and sum_duplicates is False
+    """
+    month_cols = sorted(
+        [c for c in df.columns if str(c).lower() in _MONTH_MAP],
+        key=lambda c: _MONTH_MAP[str(c).lower()]
+    )
+    if len(month_cols) != 12:
+        raise ValueError('Expected exactly one column per month')
+    years = df[year_col].to_numpy(dtype=np.int64)
+    min_year = years.min()
+    n_years = years.max() - min_year + 1
+    col_codes, col_values = pd.factorize(df[columns], sort=True)
+    grid = df[month_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # Each input row fills twelve consecutive rows of the output, so the
+    # target row of every cell is just an offset from the row's year
+    row_starts = (years - min_year) * 12
+    target_rows = (row_starts[:, None] + np.arange(12)).ravel()
+    target_cols = np.repeat(col_codes, 12)
+    out_shape = (n_years * 12, len(col_values))
+    counts = np.zeros(out_shape, dtype=np.int64)
+    np.add.at(counts, (target_rows, target_cols), 1)
+    if sum_duplicates:
+        # NaNs are treated as zeros when summing, matching pandas groupby
+        values = np.zeros(out_shape, dtype=np.float64)
+        np.add.at(
+            values, (target_rows, target_cols), np.nan_to_num(grid.ravel())
+        )
+        values[counts == 0] = np.nan
+    else:
+        if (counts > 1).any():
+            raise ValueError('Index contains duplicate entries, cannot pivot')
+        values = np.full(out_shape, np.nan)
+        values[target_rows, target_cols] = grid.ravel()
+
+    # Only retain years actually present in the input, as pd.pivot would
+    present_years = np.zeros(n_years, dtype=bool)
+    present_years[years - min_year] = True
+    present_rows = np.repeat(present_years, 12)
+    values = values[present_rows]
+    dt_pk = pd.period_range(
+        start=f'{min_year}-01', periods=n_years * 12, freq='M'
+    )[present_rows]
+    out_df = pd.DataFrame(
+        values,
+        index=pd.DatetimeIndex(dt_pk.to_timestamp(how='start'), name='dt_pk'),
+        columns=pd.Index(np.asarray(col_values), name=columns)
+    )
+    # Preserve integer counts, provided either that the source dtype can hold
+    # missing values or that the reshape introduced none
+    month_dtypes = df[month_cols].dtypes
+    source_dtype = month_dtypes.iloc[0]
+    if (
+        (month_dtypes == source_dtype).all()
+        and pd.api.types.is_integer_dtype(source_dtype)
+        and (
+            pd.api.types.is_extension_array_dtype(source_dtype)
+            or not np.isnan(values).any()
+        )
+    ):
+        if sum_duplicates:
+            # Sums (e.g., over every park of a type) may overflow the source
+            # dtype, so they are held at full width
+            source_dtype = (
+                'Int64' if pd.api.types.is_extension_array_dtype(source_dtype)
+                else 'int64'
+            )
+        out_df = out_df.astype(source_dtype)
+    return out_df
+
+
+def pivot_variables(df, index, columns, values=None, sep='_'):
+    """Pivots several variables from tall to wide format at once, naming each
+    new column for a value of the indicated column and a variable (e.g., the
+    "TAVG" of park "YELL" becomes "YELL_TAVG"), so that every series's
+    variables can be told apart in a single flat table.
+
+    Args:
+        df (pd.DataFrame): a DataFrame
+        index (str): the column whose values should become the index
+        columns (str): the column whose values should prefix the new columns
+        values (list): the variables to pivot, defaulting to every column
+            other than index and columns
+        sep (str): the separator between each value of columns and variable
+
+    Returns:
+        pd.DataFrame: a transformed copy of df, with its columns sorted
+
+    Raises:
+        ValueError: if any pair of index and columns values is duplicated
+    """
+    if values is None:
+        values = [c for c in df.columns if c not in (index, columns)]
+    # Categorical columns would otherwise yield a column for every category,
+    # whether or not it occurs
+    df = df.assign(**{columns: df[columns].astype(str)})
+    out_df = df.pivot(index=index, columns=columns, values=list(values))
+    out_df.columns = [f'{c}{sep}{v}' for v, c in out_df.columns]
+    return out_df.sort_index(axis=1)
+
+
 def sum_by(df, by, summands):
     """Wrapper function for summing columns via pandas groupby.
 
@@ -69,4 +194,7 @@ def sum_by(df, by, summands):
     """
     list_by = [b for b in by]
     list_summands = [s for s in summands]
-    return df.groupby(by=list_by, as_index=False)[list_summands].sum()
+    # Only observed combinations of categorical groupers should be retained
+    return df.groupby(by=list_by, as_index=False, observed=True)[
+        list_summands
+    ].sum()
@@ -0,0 +1,220 @@
+"""Helper module for managing the Polars implementations of the user-defined
+functions associated with the LazyTransformation class. Each function mirrors
+its pandas counterpart in _functions.py, but takes and returns a
+pl.LazyFrame so that an entire processing step can be optimized and executed
+as a single query plan (save for pivots, whose output schemas depend on the
+capta and which therefore collect the plan upstream of them).
+"""
+
+import polars as pl
+
+from ._functions import _MONTH_MAP
+
+
+def columns_to_lowercase(lf):
+    """Changes all column names in a LazyFrame to lowercase.
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame
+
+    Returns:
+        pl.LazyFrame: a transformed lf
+    """
+    return lf.rename({c: c.lower() for c in lf.collect_schema().names()})
+
+
+def _month_expr(lf, month_col):
+    """Helper function to build an expression yielding numeric months from a
+    column that may contain either numbers (1-12) or three-letter strings.
+    """
+    month = pl.col(month_col)
+    if lf.collect_schema()[month_col] == pl.String:
+        month = month.str.to_lowercase().replace_strict(
+            _MONTH_MAP, return_dtype=pl.Int32
+        )
+    return month
+
+
+def create_dt_pk(lf, year_col, month_col, day_col=None):
+    """Consolidates component time columns into a single datetime column named
+    "dt_pk" and drops the original columns (see _functions.create_dt_pk).
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame
+        year_col (str): the name of a column containing years
+        month_col (str): the name of a column containing months - can be either
+            numeric (1-12) or three-letter strings
+        day_col (str): the name of a column containing days
+
+    Returns:
+        pl.LazyFrame: a transformed lf
+    """
+    day = pl.col(day_col) if day_col is not None else pl.lit(1)
+    dt_pk = pl.date(pl.col(year_col), _month_expr(lf, month_col), day)
+    drop_cols = [c for c in (year_col, month_col, day_col) if c is not None]
+    return (
+        lf.with_columns(dt_pk.cast(pl.Datetime('ns')).alias('dt_pk'))
+        .drop(drop_cols)
+    )
+
+
+def identity(lf):
+    """Identity transformation to call if nothing else is needed."""
+    return lf
+
+
+def melt(lf, id_vars=None, value_vars=None, var_name=None, value_name=None):
+    """Unpivots a LazyFrame from wide to tall format, accepting the same
+    keyword arguments as pd.melt.
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame
+        id_vars (list): columns to use as identifier variables
+        value_vars (list): columns to unpivot, defaults to all columns not in
+            id_vars
+        var_name (str): the name to use for the variable column
+        value_name (str): the name to use for the value column
+
+    Returns:
+        pl.LazyFrame: a transformed lf
+    """
+    return lf.unpivot(
+        on=[v for v in value_vars] if value_vars is not None else None,
+        index=[i for i in id_vars] if id_vars is not None else None,
+        variable_name=var_name,
+        value_name=value_name
+    )
+
+
+def pivot(lf, index, columns, values):
+    """Pivots a LazyFrame from tall to wide format, accepting the same keyword
+    arguments as pd.pivot. Since the output schema depends on the capta, the
+    query plan is collected (once) at this boundary and pivoted with
+    pl.DataFrame.pivot; the result starts a new lazy query plan.
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame
+        index (str): the column whose values should become the index
+        columns (str): the column whose values should become new columns
+        values (str): the column whose values should populate the new columns
+
+    Returns:
+        pl.LazyFrame: a transformed lf
+
+    Raises:
+        ValueError: if any pair of index and columns values is duplicated
+    """
+    df = lf.select([index, columns, values]).collect()
+    if df.select(pl.struct([index, columns]).is_duplicated().any()).item():
+        raise ValueError('Index contains duplicate entries, cannot pivot')
+    return (
+        df.pivot(on=columns, index=index, values=values, sort_columns=True)
+        .sort(index)
+        .lazy()
+    )
+
+
+def pivot_monthly_grid(lf, columns, year_col='year', sum_duplicates=False):
+    """Reshapes a "wide" year x month grid directly into a time series with
+    one column per unique value of the indicated column (see
+    _functions.pivot_monthly_grid).
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame with a year column and one column per
+            month, named with three-letter strings (case-insensitive)
+        columns (str): the name of the column whose values should become the
+            columns of the output (e.g., "park_name")
+        year_col (str): the name of the column containing years
+        sum_duplicates (bool): whether to sum rows sharing the same value of
+            columns and year_col
+
+    Returns:
+        pl.LazyFrame: a transformed lf
+    """
+    month_cols = [
+        c for c in lf.collect_schema().names() if c.lower() in _MONTH_MAP
+    ]
+    if len(month_cols) != 12:
+        raise ValueError('Expected exactly one column per month')
+    lf = lf.select([columns, year_col] + month_cols)
+    lf = melt(
+        lf,
+        id_vars=[columns, year_col],
+        value_vars=month_cols,
+        var_name='month',
+        value_name='values'
+    )
+    lf = create_dt_pk(lf, year_col=year_col, month_col='month')
+    if sum_duplicates:
+        # Sums (e.g., over every park of a type) may overflow the source
+        # dtype, so they are held at full width, as in the pandas
+        # implementation
+        dtype = lf.collect_schema()['values']
+        full_width = pl.Int64 if dtype.is_integer() else pl.Float64
+        lf = sum_by(
+            lf.with_columns(pl.col('values').cast(full_width)),
+            by=[columns, 'dt_pk'],
+            summands=['values']
+        )
+    return pivot(lf, index='dt_pk', columns=columns, values='values')
+
+
+def pivot_variables(lf, index, columns, values=None, sep='_'):
+    """Pivots several variables from tall to wide format at once (see
+    _functions.pivot_variables). The variables are unpivoted into one column
+    of values, keyed on the name of each new column, which is then pivoted as
+    with pivot().
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame
+        index (str): the column whose values should become the index
+        columns (str): the column whose values should prefix the new columns
+        values (list): the variables to pivot, defaulting to every column
+            other than index and columns
+        sep (str): the separator between each value of columns and variable
+
+    Returns:
+        pl.LazyFrame: a transformed lf, with its columns sorted
+
+    Raises:
+        ValueError: if any pair of index and columns values is duplicated
+    """
+    if values is None:
+        values = [
+            c for c in lf.collect_schema().names() if c not in (index, columns)
+        ]
+    lf = lf.unpivot(
+        on=[v for v in values],
+        index=[index, columns],
+        variable_name='variable',
+        value_name='values'
+    ).select([
+        pl.col(index),
+        pl.concat_str([
+            pl.col(columns).cast(pl.Utf8), pl.lit(sep), pl.col('variable')
+        ]).alias('column'),
+        pl.col('values').cast(pl.Float64),
+    ])
+    return pivot(lf, index=index, columns='column', values='values')
+
+
+def sum_by(lf, by, summands):
+    """Sums columns within groups (see _functions.sum_by). As with pandas
+    groupby, nulls are treated as zeros.
+
+    Args:
+        lf (pl.LazyFrame): a LazyFrame
+        by (list): a list of column by which to group lf
+        summands (list): a list of columns that should be aggregated by
+            summation
+
+    Returns:
+        pl.LazyFrame: a transformed lf
+    """
+    list_by = [b for b in by]
+    list_summands = [s for s in summands]
+    return (
+        lf.group_by(list_by)
+        .agg(pl.col(list_summands).sum())
+        .sort(list_by)
+    )
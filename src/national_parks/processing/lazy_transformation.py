@@ -0,0 +1,67 @@
+"""Class for managing transformations to source capta with a lazy Polars
+execution engine. Mirrors the Transformation class, except that all "helper
+functions" must take a pl.LazyFrame as their first argument and return a
+transformed pl.LazyFrame. Polars is only required if this engine is selected,
+so this module is deliberately not imported by the package's __init__.
+"""
+
+import inspect
+
+from ._lazy_functions import (
+    columns_to_lowercase, create_dt_pk, identity, melt, pivot,
+    pivot_monthly_grid, pivot_variables, sum_by
+)
+
+
+class LazyTransformation(object):
+    """Object for managing lazy transformations in a configurable manner.
+
+    Attributes:
+        name (str): the name of the transformation
+        params (dict): keyword arguments to be passed to the transformation
+    """
+
+    def __init__(self, name, params=None):
+        _allowable_transformations = {
+            'columns_to_lowercase': columns_to_lowercase,
+            'create_dt_pk': create_dt_pk,
+            'identity': identity,
+            'melt': melt,
+            'pivot': pivot,
+            'pivot_monthly_grid': pivot_monthly_grid,
+            'pivot_variables': pivot_variables,
+            'sum_by': sum_by
+        }
+        if name not in _allowable_transformations:
+            raise NotImplementedError(f'Unimplemented transformation {name}')
+        self.name = name
+        self._func = _allowable_transformations[name]
+        self.params = params
+
+    def check_params(self):
+        """Checks that the transformation's params can be passed to its
+        helper function, without transforming anything.
+
+        Raises:
+            TypeError: if the params don't match the helper function's
+                signature
+        """
+        try:
+            inspect.signature(self._func).bind(None, **(self.params or {}))
+        except TypeError as e:
+            raise TypeError(
+                f'Invalid params for transformation {self.name} - {e}'
+            ) from None
+
+    def transform(self, lf):
+        """Adds a transformation to a LazyFrame's query plan.
+
+        Args:
+            lf (pl.LazyFrame): a LazyFrame
+
+        Returns:
+            pl.LazyFrame: a transformed lf
+        """
+        if self.params is not None:
+            return self._func(lf, **self.params)
+        return self._func(lf)
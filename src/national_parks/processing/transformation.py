@@ -3,9 +3,14 @@ functions" must take a DataFrame as their first argument and return a
 transformed copy of that DataFrame.
 """
 
+import inspect
+
 import pandas as pd
 
-from ._functions import columns_to_lowercase, create_dt_pk, identity, sum_by
+from ._functions import (
+    columns_to_lowercase, create_dt_pk, identity, pivot_monthly_grid,
+    pivot_variables, sum_by
+)
 
 
 class Transformation(object):
@@ -23,6 +28,8 @@ class Transformation(object):
             'identity': identity,
             'melt': pd.melt,
             'pivot': pd.pivot,
+            'pivot_monthly_grid': pivot_monthly_grid,
+            'pivot_variables': pivot_variables,
             'sum_by': sum_by
         }
         if name not in _allowable_transformations:
@@ -31,6 +38,21 @@ class Transformation(object):
         self._func = _allowable_transformations[name]
         self.params = params
 
+    def check_params(self):
+        """Checks that the transformation's params can be passed to its
+        helper function, without transforming anything.
+
+        Raises:
+            TypeError: if the params don't match the helper function's
+                signature
+        """
+        try:
+            inspect.signature(self._func).bind(None, **(self.params or {}))
+        except TypeError as e:
+            raise TypeError(
+                f'Invalid params for transformation {self.name} - {e}'
+            ) from None
+
     def transform(self, df):
         """Transforms a DataFrame.
 
@@ -0,0 +1,34 @@
+"""Utility functions for the command line interfaces of the driver scripts."""
+
+
+def expand_flags(argv, flags):
+    """Translates command line flags into the Hydra overrides for which they
+    stand, since Hydra itself only accepts overrides. A flag whose override
+    contains "{}" takes a value (e.g., "--shard 0/4" or "--shard=0/4"),
+    which is substituted into it.
+
+    Args:
+        argv (list): command line arguments
+        flags (Dict[str, str]): the override for which each flag stands
+            (e.g., {"--resume": "train_models.resume=true"})
+
+    Returns:
+        list: argv, with every flag replaced by its override
+
+    Raises:
+        ValueError: if a flag that takes a value is missing one
+    """
+    expanded = []
+    args = iter(argv)
+    for arg in args:
+        flag, _, value = arg.partition('=')
+        if flag not in flags or (value and '{}' not in flags[flag]):
+            expanded.append(arg)
+        elif '{}' in flags[flag]:
+            value = value or next(args, None)
+            if not value:
+                raise ValueError(f'{flag} requires a value')
+            expanded.append(flags[flag].format(value))
+        else:
+            expanded.append(flags[flag])
+    return expanded
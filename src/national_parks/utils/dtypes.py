@@ -0,0 +1,104 @@
+"""Utility functions for applying a consistent, memory-efficient dtype policy
+to capta as they move through the pipeline. The policy is keyed on column
+names, so it can be applied to source capta (one row per park and year) and
+processed capta (one column per time series) alike:
+    * park codes and park types are categorical
+    * years are int16
+    * visitor counts (month columns, "visitors", and visitor use categories)
+        are nullable Int32, so that missing values no longer force a float64
+        representation
+    * "dt_pk" (whether a column or the index) is a monthly period
+Other columns (e.g., the time series of processed capta, which may hold
+aggregates or non-integer values) are left as they are.
+"""
+
+import logging
+
+import pandas as pd
+
+
+_CATEGORICAL_COLS = {'park_name', 'park_type'}
+_YEAR_COLS = {'year'}
+_COUNT_COLS = {
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+    'jul', 'aug', 'sep', 'oct', 'nov', 'dec', 'visitors',
+    # Visitor use categories
+    'recreationvisits', 'nonrecreationvisits', 'recreationhours',
+    'nonrecreationhours', 'concessionerlodging', 'concessionercamping',
+    'tentcampers', 'rvcampers', 'backcountry', 'nonrecreationovernightstays',
+    'miscellaneousovernightstays'
+}
+_DT_COL = 'dt_pk'
+_DT_FREQ = 'M'
+
+
+def _to_period(values):
+    """Helper function to convert datetime-parsable values to monthly periods.
+    """
+    if isinstance(values.dtype, pd.PeriodDtype):
+        return values
+    return pd.PeriodIndex(pd.to_datetime(values), freq=_DT_FREQ)
+
+
+def memory_usage(df):
+    """Returns the total memory used by a DataFrame, including its index and
+    the contents of any object columns.
+
+    Args:
+        df (pd.DataFrame): a DataFrame
+
+    Returns:
+        int: the memory usage of df in bytes
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def count_columns(columns):
+    """Returns those of a captaset's columns that the policy holds visitor
+    counts of a known category (e.g., month columns of source capta), for
+    engines that cannot apply the policy itself.
+
+    Args:
+        columns (Iterable[str]): the names of the columns
+
+    Returns:
+        List[str]: the names of the count columns
+    """
+    return [c for c in columns if str(c).lower() in _COUNT_COLS]
+
+
+def apply_dtype_policy(df, name=None):
+    """Casts the columns (and "dt_pk" index, if present) of a DataFrame
+    according to the pipeline's dtype policy.
+
+    Args:
+        df (pd.DataFrame): a DataFrame
+        name (str): if present, the savings attained are logged under this name
+
+    Returns:
+        pd.DataFrame: a transformed copy of df
+    """
+    before = memory_usage(df) if name is not None else None
+    dtypes = {}
+    for c in df.columns:
+        lc = str(c).lower()
+        if lc in _CATEGORICAL_COLS:
+            dtypes[c] = 'category'
+        elif lc in _YEAR_COLS:
+            dtypes[c] = 'int16'
+        elif lc in _COUNT_COLS:
+            dtypes[c] = 'Int32'
+    df = df.astype(dtypes)
+    if _DT_COL in df.columns:
+        df[_DT_COL] = _to_period(df[_DT_COL])
+    elif df.index.name == _DT_COL:
+        df.index = _to_period(df.index).rename(_DT_COL)
+
+    if name is not None:
+        after = memory_usage(df)
+        logging.info(
+            f'Memory usage of {name}: {before / 2**20:.2f} MiB -> '
+            + f'{after / 2**20:.2f} MiB '
+            + f'({1 - after / max(before, 1):.1%} saved)'
+        )
+    return df
@@ -1,16 +1,22 @@
 """Utility functions for IO operations related to capta and configs."""
 
+from contextlib import contextmanager
+import glob
 import os
+import shutil
+import tempfile
 from typing import Dict
 
 from hydra.utils import to_absolute_path
 from omegaconf import DictConfig, ListConfig, OmegaConf
 import pandas as pd
 
+from .ragged import RaggedSeries
 
-def create_model_output_dirs(name, outputs_subdir=None):
-    """Helper function to get and create output directories for models and
-    plots associated with a single modeling effort.
+
+def get_model_output_dirs(name, outputs_subdir=None):
+    """Helper function to get (but not create) output directories for models
+    and plots associated with a single modeling effort.
 
     Args:
         name (str): the name of the modeling effort
@@ -27,27 +33,146 @@ def create_model_output_dirs(name, outputs_subdir=None):
     else:
         model_output_path = os.path.join('models', name)
         plots_output_path = os.path.join('plots', name)
-    model_output_path = to_absolute_path(model_output_path)
-    plots_output_path = to_absolute_path(plots_output_path)
-    for p in (model_output_path, plots_output_path):
+    return to_absolute_path(model_output_path), to_absolute_path(
+        plots_output_path
+    )
+
+
+def create_model_output_dirs(name, outputs_subdir=None):
+    """Helper function to get and create output directories for models and
+    plots associated with a single modeling effort.
+
+    Args:
+        name (str): the name of the modeling effort
+        outputs_subdir (str): an optional subdirectory inside of models/ and
+            plots/ in which the other directories should be placed
+
+    Returns:
+        Tuple[str, str]: the (absolute) paths of the output directories in
+            models/ and plots/, respectively
+    """
+    output_paths = get_model_output_dirs(name, outputs_subdir=outputs_subdir)
+    for p in output_paths:
         os.makedirs(p, exist_ok=True)
-    return model_output_path, plots_output_path
+    return output_paths
+
+
+@contextmanager
+def staged_model_output_dirs(name, outputs_subdir=None, reuse_plots=False):
+    """Context manager providing temporary output directories for a single
+    modeling effort, which take the place of its directories in models/ and
+    plots/ only once the block completes. An effort that raises or is killed
+    part way through thus never leaves partial artifacts in place of its
+    outputs (nor alongside them, since any staging directories abandoned by
+    a killed effort are removed the next time it is staged).
+
+    Args:
+        name (str): the name of the modeling effort
+        outputs_subdir (str): an optional subdirectory inside of models/ and
+            plots/ in which the other directories should be placed
+        reuse_plots (bool): whether the staging directory for plots/ should
+            start out with (hard links to) the effort's existing plots, so
+            that plots whose inputs haven't changed needn't be redrawn
+
+    Yields:
+        Tuple[str, str]: the (absolute) paths of the staging directories for
+            models/ and plots/, respectively
+    """
+    output_paths = get_model_output_dirs(name, outputs_subdir=outputs_subdir)
+    staging_paths = []
+    for p in output_paths:
+        parent = os.path.dirname(p)
+        os.makedirs(parent, exist_ok=True)
+        for abandoned in glob.glob(
+                os.path.join(parent, f'.partial-{glob.escape(name)}-*')
+        ):
+            shutil.rmtree(abandoned, ignore_errors=True)
+        staging_paths.append(
+            tempfile.mkdtemp(prefix=f'.partial-{name}-', dir=parent)
+        )
+    if reuse_plots and os.path.isdir(output_paths[1]):
+        for entry in os.scandir(output_paths[1]):
+            if not entry.is_file():
+                continue
+            staged_fp = os.path.join(staging_paths[1], entry.name)
+            try:
+                os.link(entry.path, staged_fp)
+            except OSError:
+                shutil.copy2(entry.path, staged_fp)
+    try:
+        yield tuple(staging_paths)
+    except BaseException:
+        for p in staging_paths:
+            shutil.rmtree(p, ignore_errors=True)
+        raise
+    # Renames within a directory are atomic, so each output directory is
+    # always either the previous or the new set of artifacts
+    for staging_path, output_path in zip(staging_paths, output_paths):
+        if os.path.isdir(output_path):
+            replaced = tempfile.mkdtemp(
+                prefix=f'.partial-{name}-', dir=os.path.dirname(output_path)
+            )
+            os.rename(output_path, os.path.join(replaced, name))
+            os.rename(staging_path, output_path)
+            shutil.rmtree(replaced, ignore_errors=True)
+        else:
+            os.rename(staging_path, output_path)
+
+
+def read_capta(path, usecols=None):
+    """Reads a captaset from disk, choosing a reader by file extension.
+
+    Args:
+        path (str): path relative to the national-parks working directory,
+            either a CSV or a RaggedSeries archive (".npz")
+        usecols (Sequence[str] | Callable): if given, only these columns (or
+            series), or those whose names the callable accepts, are read
+
+    Returns:
+        pd.DataFrame | RaggedSeries: the captaset
+    """
+    abs_path = to_absolute_path(path)
+    if abs_path.endswith('.npz'):
+        return RaggedSeries.load(abs_path, usecols=usecols)
+    return pd.read_csv(abs_path, usecols=usecols)
+
+
+def write_capta(df, path):
+    """Writes a captaset to disk, choosing a format by file extension.
+
+    Args:
+        df (pd.DataFrame): a DataFrame, which is stored as a RaggedSeries if
+            path ends in ".npz" (in which case it must be indexed by time and
+            contain one time series per column)
+        path (str): path relative to the national-parks working directory
+    """
+    abs_path = to_absolute_path(path)
+    if abs_path.endswith('.npz'):
+        RaggedSeries.from_dataframe(df).save(abs_path)
+    else:
+        df.to_csv(abs_path)
 
 
-def get_step_inputs(inputs_config):
-    """Retrieves and caches input DataFrames.
+def get_step_inputs(inputs_config, names=None, usecols=None):
+    """Retrieves and caches input captasets.
 
     Args:
         inputs_config (ListConfig): a list of objects with "name" and "path"
             attributes
+        names (Collection[str]): if given, only the input objects with these
+            names are read
+        usecols (Dict[str, Sequence[str] | Callable]): the columns to be read
+            (see read_capta()) of any input objects, keyed on name
 
     Returns:
-        Dict[str, pd.DataFrame]: a structure of the form {name: df} covering
-            all input objects
+        Dict[str, pd.DataFrame | RaggedSeries]: a structure of the form
+            {name: df} covering all (or all named) input objects
     """
+    usecols = usecols if usecols is not None else {}
     return {
-        item.name: pd.read_csv(to_absolute_path(item.path))
+        item.name: read_capta(item.path, usecols=usecols.get(item.name))
         for item in inputs_config
+        if names is None or item.name in names
     }
 
 
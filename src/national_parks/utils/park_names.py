@@ -51,6 +51,25 @@ def get_park_type(nps_park_name):
     return ' & '.join(park_types)
 
 
+def get_park_type_by_code(park_code):
+    """Returns the (abbreviated) park type(s) of a park identified by its code
+    (see get_park_type()).
+
+    Args:
+        park_code (str): an abbreviated park name (e.g., "ACAD")
+
+    Returns:
+        str: the abbreviated park type(s)
+
+    Raises:
+        KeyError: if the park code is not recognized
+    """
+    nps_park_name = _PARK_NAMES.get(park_code)
+    if nps_park_name is None:
+        raise KeyError(f'Unrecognized park code {park_code}')
+    return get_park_type(nps_park_name)
+
+
 def get_full_park_name(park_code):
     """Returns a human-legible full name for a park (e.g., "Acadia
     National Park").
@@ -133,3 +152,27 @@ def get_long_park_type(park_type_code):
             long_park_type = park_type_code.title()
 
     return long_park_type
+
+
+def in_selection(name, parks=None, park_types=None):
+    """Checks whether a series, named either for a park (by its code) or for a
+    park type, falls within a selection of parks and park types. A park falls
+    within it if it is selected itself or any of its types is, and a park
+    type (or pair of types, e.g., "NM & NPRES") if any of its types is.
+
+    Args:
+        name (str): a park code (e.g., "ACAD") or abbreviated park type(s)
+        parks (Collection[str]): the selected park codes, if any
+        park_types (Collection[str]): the selected abbreviated park types
+            (e.g., "NP"), if any
+
+    Returns:
+        bool
+    """
+    if parks and name in parks:
+        return True
+    if not park_types:
+        return False
+    if name in _PARK_NAMES:
+        name = get_park_type_by_code(name)
+    return any(t in park_types for t in name.split(' & '))
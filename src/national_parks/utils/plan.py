@@ -0,0 +1,143 @@
+"""Utility functions for planning a stage's run (see the --plan flag of each
+driver script) from the metrics of its past runs.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+
+class StageMetrics(object):
+    """The runtime and peak memory of a stage's most recent run (of each kind,
+    e.g., scraped or synthetic), along with the size of the capta that it
+    processed (in whatever units suit the stage), from which those of a
+    planned run are estimated in proportion to its size.
+
+    Attributes:
+        path (str): the path of the JSON file holding the metrics
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._started = time.perf_counter()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as fi:
+            return json.load(fi)
+
+    def record(self, size, kind='run'):
+        """Records the runtime (since the object was created) and peak memory
+        of the current run.
+
+        Args:
+            size (float): the size of the capta that the run processed
+            kind (str): the kind of run
+        """
+        metrics = self._read()
+        metrics[kind] = {
+            'seconds': time.perf_counter() - self._started,
+            'peak_bytes': peak_memory(),
+            'size': float(size),
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        partial_path = f'{self.path}.partial'
+        with open(partial_path, 'w') as fo:
+            json.dump(metrics, fo)
+        os.replace(partial_path, self.path)
+
+    def estimate(self, size, kind='run'):
+        """Estimates the runtime and peak memory of a run over capta of a
+        given size, scaling those of the most recent run of its kind linearly.
+
+        Args:
+            size (float): the size of the capta that the run will process
+            kind (str): the kind of run
+
+        Returns:
+            Tuple[float, float]: the estimated seconds and bytes, or Nones if
+                no run of the kind has been recorded
+        """
+        past = self._read().get(kind)
+        if past is None:
+            return None, None
+        scale = size / past['size'] if past['size'] else 1.0
+        return past['seconds'] * scale, past['peak_bytes'] * scale
+
+
+def peak_memory():
+    """Returns the peak resident memory of this process plus the largest peak
+    of any of its (finished) worker processes.
+
+    Returns:
+        int: the peak memory in bytes
+    """
+    peak = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss is reported in bytes on macOS but kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def check_config(stage, problems):
+    """Raises every problem found in a stage's configuration at once, so that
+    they can all be fixed before the stage is run.
+
+    Args:
+        stage (str): the name of the stage
+        problems (List[str]): descriptions of the problems found
+
+    Raises:
+        ValueError: if there are any problems
+    """
+    if problems:
+        raise ValueError(
+            f'Invalid configuration for {stage}:\n'
+            + '\n'.join(f'  - {p}' for p in problems)
+        )
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f'{hours}h {minutes:02d}m'
+    if minutes:
+        return f'{minutes}m {seconds:02d}s'
+    return f'{seconds}s'
+
+
+def _format_bytes(n_bytes):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if n_bytes < 1024:
+            return f'{n_bytes:,.1f} {unit}'
+        n_bytes /= 1024
+    return f'{n_bytes:,.1f} TB'
+
+
+def log_plan(stage, work, seconds=None, peak_bytes=None, basis=None):
+    """Logs a planned run's work and its estimated runtime and peak memory.
+
+    Args:
+        stage (str): the name of the stage
+        work (str): a description of the work to be done
+        seconds (float): the estimated runtime, if it can be estimated
+        peak_bytes (float): the estimated peak memory, if it can be estimated
+        basis (str): a description of how the estimates were reached
+    """
+    logging.info(f'Plan for {stage}: {work}')
+    logging.info(
+        f'  Estimated runtime: '
+        f'{_format_seconds(seconds) if seconds is not None else "unknown"}'
+    )
+    logging.info(
+        f'  Estimated peak memory: '
+        f'{_format_bytes(peak_bytes) if peak_bytes is not None else "unknown"}'
+    )
+    if basis is not None:
+        logging.info(f'  ({basis})')
@@ -0,0 +1,211 @@
+"""Class for compactly storing many time series of differing lengths."""
+
+import numpy as np
+import pandas as pd
+
+
+class RaggedSeries(object):
+    """A collection of regularly spaced time series, each of which may begin
+    and end at a different period, stored as one concatenated array of values
+    rather than as a NaN-padded DataFrame. Each series spans the periods from
+    its first to its last non-missing value; any missing values within that
+    span are retained (as NaNs) and counted.
+
+    Attributes:
+        names (np.ndarray): the name of each series
+        values (np.ndarray): the concatenated values of all series
+        offsets (np.ndarray): the position in values at which each series
+            begins
+        lengths (np.ndarray): the number of periods spanned by each series
+        starts (np.ndarray): the ordinal of the first period of each series
+        n_missing (np.ndarray): the number of missing values within each
+            series's span
+        freq (str): the frequency of every series's periods
+    """
+
+    def __init__(
+            self, names, values, offsets, lengths, starts, n_missing, freq='M'
+    ):
+        self.names = np.asarray(names, dtype=str)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.n_missing = np.asarray(n_missing, dtype=np.int64)
+        self.freq = freq
+        self._positions = {n: i for i, n in enumerate(self.names)}
+
+    @classmethod
+    def from_dataframe(cls, df, freq='M'):
+        """Builds a RaggedSeries from a DataFrame with one time series per
+        column and a regular, gapless datetime or period index.
+
+        Args:
+            df (pd.DataFrame): a DataFrame of time series
+            freq (str): the frequency of df's index
+
+        Returns:
+            RaggedSeries
+
+        Raises:
+            ValueError: if df's index is not regular at the given frequency
+        """
+        index = df.index
+        if not isinstance(index, pd.PeriodIndex):
+            index = pd.PeriodIndex(pd.to_datetime(index), freq=freq)
+        ordinals = index.astype('int64').to_numpy()
+        if len(ordinals) > 1 and (np.diff(ordinals) != 1).any():
+            raise ValueError('Index must be regular and sorted')
+
+        # Locate the first and last valid value in every column at once, so
+        # that the padding can be trimmed without scanning columns one by one
+        grid = df.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(grid)
+        any_valid = valid.any(axis=0)
+        first = valid.argmax(axis=0)
+        last = len(grid) - 1 - valid[::-1].argmax(axis=0)
+        lengths = np.where(any_valid, last - first + 1, 0)
+        rows = np.arange(len(grid))[:, None]
+        in_span = (rows >= first) & (rows <= last) & any_valid
+        # Transposing first concatenates the values column by column
+        values = grid.T[in_span.T]
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        starts = np.where(any_valid, ordinals[first], 0)
+        n_missing = (in_span & ~valid).sum(axis=0)
+        return cls(
+            names=[str(c) for c in df.columns],
+            values=values,
+            offsets=offsets,
+            lengths=lengths,
+            starts=starts,
+            n_missing=n_missing,
+            freq=freq
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def index_of(self, name):
+        """Returns the position of a series within the collection's arrays.
+
+        Args:
+            name (str): the name of a series
+
+        Returns:
+            int
+        """
+        return self._positions[name]
+
+    def __getitem__(self, name):
+        """Retrieves a single series without copying its values.
+
+        Args:
+            name (str): the name of a series
+
+        Returns:
+            pd.Series: the series, indexed by period and named name
+        """
+        i = self.index_of(name)
+        start, length = self.offsets[i], self.lengths[i]
+        index = pd.period_range(
+            start=pd.Period(ordinal=self.starts[i], freq=self.freq),
+            periods=length,
+            name='dt_pk'
+        )
+        return pd.Series(
+            self.values[start:start + length],
+            index=index,
+            name=name,
+            copy=False
+        )
+
+    def to_dataframe(self):
+        """Expands the collection into a NaN-padded DataFrame.
+
+        Returns:
+            pd.DataFrame: a DataFrame with one column per series
+        """
+        return pd.concat([self[n] for n in self.names], axis=1)
+
+    def save(self, path):
+        """Writes the collection to disk as an uncompressed NumPy archive.
+
+        Args:
+            path (str): the path of the archive, which should end in ".npz"
+        """
+        with open(path, 'wb') as fo:
+            np.savez(
+                fo,
+                names=self.names,
+                values=self.values,
+                offsets=self.offsets,
+                lengths=self.lengths,
+                starts=self.starts,
+                n_missing=self.n_missing,
+                freq=np.array(self.freq)
+            )
+
+    def select(self, names):
+        """Gathers a subset of the collection's series into a new collection.
+
+        Args:
+            names (Sequence[str]): the names of the series to keep, in the
+                order in which they should be kept
+
+        Returns:
+            RaggedSeries
+        """
+        positions = np.array(
+            [self.index_of(n) for n in names], dtype=np.int64
+        )
+        lengths = self.lengths[positions]
+        spans = [
+            np.arange(self.offsets[i], self.offsets[i] + self.lengths[i])
+            for i in positions
+        ]
+        return RaggedSeries(
+            names=self.names[positions],
+            values=self.values[
+                np.concatenate(spans) if spans else np.array([], np.int64)
+            ],
+            offsets=np.cumsum(lengths) - lengths,
+            lengths=lengths,
+            starts=self.starts[positions],
+            n_missing=self.n_missing[positions],
+            freq=self.freq
+        )
+
+    @classmethod
+    def load(cls, path, usecols=None):
+        """Reads a collection written by save().
+
+        Args:
+            path (str): the path of the archive
+            usecols (Sequence[str] | Callable): if given, only these series
+                (or, as with pd.read_csv(), those whose names the callable
+                accepts) are kept
+
+        Returns:
+            RaggedSeries
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            ragged = cls(
+                names=archive['names'],
+                values=archive['values'],
+                offsets=archive['offsets'],
+                lengths=archive['lengths'],
+                starts=archive['starts'],
+                n_missing=archive['n_missing'],
+                freq=str(archive['freq'])
+            )
+        if usecols is None:
+            return ragged
+        if not callable(usecols):
+            usecols = set(usecols).__contains__
+        return ragged.select([n for n in ragged.names if usecols(n)])
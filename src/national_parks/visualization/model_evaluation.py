@@ -7,9 +7,12 @@ from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error
 
 import plotnine as p9
 
-from .utils import get_full_series_name
+from .utils import (
+    get_full_series_name, skip_unchanged_plot, to_timestamp_index
+)
 
 
+@skip_unchanged_plot
 def plot_forecast(
         train_ts,
         test_ts,
@@ -32,7 +35,8 @@ def plot_forecast(
             in the training set to plot
         figure_size (tuple): the figure size
         fp (str): a path where the plot should be saved, if None then the plot
-            is drawn in stdout
+            is drawn in stdout (and the plot isn't redrawn if it was last
+            saved to fp from the same inputs)
 
     Returns:
         None
@@ -41,6 +45,8 @@ def plot_forecast(
     # All series and forecasts should refer to the same phenomenon, and should
     # thus have the same name
     ts_name = train_ts.name
+    train_ts = to_timestamp_index(train_ts)
+    test_ts = to_timestamp_index(test_ts)
     full_name = get_full_series_name(ts_name)
     mae = mean_absolute_error(test_ts, forecast)
     mape = mean_absolute_percentage_error(test_ts, forecast)
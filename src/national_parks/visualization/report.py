@@ -0,0 +1,348 @@
+"""Functionality for writing a recipe's forecasts to a single, self-contained
+HTML report. The capta for every series are embedded in the report as JSON
+and charted in the browser, so that a recipe's plots needn't be rendered (and
+written one image at a time) during training.
+"""
+
+import html
+import json
+import os
+from string import Template
+
+import numpy as np
+import pandas as pd
+
+from .utils import get_full_series_name
+
+
+# Charting relies only on the browser (no external scripts), so that reports
+# open offline, e.g., straight from the DVC cache
+_REPORT_TEMPLATE = Template('''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+  body { font-family: sans-serif; margin: 0; display: flex; height: 100vh; }
+  #sidebar { width: 30em; overflow-y: auto; border-right: 1px solid #ccc; }
+  #sidebar input { width: 95%; margin: 0.5em; padding: 0.25em; }
+  #main { flex: 1; padding: 1em; overflow-y: auto; }
+  table { border-collapse: collapse; width: 100%; font-size: 0.85em; }
+  th { cursor: pointer; background: #eee; position: sticky; top: 0; }
+  th, td { padding: 0.2em 0.5em; text-align: right; }
+  th:first-child, td:first-child { text-align: left; }
+  tr.selected { background: #d6e6f5; }
+  tbody tr { cursor: pointer; }
+  svg { width: 100%; height: 28em; }
+  .legend span { margin-right: 1.5em; }
+</style>
+</head>
+<body>
+<div id="sidebar">
+  <input id="filter" type="search" placeholder="Filter series">
+  <table>
+    <thead><tr id="header"></tr></thead>
+    <tbody id="rows"></tbody>
+  </table>
+</div>
+<div id="main">
+  <h2>$title</h2>
+  <h3 id="chart-title"></h3>
+  <svg id="chart" viewBox="0 0 1000 450" preserveAspectRatio="none"></svg>
+  <div class="legend">
+    <span style="color: #999">&#9644; train</span>
+    <span style="color: #222">&#9644; test</span>
+    <span style="color: #1f78b4">&#9644; forecast</span>
+    <span style="color: #a6cee3">&#9632; interval</span>
+  </div>
+</div>
+<script type="application/json" id="report-capta">$capta</script>
+<script>
+(function () {
+  var capta = JSON.parse(
+    document.getElementById('report-capta').textContent
+  );
+  var svgNS = 'http://www.w3.org/2000/svg';
+  var chart = document.getElementById('chart');
+  var rows = document.getElementById('rows');
+  var sortKey = 'label', sortAscending = true, selected = null;
+
+  function label(ordinal) {
+    return capta.periods.labels[ordinal - capta.periods.first];
+  }
+
+  function format(value) {
+    if (value === null || value === undefined) {
+      return '';
+    }
+    return typeof value === 'number' ?
+      value.toLocaleString(undefined, {maximumFractionDigits: 3}) : value;
+  }
+
+  // Metrics computed for the series, shown alongside their labels
+  function columns() {
+    return [['label', 'Series']].concat(capta.metrics.map(function (k) {
+      return [k, k.toUpperCase()];
+    }));
+  }
+
+  // Each series is drawn from arrays of values beginning at a given period
+  function points(values, start) {
+    var out = [];
+    for (var i = 0; i < values.length; i++) {
+      if (values[i] !== null) {
+        out.push([start + i, values[i]]);
+      }
+    }
+    return out;
+  }
+
+  function element(name, attributes) {
+    var el = document.createElementNS(svgNS, name);
+    for (var k in attributes) {
+      el.setAttribute(k, attributes[k]);
+    }
+    chart.appendChild(el);
+    return el;
+  }
+
+  function draw(series) {
+    while (chart.firstChild) {
+      chart.removeChild(chart.firstChild);
+    }
+    document.getElementById('chart-title').textContent = series.label + (
+      capta.metrics.length ? ' (' + capta.metrics.map(function (k) {
+        return k.toUpperCase() + ' = ' + format(series[k]);
+      }).join(', ') + ')' : ''
+    );
+    var lines = [
+      [points(series.history, series.history_start), '#999'],
+      [points(series.actual, series.test_start), '#222'],
+      [points(series.forecast, series.test_start), '#1f78b4']
+    ];
+    var band = points(series.lower, series.test_start).concat(
+      points(series.upper, series.test_start).reverse()
+    );
+    var all = band.slice();
+    lines.forEach(function (line) { all = all.concat(line[0]); });
+    if (!all.length) {
+      return;
+    }
+    var xs = all.map(function (p) { return p[0]; });
+    var ys = all.map(function (p) { return p[1]; });
+    var x0 = Math.min.apply(null, xs), x1 = Math.max.apply(null, xs);
+    var y0 = Math.min(0, Math.min.apply(null, ys));
+    var y1 = Math.max.apply(null, ys);
+    var left = 80, right = 980, top = 10, bottom = 410;
+    function sx(x) {
+      return left + (x - x0) / Math.max(x1 - x0, 1) * (right - left);
+    }
+    function sy(y) {
+      return bottom - (y - y0) / Math.max(y1 - y0, 1) * (bottom - top);
+    }
+    function path(pts) {
+      return pts.map(function (p) {
+        return sx(p[0]).toFixed(1) + ',' + sy(p[1]).toFixed(1);
+      }).join(' ');
+    }
+    element('line', {x1: left, x2: left, y1: top, y2: bottom, stroke: '#ccc'});
+    element('line', {
+      x1: left, x2: right, y1: bottom, y2: bottom, stroke: '#ccc'
+    });
+    for (var t = 0; t <= 4; t++) {
+      var y = y0 + (y1 - y0) * t / 4;
+      element('text', {
+        x: left - 5, y: sy(y) + 4, 'text-anchor': 'end', 'font-size': 12
+      }).textContent = Math.round(y).toLocaleString();
+      var x = Math.round(x0 + (x1 - x0) * t / 4);
+      element('text', {
+        x: sx(x), y: bottom + 20, 'text-anchor': 'middle', 'font-size': 12
+      }).textContent = label(x);
+    }
+    if (band.length) {
+      element('polygon', {points: path(band), fill: '#a6cee3', opacity: 0.6});
+    }
+    lines.forEach(function (line) {
+      if (line[0].length) {
+        element('polyline', {
+          points: path(line[0]), fill: 'none', stroke: line[1],
+          'stroke-width': 1.5
+        });
+      }
+    });
+  }
+
+  function render() {
+    var query = document.getElementById('filter').value.toLowerCase();
+    var shown = capta.series.filter(function (s) {
+      return (s.name + ' ' + s.label).toLowerCase().indexOf(query) >= 0;
+    });
+    shown.sort(function (a, b) {
+      var u = a[sortKey], v = b[sortKey];
+      // Series without a metric sort last in either direction
+      if (u === null || v === null) {
+        return (u === null) - (v === null);
+      }
+      return (u < v ? -1 : u > v ? 1 : 0) * (sortAscending ? 1 : -1);
+    });
+    rows.innerHTML = '';
+    shown.forEach(function (s) {
+      var row = document.createElement('tr');
+      columns().forEach(function (column) {
+        var cell = document.createElement('td');
+        cell.textContent = format(s[column[0]]);
+        row.appendChild(cell);
+      });
+      if (s === selected) {
+        row.className = 'selected';
+      }
+      row.onclick = function () {
+        selected = s;
+        draw(s);
+        render();
+      };
+      rows.appendChild(row);
+    });
+  }
+
+  columns().forEach(function (column) {
+    var th = document.createElement('th');
+    th.textContent = column[1];
+    th.onclick = function () {
+      sortAscending = column[0] === sortKey ? !sortAscending : true;
+      sortKey = column[0];
+      render();
+    };
+    document.getElementById('header').appendChild(th);
+  });
+  document.getElementById('filter').oninput = render;
+  if (capta.series.length) {
+    selected = capta.series[0];
+    draw(selected);
+  }
+  render();
+})();
+</script>
+</body>
+</html>
+''')
+
+
+def _compact(values, decimals=1):
+    """Helper function to round an array for embedding as JSON, with NaNs
+    (which JSON cannot represent) as nulls.
+    """
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def _metric(value):
+    """Helper function to convert a metric for embedding as JSON."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return None if not np.isfinite(value) else round(float(value), 5)
+
+
+def write_report(
+        forecasts,
+        fp,
+        title='Forecasts',
+        history=None,
+        train_limit=2,
+        metrics=None
+):
+    """Writes a single HTML file charting the test-set forecasts of every
+    series in a recipe, with a table of the series (and any metrics computed
+    for them) by which they can be sorted and filtered.
+
+    Args:
+        forecasts (Dict[str, pd.DataFrame]): each series's test-set forecasts,
+            indexed by period, with columns 'actual', 'forecast',
+            'lower_bound', and 'upper_bound' (see
+            national_parks.model._forecasts.read_forecast())
+        fp (str): the path where the report should be written
+        title (str): the report's title
+        history (pd.DataFrame | RaggedSeries): the series themselves, from
+            which the periods preceding each series's test set are charted
+        train_limit (numeric): if present, the product of this number and the
+            length of a series's test set will determine the maximum number
+            of periods preceding the test set to chart
+        metrics (pd.DataFrame): optional metrics for each series, with one row
+            per series named in its "series" column
+
+    Returns:
+        None
+    """
+    metric_names = (
+        [c for c in metrics.columns if c != 'series']
+        if metrics is not None else []
+    )
+    metric_rows = (
+        metrics.set_index('series')[metric_names].to_dict('index')
+        if metrics is not None else {}
+    )
+    series, ordinals = [], []
+    for name, df in forecasts.items():
+        test_start = df.index[0].ordinal
+        ordinals.extend([test_start, df.index[-1].ordinal])
+        history_values, history_start = [], test_start
+        if history is not None and name in history:
+            ts = history[name].dropna()
+            ts = ts[ts.index < df.index[0]]
+            if train_limit is not None:
+                ts = ts[-int(np.ceil(train_limit * len(df))):]
+            if len(ts):
+                # Any gaps are restored as nulls, so that values can be
+                # charted by their offset from the first period
+                history_start = ts.index[0].ordinal
+                history_values = _compact(ts.reindex(pd.period_range(
+                    start=ts.index[0], periods=test_start - history_start
+                )))
+                ordinals.append(history_start)
+        try:
+            label = get_full_series_name(name)
+        except KeyError:
+            label = name
+        series.append({
+            'name': name,
+            'label': label if label is not None else name,
+            'history_start': history_start,
+            'history': history_values,
+            'test_start': test_start,
+            'actual': _compact(df['actual']),
+            'forecast': _compact(df['forecast']),
+            'lower': _compact(df['lower_bound']),
+            'upper': _compact(df['upper_bound']),
+            **{
+                k: _metric(v)
+                for k, v in metric_rows.get(name, {}).items()
+            },
+        })
+
+    # Period labels are embedded once for the whole report rather than with
+    # every value
+    periods = {'first': 0, 'labels': []}
+    if ordinals:
+        first = min(ordinals)
+        periods = {
+            'first': first,
+            'labels': pd.period_range(
+                start=pd.Period(
+                    ordinal=first,
+                    freq=next(iter(forecasts.values())).index.freq
+                ),
+                periods=max(ordinals) - first + 1
+            ).astype(str).tolist(),
+        }
+    capta = json.dumps(
+        {'periods': periods, 'metrics': metric_names, 'series': series},
+        separators=(',', ':'),
+        allow_nan=False
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(fp)), exist_ok=True)
+    with open(fp, 'w') as fo:
+        fo.write(_REPORT_TEMPLATE.substitute(
+            title=html.escape(title),
+            # A closing tag inside the JSON would end its script element early
+            capta=capta.replace('</', '<\\/')
+        ))
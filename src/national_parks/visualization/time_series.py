@@ -9,9 +9,12 @@ from matplotlib.gridspec import GridSpec
 import matplotlib.pyplot as plt
 import plotnine as p9
 
-from .utils import get_full_series_name, ordinal
+from .utils import (
+    get_full_series_name, ordinal, skip_unchanged_plot, to_timestamp_index
+)
 
 
+@skip_unchanged_plot
 def plot_time_series(ts, rolling_window=None, figure_size=(12, 8), fp=None):
     """Plots a time series.
 
@@ -22,7 +25,8 @@ def plot_time_series(ts, rolling_window=None, figure_size=(12, 8), fp=None):
             plotted
         figure_size (tuple): the figure size
         fp (str): a path where the plot should be saved, if None then the plot
-            is drawn in stdout
+            is drawn in stdout (and the plot isn't redrawn if it was last
+            saved to fp from the same inputs)
 
     Returns:
         None
@@ -31,6 +35,7 @@ def plot_time_series(ts, rolling_window=None, figure_size=(12, 8), fp=None):
     # Coerce input to series if not already
     if not isinstance(ts, pd.Series):
         ts = pd.Series(ts, name='Time Series')
+    ts = to_timestamp_index(ts)
     ts_name = ts.name
     full_name = get_full_series_name(ts_name)
     ts_df = pd.DataFrame(ts)
@@ -75,6 +80,7 @@ def plot_time_series(ts, rolling_window=None, figure_size=(12, 8), fp=None):
         ts_plot.save(fp, verbose=False)
 
 
+@skip_unchanged_plot
 def plot_differenced_time_series(
         ts,
         lags=None,
@@ -100,7 +106,8 @@ def plot_differenced_time_series(
             None this will be calculated anew in the function
         figure_size (tuple): the figure size
         fp (str): a path where the plot should be saved, if None then the plot
-            is drawn in stdout
+            is drawn in stdout (and the plot isn't redrawn if it was last
+            saved to fp from the same inputs)
 
     Returns:
         None
@@ -109,6 +116,7 @@ def plot_differenced_time_series(
     # Coerce input to series if not already
     if not isinstance(ts, pd.Series):
         ts = pd.Series(ts, name='Time Series')
+    ts = to_timestamp_index(ts)
     ts_name = ts.name
     full_name = get_full_series_name(ts_name)
 
@@ -1,5 +1,12 @@
 """Utility functions for creating plots."""
 
+import functools
+import glob
+import hashlib
+from importlib.metadata import version
+import os
+
+import numpy as np
 import pandas as pd
 
 from ..utils.park_names import get_full_park_name, get_long_park_type
@@ -26,6 +33,107 @@ def get_full_series_name(series_name):
     return full_name
 
 
+def to_timestamp_index(ts):
+    """Converts a time series indexed by periods to one indexed by timestamps
+    (marking the start of each period), since plotnine cannot plot periods.
+
+    Args:
+        ts (pd.Series): a time series
+
+    Returns:
+        pd.Series: ts, or a copy of ts with a DatetimeIndex
+    """
+    if isinstance(ts.index, pd.PeriodIndex):
+        return ts.to_timestamp(how='start')
+    return ts
+
+
 def ordinal(n):
     suffixes = {1: 'st', 2: 'nd', 3: 'rd'}
     return str(n) + suffixes.get(4 if 11 <= n % 100 < 14 else n % 10, 'th')
+
+
+@functools.lru_cache(maxsize=None)
+def _plotting_version():
+    """Helper function to fingerprint the plotting code and libraries, on
+    which every plot depends as much as on its inputs.
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        f'{version("matplotlib")} {version("plotnine")}'.encode()
+    )
+    code_dir = os.path.dirname(__file__)
+    for path in sorted(glob.glob(os.path.join(code_dir, '*.py'))):
+        with open(path, 'rb') as fi:
+            digest.update(fi.read())
+    return digest.hexdigest()
+
+
+def _update_digest(digest, value):
+    """Helper function to add a plotting function's argument to a digest,
+    hashing arrays by their bytes (and the indexes of pandas objects by the
+    hashes of their values).
+    """
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        index = value.index
+        digest.update(str(index.dtype).encode())
+        _update_digest(digest, pd.util.hash_pandas_object(index).to_numpy())
+        digest.update(repr(
+            value.name if isinstance(value, pd.Series) else list(value.columns)
+        ).encode())
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype} {value.shape}'.encode())
+        digest.update(
+            np.ascontiguousarray(value).tobytes() if value.dtype != object
+            else repr(value.tolist()).encode()
+        )
+    else:
+        digest.update(repr(value).encode())
+
+
+def skip_unchanged_plot(plot_function):
+    """Decorator that skips rendering a plot to a file if that file already
+    holds a plot of the same inputs. Every argument (other than fp) is hashed,
+    along with the plotting code, and the hash is kept in a "{fp}.sha256"
+    sidecar. Plots are rendered to a temporary file that then replaces fp,
+    so an existing plot is never modified in place (e.g., if it is a hard
+    link to an earlier run's plot).
+
+    Args:
+        plot_function (Callable): a plotting function with an fp argument,
+            where the plot is drawn if fp is None
+
+    Returns:
+        Callable: the decorated function
+    """
+
+    @functools.wraps(plot_function)
+    def wrapper(*args, fp=None, **kwargs):
+        if fp is None:
+            return plot_function(*args, **kwargs)
+        digest = hashlib.sha256()
+        digest.update(
+            f'{plot_function.__qualname__} {_plotting_version()}'.encode()
+        )
+        for arg in args:
+            _update_digest(digest, arg)
+        for k in sorted(kwargs):
+            digest.update(k.encode())
+            _update_digest(digest, kwargs[k])
+        key = digest.hexdigest()
+        sidecar_fp = f'{fp}.sha256'
+        if os.path.exists(fp) and os.path.exists(sidecar_fp):
+            with open(sidecar_fp) as fi:
+                if fi.read() == key:
+                    return None
+        root, extension = os.path.splitext(fp)
+        partial_fp = f'{root}.partial{extension}'
+        plot_function(*args, fp=partial_fp, **kwargs)
+        os.replace(partial_fp, fp)
+        with open(f'{sidecar_fp}.partial', 'w') as fo:
+            fo.write(key)
+        os.replace(f'{sidecar_fp}.partial', sidecar_fp)
+        return None
+
+    return wrapper
@@ -0,0 +1,6 @@
+"""Package to manage classes and operations associated with weather source
+capta, curated during the refresh_source_capta DVC stage.
+"""
+
+from .captaset import WeatherCaptaset
+from .station_index import StationIndex
@@ -0,0 +1,227 @@
+"""Class for managing weather source capta, read from bulk station-level
+monthly climate files (e.g., NOAA's Global Summary of the Month, with one CSV
+per station and columns such as "STATION", "DATE", "LATITUDE", "LONGITUDE",
+"TAVG", and "PRCP").
+"""
+
+import glob
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from .station_index import StationIndex
+
+
+_STATION_COL = 'STATION'
+_DATE_COL = 'DATE'
+_LAT_COL = 'LATITUDE'
+_LON_COL = 'LONGITUDE'
+
+
+class WeatherCaptaset(object):
+    """Object for managing weather source capta. Each park is assigned its
+    nearest stations, and its monthly weather is the inverse-distance-weighted
+    mean of those stations' capta, so that the work done grows with the number
+    of parks and stations rather than with their product.
+
+    Attributes:
+        stations_dir (str): a directory of station-level monthly climate files
+        variables (list): the climate variables to retrieve (e.g., ["TAVG",
+            "PRCP"])
+        min_year (int): the earliest year of capta to retrieve
+        max_year (int): the latest year of capta to retrieve
+        n_stations (int): the number of stations to assign to each park
+        max_distance_km (float): the greatest distance at which a station may
+            be assigned to a park
+        chunksize (int): the number of rows of each file to hold in memory at
+            once
+        station_files (pd.DataFrame): the location of every station and the
+            file in which its capta are found, populated by index_stations()
+        assignments (pd.DataFrame): the stations assigned to every park, with
+            columns ['park_name', 'station', 'distance_km', 'weight'],
+            populated by assign_parks()
+    """
+
+    def __init__(
+            self,
+            stations_dir,
+            variables,
+            min_year,
+            max_year,
+            n_stations=3,
+            max_distance_km=100,
+            chunksize=100000,
+    ):
+        self.stations_dir = stations_dir
+        self.variables = list(variables)
+        self.min_year = min_year
+        self.max_year = max_year
+        self.n_stations = n_stations
+        self.max_distance_km = max_distance_km
+        self.chunksize = chunksize
+        self.station_files = None
+        self.assignments = None
+
+    def _paths(self):
+        return sorted(glob.glob(os.path.join(self.stations_dir, '*.csv')))
+
+    def index_stations(self):
+        """Streams the location columns of every file to record where each
+        station is and in which file its capta are found.
+
+        Raises:
+            FileNotFoundError: if no files are found in stations_dir
+        """
+        paths = self._paths()
+        if not len(paths):
+            raise FileNotFoundError(f'No capta found in {self.stations_dir}')
+        station_files = []
+        for path in paths:
+            for chunk in pd.read_csv(
+                    path,
+                    usecols=[_STATION_COL, _LAT_COL, _LON_COL],
+                    dtype={_STATION_COL: str},
+                    chunksize=self.chunksize,
+            ):
+                station_files.append(
+                    chunk.dropna().drop_duplicates(_STATION_COL).assign(
+                        path=path
+                    )
+                )
+        self.station_files = pd.concat(
+            station_files, ignore_index=True
+        ).drop_duplicates(_STATION_COL).rename(columns={
+            _STATION_COL: 'station',
+            _LAT_COL: 'latitude',
+            _LON_COL: 'longitude',
+        }).reset_index(drop=True)
+        logging.info(f'Indexed {len(self.station_files)} weather stations')
+
+    def assign_parks(self, park_locations):
+        """Assigns each park its nearest stations, weighting each station by
+        the inverse of its distance from the park.
+
+        Args:
+            park_locations (Mapping[str, Sequence[float]]): the latitude and
+                longitude of each park, keyed on the park's code
+        """
+        if self.station_files is None:
+            self.index_stations()
+        index = StationIndex(
+            self.station_files['station'],
+            self.station_files['latitude'],
+            self.station_files['longitude'],
+        )
+        parks = list(park_locations)
+        coords = np.array([park_locations[p] for p in parks], dtype=float)
+        positions, distances = index.query(
+            coords[:, 0],
+            coords[:, 1],
+            k=self.n_stations,
+            max_distance_km=self.max_distance_km
+        )
+        found = positions >= 0
+        assignments = pd.DataFrame({
+            'park_name': np.repeat(parks, positions.shape[1])[found.ravel()],
+            'station': index.stations[positions[found]],
+            'distance_km': distances[found],
+        })
+        # Stations effectively at a park shouldn't receive unbounded weight
+        assignments['weight'] = 1 / np.maximum(assignments['distance_km'], 1)
+        for park in sorted(set(parks) - set(assignments['park_name'])):
+            logging.info(f'No weather stations found near {park}')
+        self.assignments = assignments
+
+    def _stream_station_capta(self):
+        """Yields chunks of monthly capta from the assigned stations only,
+        skipping files without any assigned stations entirely.
+
+        Yields:
+            pd.DataFrame: a chunk with columns ['station', 'dt_pk', ...] and
+                one column per variable
+        """
+        assigned = set(self.assignments['station'])
+        paths = self.station_files.loc[
+            self.station_files['station'].isin(assigned), 'path'
+        ].unique()
+        for path in paths:
+            # Variables missing from a file (e.g., snowfall at tropical
+            # stations) are read as empty
+            available = pd.read_csv(path, nrows=0).columns
+            for chunk in pd.read_csv(
+                    path,
+                    usecols=[_STATION_COL, _DATE_COL] + [
+                        v for v in self.variables if v in available
+                    ],
+                    dtype={_STATION_COL: str},
+                    chunksize=self.chunksize,
+            ):
+                chunk = chunk[chunk[_STATION_COL].isin(assigned)]
+                dt_pk = pd.to_datetime(chunk[_DATE_COL])
+                chunk = chunk[dt_pk.dt.year.between(
+                    self.min_year, self.max_year
+                )]
+                yield chunk.rename(
+                    columns={_STATION_COL: 'station'}
+                ).assign(
+                    dt_pk=dt_pk.dt.to_period('M').dt.to_timestamp()
+                ).reindex(columns=['station', 'dt_pk'] + self.variables)
+
+    def collect_weather(self):
+        """Computes the weighted mean of each variable for every park and
+        month. Each chunk is reduced to weighted sums as soon as it is read,
+        and a station's weight only counts toward the months and variables
+        for which it has capta.
+
+        Returns:
+            pd.DataFrame: a DataFrame with columns ['dt_pk', 'park_name', ...]
+                and one column per variable
+        """
+        weights = self.assignments[['park_name', 'station', 'weight']]
+        weight_cols = [f'{v}_weight' for v in self.variables]
+        partials = []
+        for chunk in self._stream_station_capta():
+            joined = chunk.merge(weights, on='station')
+            values = joined[self.variables].to_numpy(dtype=np.float64)
+            has_value = ~np.isnan(values)
+            w = joined['weight'].to_numpy()[:, None] * has_value
+            sums = pd.DataFrame(
+                np.hstack([np.where(has_value, values, 0) * w, w]),
+                columns=self.variables + weight_cols
+            )
+            sums['park_name'] = joined['park_name'].to_numpy()
+            sums['dt_pk'] = joined['dt_pk'].to_numpy()
+            partials.append(sums.groupby(['dt_pk', 'park_name']).sum())
+        if not len(partials):
+            return pd.DataFrame(
+                columns=['dt_pk', 'park_name'] + self.variables
+            )
+        totals = pd.concat(partials).groupby(level=[0, 1]).sum()
+        # Months in which no station reported a variable are left missing
+        with np.errstate(invalid='ignore'):
+            weather = pd.DataFrame(
+                totals[self.variables].to_numpy()
+                / totals[weight_cols].to_numpy(),
+                index=totals.index,
+                columns=self.variables
+            )
+        return weather.astype(np.float32).reset_index().sort_values(
+            ['park_name', 'dt_pk'], ignore_index=True
+        )
+
+    def write_source_capta(self, weather_fp, park_locations):
+        """Assigns stations to parks and writes the parks' monthly weather.
+
+        Args:
+            weather_fp (str): the filepath where monthly weather capta should
+                be written
+            park_locations (Mapping[str, Sequence[float]]): the latitude and
+                longitude of each park, keyed on the park's code
+
+        Returns:
+            None
+        """
+        self.assign_parks(park_locations)
+        self.collect_weather().to_csv(weather_fp, index=False)
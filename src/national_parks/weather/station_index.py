@@ -0,0 +1,84 @@
+"""Class for locating the weather stations nearest to a set of parks."""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+# Mean radius of the Earth, in kilometers
+_EARTH_RADIUS_KM = 6371.0088
+
+
+def _to_unit_vectors(latitudes, longitudes):
+    """Helper function to project coordinates in degrees onto the unit sphere,
+    where straight-line (chord) distances increase monotonically with
+    great-circle distances, so that a Euclidean KD-tree finds the nearest
+    points on the globe.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.column_stack([
+        np.cos(lat) * np.cos(lon),
+        np.cos(lat) * np.sin(lon),
+        np.sin(lat),
+    ])
+
+
+def _chord_to_km(chord):
+    """Helper function to convert chord lengths on the unit sphere to
+    great-circle distances in kilometers."""
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+class StationIndex(object):
+    """A spatial index over weather station locations, so that the nearest
+    stations to any number of parks are found in O(log n) time per park rather
+    than by comparing every park to every station.
+
+    Attributes:
+        stations (np.ndarray): the identifier of each station
+        latitudes (np.ndarray): the latitude of each station, in degrees
+        longitudes (np.ndarray): the longitude of each station, in degrees
+    """
+
+    def __init__(self, stations, latitudes, longitudes):
+        self.stations = np.asarray(stations)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._tree = cKDTree(_to_unit_vectors(self.latitudes, self.longitudes))
+
+    def __len__(self):
+        return len(self.stations)
+
+    def query(self, latitudes, longitudes, k=1, max_distance_km=None):
+        """Finds the k nearest stations to each of a set of locations.
+
+        Args:
+            latitudes (Sequence[float]): latitudes, in degrees
+            longitudes (Sequence[float]): longitudes, in degrees
+            k (int): the number of stations to find per location
+            max_distance_km (float): if present, stations further than this
+                from a location are not returned
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: arrays of shape (n_locations, k)
+                with the positions of the nearest stations (-1 where fewer
+                than k stations were found) and their distances in kilometers
+                (inf where fewer than k stations were found)
+        """
+        k = min(k, len(self))
+        upper_bound = np.inf if max_distance_km is None else (
+            2 * np.sin(max_distance_km / (2 * _EARTH_RADIUS_KM))
+        )
+        chords, positions = self._tree.query(
+            _to_unit_vectors(latitudes, longitudes),
+            k=k,
+            distance_upper_bound=upper_bound
+        )
+        chords = chords.reshape(-1, k)
+        positions = positions.reshape(-1, k)
+        # Missing neighbors are reported with a position of len(self)
+        found = positions < len(self)
+        return (
+            np.where(found, positions, -1),
+            np.where(found, _chord_to_km(chords), np.inf)
+        )
@@ -2,29 +2,106 @@
 
 from copy import deepcopy
 import logging
+import os
+import sys
 import warnings
 
 import hydra
 from hydra.utils import to_absolute_path
+import pandas as pd
 
+from national_parks.features import (
+    add_series_features, build_calendar_features
+)
 from national_parks.processing import Transformation
+from national_parks.utils.cli import expand_flags
+from national_parks.utils.dtypes import apply_dtype_policy, count_columns
 from national_parks.utils.io import (
-    get_step_inputs, maybe_create_capta_directory, read_config_file
+    get_step_inputs, maybe_create_capta_directory, read_capta,
+    read_config_file, write_capta
 )
 from national_parks.utils.logging import log_job_succeeded, setup_logging
+from national_parks.utils.plan import StageMetrics, check_config, log_plan
 
 
-@hydra.main(config_path='../config', config_name='main', version_base='1.2')
-def main(config):
-    setup_logging('process_capta')
-    warnings.filterwarnings('ignore')
-    maybe_create_capta_directory('processed')
-    stage_config = config.process_capta
-    inputs_config = read_config_file(to_absolute_path(stage_config.inputs))
-    steps_config = read_config_file(to_absolute_path(stage_config.steps))
+def _check_steps(inputs_config, steps_config, engine):
+    """Helper function to find problems with the processing steps before any
+    is executed: unimplemented transformations, params that don't match their
+    transformations' signatures, and inputs that are neither source capta nor
+    the outputs of earlier steps.
+
+    Args:
+        inputs_config (ListConfig): the configured source capta
+        steps_config (ListConfig): the configured processing steps
+        engine (str): the execution engine
+
+    Returns:
+        List[str]: descriptions of the problems found
+    """
+    if engine == 'pandas':
+        transformation_class = Transformation
+    elif engine == 'polars':
+        from national_parks.processing.lazy_transformation import (
+            LazyTransformation as transformation_class
+        )
+    else:
+        return [f'Unimplemented engine {engine}']
+    problems = []
+    available = {item.name for item in inputs_config}
+    for step in steps_config:
+        if step.input not in available:
+            problems.append(
+                f'Step {step.name} - {step.input} is neither a source '
+                f'captaset nor the output of an earlier step'
+            )
+        if not step.transformations:
+            problems.append(f'Step {step.name} - no transformations')
+        for t in step.transformations:
+            try:
+                transformation_class(
+                    name=t.name, params=t.get('params')
+                ).check_params()
+            except (NotImplementedError, TypeError) as e:
+                problems.append(f'Step {step.name} - {e}')
+        available.add(step.output)
+    return problems
 
+
+def _write_step_output(df, output_path):
+    """Helper function to write the pandas result of a processing step.
+
+    Args:
+        df (pd.DataFrame): the result of a processing step
+        output_path (str): path relative to the national-parks working
+            directory where df should be written, either as a CSV or (if the
+            path ends in ".npz") as a RaggedSeries
+    """
+    # Every output captaset written to disk for use by the model training step
+    # must include a "dt_pk" column (which may be its index) that contains
+    # "datetime primary keys" for time series modeling
+    assert 'dt_pk' in df.columns or 'dt_pk' == df.index.name
+    df = apply_dtype_policy(df, name=output_path)
+    logging.info('Writing result to capta/processed')
+    write_capta(df, output_path)
+
+
+def _execute_steps_eagerly(
+        inputs_config, steps_config, write=_write_step_output
+):
+    """Executes processing steps with pandas, materializing the result of
+    every transformation.
+
+    Args:
+        inputs_config (ListConfig): the configured source capta
+        steps_config (ListConfig): the configured processing steps
+        write (Callable[[pd.DataFrame, str], None]): a function that writes
+            the result of a step to its output_path
+    """
     # Collect inputs
-    input_dfs = get_step_inputs(inputs_config)
+    input_dfs = {
+        k: apply_dtype_policy(df, name=k)
+        for k, df in get_step_inputs(inputs_config).items()
+    }
     logging.info('Source data collected')
 
     # Execute processing steps outlined in configuration fil
@@ -47,19 +124,164 @@ def main(config):
         input_dfs[step.output] = step_processed_df
         step_output_path = step.get('output_path')
         if step_output_path is not None:
-            # Every output captaset written to disk for use by the model
-            # training step must include a "dt_pk" column (which may be its
-            # index) that contains "datetime primary keys" for time series
-            # modeling
-            assert (
-                'dt_pk' in step_processed_df.columns
-                or 'dt_pk' == step_processed_df.index.name
+            write(step_processed_df, step_output_path)
+
+
+def _execute_steps_lazily(
+        inputs_config, steps_config, write=_write_step_output
+):
+    """Compiles processing steps into lazy Polars query plans, which are only
+    executed (jointly, so that common subplans are computed once) when their
+    results must be written to disk. Results are handed back to pandas at that
+    boundary, so outputs are identical to those of the eager engine.
+
+    Args:
+        inputs_config (ListConfig): the configured source capta
+        steps_config (ListConfig): the configured processing steps
+        write (Callable[[pd.DataFrame, str], None]): a function that writes
+            the result of a step to its output_path
+    """
+    # Polars is only required when this engine is selected
+    import polars as pl
+    from national_parks.processing.lazy_transformation import (
+        LazyTransformation
+    )
+
+    input_lfs = {}
+    for item in inputs_config:
+        input_lf = pl.scan_csv(to_absolute_path(item.path))
+        # Visitor counts are cast as by the dtype policy that the eager engine
+        # applies to its inputs, so that outputs share their dtypes
+        input_lfs[item.name] = input_lf.cast({
+            c: pl.Int32
+            for c in count_columns(input_lf.collect_schema().names())
+        })
+    logging.info('Source data scanned')
+
+    outputs = {}
+    for step in steps_config:
+        logging.info(f'Planning step {step.name}')
+        step_lf = input_lfs[step.input]
+        transformations = [
+            LazyTransformation(name=t.name, params=t.get('params'))
+            for t in step.transformations
+        ]
+        # Every step must execute at least one transformation
+        assert len(transformations)
+        for t in transformations:
+            logging.info(f'Planning {t.name} transformation of {step.input}')
+            step_lf = t.transform(step_lf)
+        input_lfs[step.output] = step_lf
+        step_output_path = step.get('output_path')
+        if step_output_path is not None:
+            outputs[step_output_path] = step_lf
+
+    logging.info(f'Executing query plans for {len(outputs)} outputs')
+    collected = pl.collect_all(list(outputs.values()), engine='streaming')
+    for output_path, output_pl_df in zip(outputs, collected):
+        # Integer columns holding nulls are handed back as floats, so their
+        # (nullable) integer dtypes are restored
+        output_df = output_pl_df.to_pandas().astype({
+            c: str(dtype)
+            for c, dtype in output_pl_df.schema.items() if dtype.is_integer()
+        })
+        if 'dt_pk' in output_df.columns:
+            output_df = output_df.set_index('dt_pk')
+        write(output_df, output_path)
+
+
+def _write_feature_store(features_config, date_range):
+    """Helper function to precompute calendar features, once, for every
+    period that any series (or forecast) may cover, along with the variables
+    specific to each series in any configured processed capta.
+
+    Args:
+        features_config (DictConfig): the configured feature store
+        date_range (DictConfig): the inclusive range of years of source capta
+    """
+    end = pd.Period(f'{date_range.max}-12', freq='M') + (
+        features_config.horizon_months
+    )
+    store = build_calendar_features(f'{date_range.min}-01', end)
+    for path in features_config.get('series_inputs') or []:
+        store = add_series_features(store, read_capta(path))
+    logging.info(f'Writing {len(store.columns)} features to capta/processed')
+    store.save(to_absolute_path(features_config.output_path))
+
+
+@hydra.main(config_path='../config', config_name='main', version_base='1.2')
+def main(config):
+    setup_logging('process_capta')
+    warnings.filterwarnings('ignore')
+    stage_config = config.process_capta
+    inputs_config = read_config_file(to_absolute_path(stage_config.inputs))
+    steps_config = read_config_file(to_absolute_path(stage_config.steps))
+
+    # Select an execution engine, which may be overridden for a single run
+    # (e.g., `python src/process_capta.py process_capta.engine=polars`)
+    engine = stage_config.get('engine', 'pandas')
+    # Every step is checked before any is executed
+    check_config(
+        'process_capta', _check_steps(inputs_config, steps_config, engine)
+    )
+    # Runtime and memory scale with the size (in bytes) of the source capta
+    input_paths = [to_absolute_path(item.path) for item in inputs_config]
+    size = (
+        sum(os.path.getsize(p) for p in input_paths)
+        if all(os.path.exists(p) for p in input_paths) else None
+    )
+    metrics_path = stage_config.get('metrics')
+    metrics = (
+        StageMetrics(to_absolute_path(metrics_path))
+        if metrics_path is not None else None
+    )
+    # With plan set (e.g., `python src/process_capta.py --plan`), the steps
+    # and the estimated cost of executing them are logged, and nothing else
+    if stage_config.get('plan'):
+        for step in steps_config:
+            logging.info(
+                f'Step {step.name}: {step.input} -> {step.output} via '
+                f'{", ".join(t.name for t in step.transformations)}'
             )
-            logging.info('Writing result to capta/processed')
-            step_processed_df.to_csv(to_absolute_path(step_output_path))
+        seconds, peak_bytes = (
+            metrics.estimate(size)
+            if metrics is not None and size is not None else (None, None)
+        )
+        log_plan(
+            'process_capta',
+            f'{len(steps_config)} steps with the {engine} engine over '
+            f'{len(input_paths)} source captasets'
+            + (f' ({size:,} bytes)' if size is not None else ''),
+            seconds=seconds,
+            peak_bytes=peak_bytes,
+            basis=(
+                'scaled from the last run by the size of the source capta'
+                if seconds is not None else
+                'no past run recorded' if size is not None else
+                'source capta not yet refreshed'
+            )
+        )
+        return
+    maybe_create_capta_directory('processed')
+    logging.info(f'Processing capta with the {engine} engine')
+    if engine == 'pandas':
+        _execute_steps_eagerly(inputs_config, steps_config)
+    elif engine == 'polars':
+        _execute_steps_lazily(inputs_config, steps_config)
+    else:
+        raise NotImplementedError(f'Unimplemented engine {engine}')
+
+    features_config = stage_config.get('features')
+    if features_config is not None:
+        _write_feature_store(
+            features_config, config.refresh_source_capta.date_range
+        )
 
+    if metrics is not None:
+        metrics.record(size)
     log_job_succeeded()
 
 
 if __name__ == '__main__':
+    sys.argv = expand_flags(sys.argv, {'--plan': 'process_capta.plan=true'})
     main()
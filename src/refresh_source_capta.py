@@ -1,40 +1,205 @@
 """Driver script to refresh source capta."""
 
+import glob
 import logging
+import os
+import sys
 import warnings
 
 import hydra
 from hydra.utils import to_absolute_path
+import pandas as pd
 
-from national_parks.nps import NPSCaptaset
+from national_parks.nps import (
+    NPSCaptaset, generate_monthly_use, generate_monthly_visitors
+)
+from national_parks.utils.cli import expand_flags
 from national_parks.utils.io import (
     maybe_create_capta_directory, read_config_file
 )
 from national_parks.utils.logging import log_job_succeeded, setup_logging
 from national_parks.utils.park_names import get_park_type
+from national_parks.utils.plan import StageMetrics, check_config, log_plan
+from national_parks.weather import WeatherCaptaset
+
+
+def _check_step_config(step_config):
+    """Helper function to find problems with the stage's configuration before
+    anything is scraped.
+
+    Args:
+        step_config (DictConfig): the stage's configuration
+
+    Returns:
+        List[str]: descriptions of the problems found
+    """
+    problems = []
+    if step_config.nps.fetch_mode not in ['csv', 'html']:
+        problems.append(
+            f'Unrecognized fetch_mode {step_config.nps.fetch_mode}'
+        )
+    if step_config.date_range.min > step_config.date_range.max:
+        problems.append('date_range.min is later than date_range.max')
+    for park_set, path in step_config.park_sets.items():
+        if not os.path.exists(to_absolute_path(path)):
+            problems.append(f'Park set {park_set} not found at {path}')
+    return problems
+
+
+def _refresh_weather(step_config, parks):
+    """Helper function to aggregate station-level weather capta for a list of
+    parks, if any are available. The output is written regardless (without
+    any rows if there are no weather capta), since process_capta expects it.
+
+    Args:
+        step_config (DictConfig): the stage's configuration
+        parks (Collection[str]): the codes of the parks
+    """
+    weather_config = step_config.weather
+    output_path = to_absolute_path(weather_config.output_path)
+    stations_dir = to_absolute_path(weather_config.stations_dir)
+    located = {}
+    if glob.glob(os.path.join(stations_dir, '*.csv')):
+        park_locations = read_config_file(weather_config.park_locations)
+        located = {p: park_locations[p] for p in parks if p in park_locations}
+        if len(located) < len(parks):
+            logging.info(
+                f'{len(parks) - len(located)} of {len(parks)} parks have no '
+                f'location in {weather_config.park_locations}, skipping their '
+                f'weather'
+            )
+    else:
+        logging.info(f'No weather capta found at {stations_dir}, skipping')
+    if not located:
+        pd.DataFrame(
+            columns=['dt_pk', 'park_name', *weather_config.variables]
+        ).to_csv(output_path, index=False)
+        return
+    logging.info('Refreshing weather source capta')
+    wc = WeatherCaptaset(
+        stations_dir=stations_dir,
+        variables=weather_config.variables,
+        min_year=step_config.date_range.min,
+        max_year=step_config.date_range.max,
+        n_stations=weather_config.n_stations,
+        max_distance_km=weather_config.max_distance_km,
+        chunksize=weather_config.chunksize,
+    )
+    wc.write_source_capta(output_path, park_locations=located)
 
 
 @hydra.main(config_path='../config', config_name='main', version_base='1.2')
 def main(config):
     setup_logging('refresh_source_capta')
     warnings.filterwarnings('ignore')
-    maybe_create_capta_directory('source')
     step_config = config.refresh_source_capta
+    check_config('refresh_source_capta', _check_step_config(step_config))
+    monthly_visitors_fp = to_absolute_path(
+        step_config.nps.monthly_visitors.output_path
+    )
+    visitor_use_fp = to_absolute_path(step_config.nps.visitor_use.output_path)
+    # Runtime and memory scale with the number of park-years of capta
+    n_years = step_config.date_range.max - step_config.date_range.min + 1
+    metrics_path = step_config.get('metrics')
+    metrics = (
+        StageMetrics(to_absolute_path(metrics_path))
+        if metrics_path is not None else None
+    )
+
+    # Synthetic capta take the place of scraped capta when requested, and
+    # when retrying only those parks that failed in the previous refresh are
+    # scraped (and merged into its outputs)
+    n_synthetic_parks = step_config.get('synthetic_parks')
+    failure_journal_fp = to_absolute_path(step_config.nps.failure_journal)
+    retry_failed = bool(step_config.get('retry_failed'))
+    run_kind = 'synthetic' if n_synthetic_parks is not None else 'scrape'
+    if n_synthetic_parks is not None:
+        n_parks = n_synthetic_parks
+    elif retry_failed:
+        park_types = NPSCaptaset.read_failure_journal(failure_journal_fp)
+        n_parks = len(park_types)
+    else:
+        park_set = 'all' if step_config.refresh_all_parks else 'sample'
+        park_list_subconf = step_config.park_sets
+        parks = read_config_file(park_list_subconf[park_set])
+        park_types = {
+            park_code: get_park_type(nps_park_name)
+            for park_code, nps_park_name in parks.items()
+        }
+        n_parks = len(park_types)
+
+    # With plan set (e.g., `python src/refresh_source_capta.py --plan`), the
+    # estimated cost of the refresh is logged, and nothing is scraped
+    if step_config.get('plan'):
+        seconds, peak_bytes = (
+            metrics.estimate(n_parks * n_years, kind=run_kind)
+            if metrics is not None else (None, None)
+        )
+        basis = 'scaled from the last run by the number of park-years'
+        if seconds is None:
+            basis = 'no past run recorded'
+            # Every scraped park's reports (visitors, and visitor use if
+            # configured) take at least one request each (two for HTML), each
+            # followed by request_delay seconds
+            if n_synthetic_parks is None:
+                nps_config = step_config.nps
+                n_reports = 1 + (nps_config.visitor_use.base_url is not None)
+                seconds = n_parks * n_reports * nps_config.request_delay * (
+                    1 if nps_config.fetch_mode == 'csv' else 2
+                )
+                basis += ' - runtime is a lower bound from request_delay'
+        log_plan(
+            'refresh_source_capta',
+            f'{"generating" if n_synthetic_parks is not None else "scraping"}'
+            f' {n_years} years of capta for {n_parks} parks',
+            seconds=seconds,
+            peak_bytes=peak_bytes,
+            basis=basis
+        )
+        return
+    maybe_create_capta_directory('source')
+
+    # Synthetic park types are drawn in proportion to those of the real parks
+    if n_synthetic_parks is not None:
+        logging.info(f'Generating capta for {n_synthetic_parks} fake parks')
+        all_parks = read_config_file(step_config.park_sets.all)
+        synthetic_df = generate_monthly_visitors(
+            n_parks=n_synthetic_parks,
+            min_year=step_config.date_range.min,
+            max_year=step_config.date_range.max,
+            park_types=[get_park_type(n) for n in all_parks.values()],
+        )
+        synthetic_df.to_csv(monthly_visitors_fp, index=False)
+        generate_monthly_use(synthetic_df).to_csv(visitor_use_fp, index=False)
+        # Fake parks have no locations, and so no weather
+        _refresh_weather(step_config, parks=[])
+        if metrics is not None:
+            metrics.record(n_parks * n_years, kind=run_kind)
+        log_job_succeeded()
+        return
 
     # Retrieve parks whose capta are to be curated
-    park_set = 'all' if step_config.refresh_all_parks else 'sample'
-    logging.info(f'Refreshing source capta for {park_set} parks')
-    park_list_subconf = step_config.park_sets
-    parks = read_config_file(park_list_subconf[park_set])
+    if retry_failed:
+        logging.info(f'Retrying source capta for {len(park_types)} parks')
+        if not len(park_types):
+            log_job_succeeded()
+            return
+    else:
+        logging.info(f'Refreshing source capta for {park_set} parks')
 
     # Scrape NPS websites for all source capta
     npsc = NPSCaptaset(
         min_year=step_config.date_range.min,
         max_year=step_config.date_range.max,
         visitor_base_url=step_config.nps.monthly_visitors.base_url,
+        request_delay=step_config.nps.request_delay,
+        fetch_mode=step_config.nps.fetch_mode,
+        use_base_url=step_config.nps.visitor_use.base_url,
+        max_retries=step_config.nps.max_retries,
+        backoff_base=step_config.nps.backoff_base,
+        backoff_cap=step_config.nps.backoff_cap,
     )
-    for park_code, nps_park_name in parks.items():
-        park_type = get_park_type(nps_park_name)
+    for park_code, park_type in park_types.items():
         try:
             npsc.add_and_populate_park(name=park_code, park_type=park_type)
             logging.info(f'Successfully added source capta for {park_code}')
@@ -44,15 +209,41 @@ def main(config):
             )
             continue
     logging.info('Park source capta refreshed, writing outputs')
-    monthly_visitors_fp = to_absolute_path(
-        step_config.nps.monthly_visitors.output_path
+    npsc.write_source_capta(
+        monthly_visitors_fp, visitor_use_fp, merge=retry_failed
     )
-    npsc.write_source_capta(monthly_visitors_fp)
+    npsc.write_failure_journal(failure_journal_fp)
+    if len(npsc.failed_parks):
+        logging.info(
+            f'{len(npsc.failed_parks)} parks failed and were recorded in '
+            f'{failure_journal_fp} (retry them with --retry-failed)'
+        )
+    if len(npsc.failed_use):
+        logging.info(
+            f'Visitor use failed for {len(npsc.failed_use)} parks, which were '
+            f'added nonetheless and recorded in {failure_journal_fp}'
+        )
+    # Weather capta don't depend on scraping, and so needn't be retried
+    if retry_failed:
+        if metrics is not None:
+            metrics.record(n_parks * n_years, kind=run_kind)
+        log_job_succeeded()
+        return
 
-    # TODO (WW): weather capta?
+    # Aggregate station-level weather capta for the same parks, if available
+    _refresh_weather(step_config, parks)
 
+    if metrics is not None:
+        metrics.record(n_parks * n_years, kind=run_kind)
     log_job_succeeded()
 
 
 if __name__ == '__main__':
+    sys.argv = expand_flags(
+        sys.argv,
+        {
+            '--retry-failed': 'refresh_source_capta.retry_failed=true',
+            '--plan': 'refresh_source_capta.plan=true',
+        }
+    )
     main()
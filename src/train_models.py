@@ -2,15 +2,26 @@
 
 import logging
 import os
+import sys
 import warnings
 
 import hydra
 from hydra.utils import to_absolute_path
 import pandas as pd
 
-from national_parks.model import NationalParksModel
+from national_parks.features import FeatureStore
+from national_parks.model import (
+    CompletionJournal, FitTimings, NationalParksModel, Scheduler,
+    assign_series, find_shards, journal_unit, merge_shards, parse_shard,
+    remove_shards, shard_subdir, unshard_subdir
+)
+from national_parks.utils.cli import expand_flags
+from national_parks.utils.dtypes import apply_dtype_policy
 from national_parks.utils.io import get_step_inputs, read_config_file
+from national_parks.utils.ragged import RaggedSeries
 from national_parks.utils.logging import log_job_succeeded, setup_logging
+from national_parks.utils.park_names import in_selection
+from national_parks.utils.plan import StageMetrics, check_config, log_plan
 
 
 def _maybe_make_output_directories():
@@ -23,55 +34,574 @@ def _maybe_make_output_directories():
         os.makedirs(abs_path, exist_ok=True)
 
 
+def _evaluate_recipe(model, recipe, df, reports_dir):
+    """Helper function to write a recipe's leaderboard and, if reports_dir is
+    set, its report to reports_dir, named for its outputs_subdir (or, failing
+    that, the recipe itself).
+
+    Returns:
+        pd.DataFrame: the recipe's leaderboard
+    """
+    board = model.evaluate(df)
+    logging.info(
+        f'{recipe.name} evaluated on {len(board)} series: median MASE '
+        f'{board["mase"].median():.3f}, median sMAPE '
+        f'{board["smape"].median():.3f}'
+    )
+    if reports_dir is not None:
+        report_name = (
+            recipe.outputs_subdir
+            or recipe.name.lower().replace(' ', '_').replace('/', '_')
+        )
+        model.write_report(
+            df,
+            os.path.join(reports_dir, f'{report_name}.html'),
+            title=recipe.name,
+            metrics=board
+        )
+    return board
+
+
+def _check_recipes(inputs_config, recipes_config):
+    """Helper function to find problems with the recipes before any is built:
+    unimplemented algorithms, params that don't match their algorithms'
+    signatures, unknown inputs, and recipes that build on the outputs of
+    recipes that don't precede them.
+
+    Args:
+        inputs_config (ListConfig): the configured modeling capta
+        recipes_config (ListConfig): the configured recipes
+
+    Returns:
+        List[str]: descriptions of the problems found
+    """
+    problems = []
+    input_names = {item.name for item in inputs_config}
+    names, outputs_subdirs = set(), set()
+    for recipe in recipes_config:
+        if recipe.name in names:
+            problems.append(f'Recipe {recipe.name} - duplicate name')
+        if recipe.input not in input_names:
+            problems.append(
+                f'Recipe {recipe.name} - unknown input {recipe.input}'
+            )
+        try:
+            NationalParksModel(
+                recipe.algorithm, recipe.outputs_subdir, params=recipe.params
+            ).check_params()
+        except (NotImplementedError, TypeError) as e:
+            problems.append(f'Recipe {recipe.name} - {e}')
+        base_subdir = (recipe.params or {}).get('base_subdir')
+        if base_subdir is not None and base_subdir not in outputs_subdirs:
+            problems.append(
+                f'Recipe {recipe.name} - no earlier recipe writes to '
+                f'{base_subdir}'
+            )
+        names.add(recipe.name)
+        outputs_subdirs.add(recipe.outputs_subdir)
+    return problems
+
+
+def _recipe_series(params, df):
+    """Helper function to list the series that a recipe fits: its ts_cols or,
+    failing those, every series in its input that isn't an exogenous variable.
+
+    Returns:
+        List[str]: the recipe's series
+    """
+    names = df.names if isinstance(df, RaggedSeries) else df.columns
+    exog_vars = params.get('exog_vars') or []
+    return list(
+        params.get('ts_cols') or [c for c in names if c not in exog_vars]
+    )
+
+
+def _select_series(parks, park_types, keep=()):
+    """Helper function to build a predicate for the columns (or RaggedSeries
+    names) of an input that a run selecting parks and park types reads.
+
+    Args:
+        parks (Collection[str]): the selected park codes
+        park_types (Collection[str]): the selected park types
+        keep (Collection[str]): columns that are always read (e.g., the time
+            index and exogenous variables)
+
+    Returns:
+        Callable[[str], bool]
+    """
+    keep = set(keep)
+    return lambda c: c in keep or in_selection(
+        c, parks=parks, park_types=park_types
+    )
+
+
+def _log_training_plan(recipes_config, work, size, metrics):
+    """Helper function to log the recipes that a run would build and its
+    estimated runtime and peak memory, without building anything.
+    """
+    dependencies = _recipe_dependencies(recipes_config)
+    for recipe in recipes_config:
+        _, names, _ = work[recipe.name]
+        after = sorted(dependencies[recipe.name])
+        logging.info(
+            f'Recipe {recipe.name}: {recipe.algorithm} on {len(names)} series '
+            f'of {recipe.input}'
+            + (f', after {", ".join(after)}' if after else '')
+        )
+    seconds, peak_bytes = (
+        metrics.estimate(size) if metrics is not None else (None, None)
+    )
+    log_plan(
+        'train_models',
+        f'{len(recipes_config)} recipes over {size:,} capta',
+        seconds=seconds,
+        peak_bytes=peak_bytes,
+        basis=(
+            'scaled from the last run by the number of capta'
+            if seconds is not None else 'no past run recorded'
+        )
+    )
+
+
+def _recipe_work(recipes_config, recipe_params, modeling_dfs):
+    """Helper function to list the series that each recipe fits, along with
+    their numbers of capta.
+
+    Returns:
+        Dict[str, Tuple[str, List[str], List[int]]]: each recipe's
+            outputs_subdir, series, and numbers of capta, keyed on its name
+    """
+    recipes = {}
+    for recipe in recipes_config:
+        df = modeling_dfs[recipe.input]
+        ragged = df if isinstance(df, RaggedSeries) else (
+            RaggedSeries.from_dataframe(df)
+        )
+        names = _recipe_series(recipe_params[recipe.name], ragged)
+        n_capta = dict(zip(ragged.names, ragged.lengths - ragged.n_missing))
+        recipes[recipe.name] = (
+            recipe.outputs_subdir, names, [n_capta[c] for c in names]
+        )
+    return recipes
+
+
+def _recipe_dependencies(recipes_config):
+    """Helper function to find the recipes on whose outputs each recipe builds
+    (i.e., those whose outputs_subdir is its base_subdir).
+
+    Returns:
+        Dict[str, Set[str]]: the names of each recipe's dependencies
+    """
+    return {
+        recipe.name: {
+            r.name for r in recipes_config
+            if r is not recipe and r.outputs_subdir is not None
+            and r.outputs_subdir == (recipe.params or {}).get('base_subdir')
+        }
+        for recipe in recipes_config
+    }
+
+
+def _shard_series(recipes_config, recipe_params, modeling_dfs, shard, timings):
+    """Helper function to find the series of each shardable recipe that are
+    assigned to a shard, planned from the fit durations of past runs.
+
+    Returns:
+        Dict[str, List[str]]: each shardable recipe's series in the shard
+    """
+    recipes = _recipe_work(
+        [
+            r for r in recipes_config
+            if NationalParksModel(r.algorithm, None).shardable
+        ],
+        recipe_params,
+        modeling_dfs
+    )
+    return assign_series(
+        recipes, shard, timings.history() if timings is not None else {}
+    )
+
+
 def _time_index_dataframe(df, dt_col='dt_pk', freq='M', method='ffill'):
     """Helper function to temporally index a DataFrame for training.
 
     Args:
         df (pd.DataFrame): a DataFrame
-        dt_col (str): a column containing datetime-parsable entries
-        freq (str): a frequency input to pd.asfreq()
-        method (str): an imputation method input to pd.asfreq()
+        dt_col (str): a column containing periods or datetime-parsable entries
+        freq (str): a frequency input to pd.period_range()
+        method (str): an imputation method input to pd.DataFrame.reindex()
 
     Returns:
         pd.DataFrame: a modified copy of df
     """
-    df[dt_col] = pd.to_datetime(df[dt_col])
+    if not isinstance(df[dt_col].dtype, pd.PeriodDtype):
+        df[dt_col] = pd.PeriodIndex(pd.to_datetime(df[dt_col]), freq=freq)
     df = df.set_index(dt_col)
-    return df.asfreq(freq, method=method)
+    full_index = pd.period_range(
+        df.index.min(), df.index.max(), freq=freq, name=dt_col
+    )
+    return df.reindex(full_index, method=method)
 
 
 @hydra.main(config_path='../config', config_name='main', version_base='1.2')
 def main(config):
     setup_logging('train_models')
     warnings.filterwarnings('ignore')
-    _maybe_make_output_directories()
     stage_config = config.train_models
     inputs_config = read_config_file(to_absolute_path(stage_config.inputs))
     recipes_config = read_config_file(to_absolute_path(stage_config.recipes))
+    # Every recipe is checked before any is built
+    check_config('train_models', _check_recipes(inputs_config, recipes_config))
+    metrics_path = stage_config.get('metrics')
+    metrics = (
+        StageMetrics(to_absolute_path(metrics_path))
+        if metrics_path is not None else None
+    )
+    plan = bool(stage_config.get('plan'))
+
+    # A run may be limited to certain recipes (by name or outputs_subdir) and
+    # to the series of certain parks and park types (e.g., with --parks
+    # YELL,GRCA), in which case only the inputs and columns that it fits are
+    # read. Recipes that fit every series together (i.e., reconciliation) are
+    # left out of a run that selects series.
+    select = stage_config.get('select') or {}
+    parks = set(select.get('parks') or [])
+    park_types = set(select.get('park_types') or [])
+    recipe_names = set(select.get('recipes') or [])
+    select_series = bool(parks or park_types)
+    if recipe_names:
+        unknown = recipe_names - {
+            name for r in recipes_config for name in (r.name, r.outputs_subdir)
+        }
+        if unknown:
+            raise ValueError(f'Unrecognized recipes {sorted(unknown)}')
+        recipes_config = [
+            r for r in recipes_config
+            if r.name in recipe_names or r.outputs_subdir in recipe_names
+        ]
+    usecols = None
+    if select_series:
+        shardable = []
+        for recipe in recipes_config:
+            if NationalParksModel(recipe.algorithm, None).shardable:
+                shardable.append(recipe)
+            else:
+                logging.info(
+                    f'Skipping {recipe.name} - only fit with every series'
+                )
+        recipes_config = shardable
+        usecols = {
+            item.name: _select_series(
+                parks,
+                park_types,
+                keep=['dt_pk'] + [
+                    v for r in recipes_config if r.input == item.name
+                    for v in (r.params or {}).get('exog_vars') or []
+                ]
+            )
+            for item in inputs_config
+        }
+
+    # With plan set (e.g., `python src/train_models.py --plan`), the recipes
+    # and the estimated cost of building them are logged, and nothing else
+    if plan and not all(
+            os.path.exists(to_absolute_path(item.path))
+            for item in inputs_config
+            if item.name in {r.input for r in recipes_config}
+    ):
+        log_plan(
+            'train_models',
+            f'{len(recipes_config)} recipes',
+            basis='modeling capta not yet processed'
+        )
+        return
 
     # At this stage only simple transformations, such as setting a datetime
     # index from an already-existing column, should be performed in preparation
     # for modeling. Anything more complex should have already been handled in
-    # the previous DVC stage.
-    modeling_dfs = get_step_inputs(inputs_config)
+    # the previous DVC stage. RaggedSeries inputs are already indexed by time.
+    modeling_dfs = get_step_inputs(
+        inputs_config,
+        names={r.input for r in recipes_config},
+        usecols=usecols
+    )
     modeling_dfs = {
-        k: _time_index_dataframe(df)
+        k: (
+            df if isinstance(df, RaggedSeries)
+            else _time_index_dataframe(apply_dtype_policy(df, name=k))
+        )
         for k, df in modeling_dfs.items()
     }
     logging.info('Modeling capta retrieved')
-
+    recipe_params = {}
     for recipe in recipes_config:
-        logging.info(f'Building {recipe.name}')
+        params = dict(recipe.params or {})
+        if select_series:
+            # Passing the selected series explicitly lets recipes that write
+            # recipe-level artifacts (e.g., cascade_tiers.csv) update them
+            params['ts_cols'] = [
+                c for c in _recipe_series(params, modeling_dfs[recipe.input])
+                if c in modeling_dfs[recipe.input]
+            ]
+        recipe_params[recipe.name] = params
+    if parks:
+        missing = parks - {
+            c for df in modeling_dfs.values() for c in df if c in parks
+        }
+        if missing:
+            raise ValueError(f'Found no series for parks {sorted(missing)}')
+    # Runtime and memory scale with the number of capta to be modeled
+    work = _recipe_work(recipes_config, recipe_params, modeling_dfs)
+    size = sum(sum(n_capta) for _, _, n_capta in work.values())
+    if plan:
+        _log_training_plan(recipes_config, work, size, metrics)
+        return
+    _maybe_make_output_directories()
+    # Precomputed exogenous features are shared by every recipe
+    features_path = stage_config.get('features')
+    features = (
+        FeatureStore.load(to_absolute_path(features_path))
+        if features_path is not None else None
+    )
+    # Results for unchanged series are reused across runs (and DVC's clearing
+    # of models/ and plots/) from a cache kept outside the stage's outputs
+    cache_dir = stage_config.get('cache_dir')
+    if cache_dir is not None:
+        cache_dir = to_absolute_path(cache_dir)
+
+    # A run may be split across machines (e.g., with --shard 0/4), each of
+    # which fits its share of the series of every shardable recipe into its
+    # own shard of models/ and plots/; a final run with --merge-shards then
+    # moves the shards into place and builds the remaining recipes
+    shard = stage_config.get('shard')
+    shard = parse_shard(shard) if shard is not None else None
+    merge = bool(stage_config.get('merge_shards'))
+    if shard is not None and merge:
+        raise ValueError('A run cannot both fit a shard and merge shards')
+    if merge and (select_series or recipe_names):
+        raise ValueError(
+            'A run that merges shards cannot select recipes or series'
+        )
+    n_shards = find_shards() if merge else 0
+    if merge and not n_shards:
+        raise ValueError('Found no shards to merge')
+    shard_name = f'{shard[0]}-of-{shard[1]}' if shard is not None else None
+    # How long each series takes to fit is recorded, so that shards can be
+    # balanced by the series' expected costs
+    timings_dir = stage_config.get('timings')
+    timings = (
+        FitTimings(
+            to_absolute_path(timings_dir),
+            name=f'timings.{shard_name}' if shard is not None else 'timings'
+        )
+        if timings_dir is not None else None
+    )
+    shard_series = (
+        _shard_series(
+            recipes_config, recipe_params, modeling_dfs, shard, timings
+        )
+        if shard is not None else {}
+    )
+
+    # Completed recipes and series are journaled as they finish, so that a
+    # resumed run (i.e., with --resume) skips whatever an interrupted run
+    # completed with unchanged inputs. A run that selects recipes or series
+    # completes only part of the stage, and so is not journaled.
+    journal_path = stage_config.get('journal')
+    if select_series or recipe_names:
+        journal_path = None
+    if journal_path is not None and shard is not None:
+        root, ext = os.path.splitext(journal_path)
+        journal_path = f'{root}.{shard_name}{ext}'
+    journal = (
+        CompletionJournal(to_absolute_path(journal_path))
+        if journal_path is not None else None
+    )
+    resume = bool(stage_config.get('resume')) and journal is not None
+    if journal is not None and not resume:
+        journal.reset()
+    completed = journal.completed() if resume else {}
+    # Each recipe's forecasts are charted in a single HTML report rather
+    # than (or as well as) per-series plots. Leaderboards and reports cover
+    # every series of a recipe (and so are left as they are by a run that
+    # selects series, just as by a shard).
+    evaluated = shard is None and not select_series
+    reports_dir = stage_config.get('reports_dir')
+    if reports_dir is not None:
+        reports_dir = to_absolute_path(reports_dir)
+        os.makedirs(reports_dir, exist_ok=True)
+    input_paths = {
+        item.name: to_absolute_path(item.path) for item in inputs_config
+    }
+
+    recipes = {recipe.name: recipe for recipe in recipes_config}
+    boards = {}
+
+    def build_recipe(name, rebuild=False):
+        """Builds a recipe (unless it completed previously and rebuild isn't
+        set), returning whether it was rebuilt.
+        """
+        recipe = recipes[name]
         df = modeling_dfs[recipe.input]
         model = NationalParksModel(
             algorithm_name=recipe.algorithm,
             outputs_subdir=recipe.outputs_subdir,
-            params=recipe.params
+            params=recipe_params[recipe.name]
         )
-        model.fit_and_evaluate(df)
+        if select_series and not model.params['ts_cols']:
+            logging.info(f'Skipping {recipe.name} - no series selected')
+            return False
+        if shard is not None and not model.shardable:
+            logging.info(f'Deferring {recipe.name} to the merge of shards')
+            return False
+        if shard is not None:
+            if not shard_series[recipe.name]:
+                logging.info(f'Skipping {recipe.name} - no series in shard')
+                return False
+            model = NationalParksModel(
+                algorithm_name=recipe.algorithm,
+                outputs_subdir=shard_subdir(recipe.outputs_subdir, shard),
+                params={
+                    **recipe_params[recipe.name],
+                    'ts_cols': shard_series[recipe.name],
+                }
+            )
+        elif merge and model.shardable:
+            n_merged = merge_shards(
+                recipe.outputs_subdir,
+                n_shards,
+                other_subdirs=[
+                    r.outputs_subdir for r in recipes_config if r is not recipe
+                ]
+            )
+            logging.info(
+                f'Merged {n_merged} series of {recipe.name} from {n_shards} '
+                f'shards'
+            )
+            boards[recipe.name] = _evaluate_recipe(
+                model, recipe, df, reports_dir
+            )
+            return True
+        recipe_key = None
+        if journal is not None:
+            recipe_key = model.fingerprint(
+                input_paths[recipe.input],
+                *([to_absolute_path(features_path)] if features else [])
+            )
+        recipe_unit = f'recipe:{recipe.name}'
+        if not rebuild and completed.get(recipe_unit) == recipe_key and (
+                os.path.isdir(to_absolute_path(
+                    os.path.join('models', recipe.outputs_subdir or '')
+                ))
+        ):
+            logging.info(f'Skipping {recipe.name} - completed previously')
+            if evaluated:
+                boards[recipe.name] = _evaluate_recipe(
+                    model, recipe, df, reports_dir
+                )
+            return False
+        logging.info(f'Building {recipe.name}')
+        model.fit_and_evaluate(
+            df,
+            features=features,
+            cache_dir=cache_dir,
+            journal=journal,
+            resume=resume,
+            timings=timings,
+            scheduler=scheduler
+        )
+        # Shards' forecasts are only evaluated once merged
+        if evaluated:
+            boards[recipe.name] = _evaluate_recipe(
+                model, recipe, df, reports_dir
+            )
+        if journal is not None:
+            journal.record(recipe_unit, recipe_key)
+        return True
+
+    # Later recipes may build on the outputs of earlier ones (e.g.,
+    # reconciliation), so once a recipe is rebuilt those that follow it are
+    # rebuilt in full too. With workers set, every recipe's series are fit on
+    # one pool of that many processes, longest first across recipes, and
+    # recipes run concurrently once those on which they build are complete.
+    workers = stage_config.get('workers')
+    scheduler = None
+    if workers is None:
+        rebuilt = False
+        for name in recipes:
+            rebuilt = build_recipe(name, rebuild=rebuilt) or rebuilt
+    else:
+        with Scheduler(
+                workers,
+                history=timings.history() if timings is not None else {}
+        ) as scheduler:
+            scheduler.run_recipes(
+                list(recipes),
+                build_recipe,
+                dependencies=_recipe_dependencies(recipes_config),
+                costs={
+                    name: float(scheduler.expected_costs(
+                        names, n_capta, outputs_subdir=outputs_subdir
+                    ).sum())
+                    for name, (outputs_subdir, names, n_capta) in work.items()
+                }
+            )
 
+    # Every recipe's leaderboard is combined, so that recipes can be compared
+    # series by series
+    if reports_dir is not None and boards:
+        combined = pd.concat(
+            [
+                board.assign(recipe=k)[['recipe', *board.columns]]
+                for k, board in boards.items()
+            ],
+            ignore_index=True
+        )
+        # A run that selects recipes updates only their rows
+        leaderboard_path = os.path.join(reports_dir, 'leaderboard.csv')
+        if recipe_names and os.path.exists(leaderboard_path):
+            previous = pd.read_csv(leaderboard_path)
+            combined = pd.concat(
+                [previous[~previous['recipe'].isin(list(boards))], combined],
+                ignore_index=True
+            )
+        combined.to_csv(leaderboard_path, index=False)
+    if merge:
+        remove_shards()
+    # Only the series that the run actually fit (rather than restored from
+    # the cache, skipped when resuming, or left on a cascade's baselines)
+    # count toward the size of the run, which is unknown without timings
+    if metrics is not None and timings is not None:
+        fitted = timings.fitted()
+        fitted_size = sum(
+            n for outputs_subdir, names, n_capta in work.values()
+            for c, n in zip(names, n_capta)
+            if journal_unit(c, unshard_subdir(outputs_subdir)) in fitted
+        )
+        if fitted_size:
+            metrics.record(
+                fitted_size,
+                kind='shard' if shard is not None else (
+                    'merge' if merge else 'run'
+                )
+            )
+    # Timings are only planned from once every shard of a run has finished
+    if timings is not None and shard is None:
+        timings.consolidate()
     log_job_succeeded()
 
 
 if __name__ == '__main__':
+    sys.argv = expand_flags(
+        sys.argv,
+        {
+            '--resume': 'train_models.resume=true',
+            '--shard': "train_models.shard='{}'",
+            '--merge-shards': 'train_models.merge_shards=true',
+            '--parks': 'train_models.select.parks=[{}]',
+            '--park-types': 'train_models.select.park_types=[{}]',
+            '--recipes': 'train_models.select.recipes=[{}]',
+            '--plan': 'train_models.plan=true',
+        }
+    )
     main()
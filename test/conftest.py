@@ -0,0 +1,9 @@
+"""Shared fixtures for tests."""
+
+import os
+import sys
+
+# The driver scripts are run from src/, which is therefore where the
+# national_parks package can be found
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, 'src'))
@@ -0,0 +1,102 @@
+"""Tests for national_parks.model._baselines, comparing each vectorized
+baseline with a naive loop over series.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from national_parks.model._baselines import (
+    drift, mean_absolute_error, right_aligned_grid, seasonal_naive,
+    simple_exponential_smoothing
+)
+from national_parks.utils.ragged import RaggedSeries
+
+_ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+
+
+@pytest.fixture(scope='module')
+def series():
+    rng = np.random.default_rng(0)
+    index = pd.period_range('2000-01', periods=60, freq='M', name='dt_pk')
+    df = pd.DataFrame(index=index)
+    # Series of differing lengths, ending in differing periods
+    for name, (start, stop) in {
+        'A': (0, 60), 'B': (20, 60), 'C': (5, 41), 'D': (30, 55)
+    }.items():
+        df[name] = np.nan
+        df.iloc[start:stop, -1] = rng.normal(100, 20, size=stop - start)
+    df.iloc[10, 0] = np.nan
+    return RaggedSeries.from_dataframe(df)
+
+
+@pytest.fixture(scope='module')
+def layout(series):
+    names = list(series.names)
+    grid, lengths = right_aligned_grid(series, names)
+    test_sizes = np.array([12, 8, 6, 5])
+    origins = len(grid) - test_sizes
+    # Missing values are forward filled, as in the grid
+    naive_series = [series[n].ffill().to_numpy() for n in names]
+    return grid, lengths, origins, test_sizes, naive_series
+
+
+def test_right_aligned_grid(layout):
+    grid, lengths, _, _, naive_series = layout
+    assert list(lengths) == [60, 40, 36, 25]
+    for col, values in enumerate(naive_series):
+        np.testing.assert_array_equal(grid[-len(values):, col], values)
+        assert np.isnan(grid[:-len(values), col]).all()
+
+
+def _naive_seasonal_naive(train, horizon, m=12):
+    return np.array([train[len(train) - m + k % m] for k in range(horizon)])
+
+
+def _naive_drift(train, horizon):
+    slope = (train[-1] - train[0]) / max(len(train) - 1, 1)
+    return np.array([train[-1] + (k + 1) * slope for k in range(horizon)])
+
+
+def _naive_simple_exponential_smoothing(train, horizon):
+    best_sse, best_level = np.inf, None
+    for alpha in _ALPHAS:
+        level, sse = train[0], 0
+        for y in train[1:]:
+            sse += (y - level) ** 2
+            level += alpha * (y - level)
+        if sse < best_sse:
+            best_sse, best_level = sse, level
+    return np.full(horizon, best_level)
+
+
+@pytest.mark.parametrize('baseline, naive_baseline', [
+    (lambda g, o, l: seasonal_naive(g, o, m=12), _naive_seasonal_naive),
+    (drift, _naive_drift),
+    (
+        lambda g, o, l: simple_exponential_smoothing(g, o, alphas=_ALPHAS),
+        _naive_simple_exponential_smoothing
+    ),
+], ids=['seasonal_naive', 'drift', 'simple_exponential_smoothing'])
+def test_baseline_matches_naive_loop(layout, baseline, naive_baseline):
+    grid, lengths, origins, test_sizes, naive_series = layout
+    forecasts = baseline(grid, origins, lengths)
+    for col, values in enumerate(naive_series):
+        origin, horizon = origins[col], test_sizes[col]
+        np.testing.assert_allclose(
+            forecasts[origin:, col],
+            naive_baseline(values[:len(values) - horizon], horizon)
+        )
+        assert np.isnan(forecasts[:origin, col]).all()
+
+
+def test_mean_absolute_error(layout):
+    grid, lengths, origins, test_sizes, naive_series = layout
+    forecasts = drift(grid, origins, lengths)
+    errors = mean_absolute_error(grid, forecasts, origins, test_sizes)
+    for col, values in enumerate(naive_series):
+        horizon = test_sizes[col]
+        train, test = values[:-horizon], values[-horizon:]
+        assert errors[col] == pytest.approx(
+            np.abs(test - _naive_drift(train, horizon)).mean()
+        )
@@ -0,0 +1,51 @@
+"""Tests for national_parks.features."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from national_parks.features import FeatureStore, add_series_features
+from national_parks.model._arima import _get_exog
+
+
+@pytest.fixture
+def store():
+    # Calendar features extend a year beyond the weather, as if to a horizon
+    index = pd.period_range('2000-01', '2002-12', freq='M', name='dt_pk')
+    calendar = FeatureStore.from_dataframe(
+        pd.DataFrame({'weekend_days': np.arange(len(index))}, index=index)
+    )
+    dt_pk = pd.period_range('2000-01', '2001-12', freq='M')
+    weather = pd.DataFrame({
+        'dt_pk': [str(p) for p in dt_pk],
+        'YELL_TAVG': [100 * (p.year - 2000) + p.month for p in dt_pk],
+        # A park without capta for one month of the year can't be filled
+        'ACAD_TAVG': [np.nan if p.month == 3 else 1.0 for p in dt_pk],
+    })
+    weather.loc[5, 'YELL_TAVG'] = np.nan
+    return add_series_features(calendar, weather)
+
+
+def test_add_series_features(store):
+    assert list(store.columns) == ['weekend_days', 'YELL_TAVG']
+    features = store.window(store.start, len(store))
+    np.testing.assert_array_equal(
+        features['weekend_days'], np.arange(len(store))
+    )
+    tavg = features['YELL_TAVG']
+    assert tavg[pd.Period('2001-02', freq='M')] == 102
+    # Gaps and periods beyond the capta take the mean of their month
+    assert tavg[pd.Period('2000-06', freq='M')] == 106
+    assert tavg[pd.Period('2002-02', freq='M')] == 52
+
+
+def test_get_exog_reads_series_features(store):
+    ts = pd.Series(
+        np.ones(6),
+        index=pd.period_range('2001-01', periods=6, freq='M', name='dt_pk'),
+        name='YELL'
+    )
+    exog = _get_exog(ts, None, ['weekend_days', 'TAVG'], features=store)
+    assert list(exog.columns) == ['weekend_days', 'TAVG']
+    assert exog['TAVG'].tolist() == [101, 102, 103, 104, 105, 106]
+    pd.testing.assert_index_equal(exog.index, ts.index)
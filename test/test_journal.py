@@ -0,0 +1,39 @@
+"""Tests for national_parks.model._journal."""
+
+from national_parks.model import CompletionJournal, journal_unit
+
+
+def test_resume_after_truncated_entry(tmp_path):
+    path = str(tmp_path / 'journal' / 'completed.jsonl')
+    journal = CompletionJournal(path)
+    journal.record('parks/AAA', 'key-a')
+    journal.record('parks/BBB', 'key-b')
+    # A crash part way through an entry leaves it without a newline
+    with open(path, 'a') as fo:
+        fo.write('{"unit": "parks/CCC", "ke')
+
+    journal = CompletionJournal(path)
+    assert journal.completed() == {'parks/AAA': 'key-a', 'parks/BBB': 'key-b'}
+    journal.record('parks/CCC', 'key-c')
+    assert journal.completed() == {
+        'parks/AAA': 'key-a', 'parks/BBB': 'key-b', 'parks/CCC': 'key-c'
+    }
+
+
+def test_latest_entry_wins(tmp_path):
+    journal = CompletionJournal(str(tmp_path / 'completed.jsonl'))
+    journal.record('AAA', 'old')
+    journal.record('AAA', 'new')
+    assert journal.completed() == {'AAA': 'new'}
+
+
+def test_reset(tmp_path):
+    journal = CompletionJournal(str(tmp_path / 'completed.jsonl'))
+    journal.record('AAA', 'key')
+    journal.reset()
+    assert journal.completed() == {}
+
+
+def test_journal_unit():
+    assert journal_unit('AAA', 'parks') == 'parks/AAA'
+    assert journal_unit('AAA') == 'AAA'
@@ -0,0 +1,174 @@
+"""Tests for national_parks.processing, comparing pivot_monthly_grid with the
+melt -> create_dt_pk -> (sum_by ->) pivot chain it replaces, in both engines.
+"""
+
+import pandas as pd
+import pytest
+
+from national_parks.nps import generate_monthly_visitors
+from national_parks.processing import Transformation
+
+_MONTHS = [
+    'JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+    'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'
+]
+
+_MELT_CHAIN = [
+    ('columns_to_lowercase', None),
+    ('melt', {
+        'id_vars': ['park_name', 'park_type', 'year'],
+        'var_name': 'month',
+        'value_name': 'visitors',
+    }),
+    ('create_dt_pk', {'year_col': 'year', 'month_col': 'month'}),
+]
+
+_BY_PARK = {
+    'melt': _MELT_CHAIN + [
+        ('pivot', {
+            'index': 'dt_pk', 'columns': 'park_name', 'values': 'visitors'
+        }),
+    ],
+    'grid': [
+        ('columns_to_lowercase', None),
+        ('pivot_monthly_grid', {'columns': 'park_name'}),
+    ],
+}
+
+_BY_PARK_TYPE = {
+    'melt': _MELT_CHAIN + [
+        ('sum_by', {'by': ['park_type', 'dt_pk'], 'summands': ['visitors']}),
+        ('pivot', {
+            'index': 'dt_pk', 'columns': 'park_type', 'values': 'visitors'
+        }),
+    ],
+    'grid': [
+        ('columns_to_lowercase', None),
+        ('pivot_monthly_grid', {
+            'columns': 'park_type', 'sum_duplicates': True
+        }),
+    ],
+}
+
+
+@pytest.fixture(scope='module')
+def source_visitors():
+    df = generate_monthly_visitors(
+        20, min_year=2000, max_year=2010, park_types=('NP', 'NM', 'NHP')
+    )
+    # Missing months within a series must survive every reshape
+    df.loc[df.index[3], 'MAR'] = pd.NA
+    return df
+
+
+def _run_eagerly(df, transformations):
+    for name, params in transformations:
+        df = Transformation(name=name, params=params).transform(df)
+    return df
+
+
+def _run_lazily(df, transformations):
+    pl = pytest.importorskip('polars')
+    from national_parks.processing.lazy_transformation import (
+        LazyTransformation
+    )
+    lf = pl.from_pandas(
+        df.astype({
+            'park_name': str,
+            'park_type': str,
+            **{m: 'float64' for m in _MONTHS}
+        })
+    ).lazy()
+    for name, params in transformations:
+        lf = LazyTransformation(name=name, params=params).transform(lf)
+    return lf.collect().to_pandas().set_index('dt_pk')
+
+
+def _normalize(df):
+    """Helper function to compare outputs regardless of engine-specific
+    dtypes and index metadata.
+    """
+    df = df.astype('float64')
+    df.columns = pd.Index([str(c) for c in df.columns])
+    df.index = pd.DatetimeIndex(df.index, name='dt_pk').astype(
+        'datetime64[ns]'
+    )
+    return df
+
+
+@pytest.mark.parametrize('run', [_run_eagerly, _run_lazily],
+                         ids=['pandas', 'polars'])
+@pytest.mark.parametrize('chains', [_BY_PARK, _BY_PARK_TYPE],
+                         ids=['park', 'park_type'])
+def test_grid_matches_melt_chain(source_visitors, run, chains):
+    expected = _normalize(_run_eagerly(source_visitors, chains['melt']))
+    pd.testing.assert_frame_equal(
+        _normalize(run(source_visitors, chains['grid'])), expected
+    )
+    pd.testing.assert_frame_equal(
+        _normalize(run(source_visitors, chains['melt'])), expected
+    )
+
+
+@pytest.mark.parametrize('run', [_run_eagerly, _run_lazily],
+                         ids=['pandas', 'polars'])
+def test_grid_rejects_duplicates(source_visitors, run):
+    # Park types repeat within a year, so they can't be pivoted without
+    # summing
+    with pytest.raises(ValueError):
+        run(source_visitors, [
+            ('columns_to_lowercase', None),
+            ('pivot_monthly_grid', {'columns': 'park_type'}),
+        ])
+
+
+def test_grid_preserves_integer_counts(source_visitors):
+    by_park = _run_eagerly(source_visitors, _BY_PARK['grid'])
+    assert (by_park.dtypes == 'Int32').all()
+    # Sums are widened so that they can't overflow
+    by_park_type = _run_eagerly(source_visitors, _BY_PARK_TYPE['grid'])
+    assert (by_park_type.dtypes == 'Int64').all()
+
+
+@pytest.fixture(scope='module')
+def source_weather():
+    dt_pk = pd.period_range('2000-01', periods=4, freq='M').to_timestamp()
+    return pd.DataFrame({
+        'dt_pk': list(dt_pk) * 2,
+        'park_name': ['YELL'] * 4 + ['ACAD'] * 4,
+        'TAVG': [-5.0, -3.0, 1.0, 6.0, -6.0, -4.0, None, 5.0],
+        'PRCP': [30.0, 25.0, 40.0, 55.0, 90.0, 80.0, 100.0, 95.0],
+    })
+
+
+def _run_weather_lazily(df, transformations):
+    pl = pytest.importorskip('polars')
+    from national_parks.processing.lazy_transformation import (
+        LazyTransformation
+    )
+    lf = pl.from_pandas(df).lazy()
+    for name, params in transformations:
+        lf = LazyTransformation(name=name, params=params).transform(lf)
+    return lf.collect().to_pandas().set_index('dt_pk')
+
+
+@pytest.mark.parametrize('run', [_run_eagerly, _run_weather_lazily],
+                         ids=['pandas', 'polars'])
+def test_pivot_variables(source_weather, run):
+    df = _normalize(run(source_weather, [
+        ('pivot_variables', {'index': 'dt_pk', 'columns': 'park_name'}),
+    ]))
+    assert list(df.columns) == ['ACAD_PRCP', 'ACAD_TAVG', 'YELL_PRCP',
+                                'YELL_TAVG']
+    assert df['YELL_TAVG'].tolist() == [-5.0, -3.0, 1.0, 6.0]
+    assert df['ACAD_TAVG'].isna().tolist() == [False, False, True, False]
+    assert df.index.is_monotonic_increasing
+
+
+@pytest.mark.parametrize('run', [_run_eagerly, _run_weather_lazily],
+                         ids=['pandas', 'polars'])
+def test_pivot_variables_rejects_duplicates(source_weather, run):
+    with pytest.raises(ValueError):
+        run(pd.concat([source_weather, source_weather.iloc[:1]]), [
+            ('pivot_variables', {'index': 'dt_pk', 'columns': 'park_name'}),
+        ])
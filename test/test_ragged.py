@@ -0,0 +1,65 @@
+"""Tests for national_parks.utils.ragged."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from national_parks.utils.ragged import RaggedSeries
+
+
+@pytest.fixture
+def padded_df():
+    return pd.DataFrame(
+        {
+            'A': [np.nan, 1, 2, np.nan, 4, np.nan],
+            'B': [5, 6, 7, 8, 9, 10],
+            'C': [np.nan, np.nan, np.nan, np.nan, 11, 12],
+        },
+        index=pd.period_range('2000-01', periods=6, freq='M', name='dt_pk'),
+        dtype=np.float64
+    )
+
+
+def test_from_dataframe_trims_padding(padded_df):
+    ragged = RaggedSeries.from_dataframe(padded_df)
+    assert list(ragged.names) == ['A', 'B', 'C']
+    assert list(ragged.lengths) == [4, 6, 2]
+    assert list(ragged.n_missing) == [1, 0, 0]
+    assert ragged['A'].index[0] == pd.Period('2000-02', freq='M')
+    np.testing.assert_array_equal(ragged['A'], [1, 2, np.nan, 4])
+
+
+def test_round_trip(padded_df, tmp_path):
+    path = str(tmp_path / 'series.npz')
+    RaggedSeries.from_dataframe(padded_df).save(path)
+    loaded = RaggedSeries.load(path)
+    assert loaded.freq == 'M'
+    pd.testing.assert_frame_equal(loaded.to_dataframe(), padded_df)
+
+
+def test_from_dataframe_rejects_irregular_index(padded_df):
+    with pytest.raises(ValueError):
+        RaggedSeries.from_dataframe(padded_df.iloc[[0, 2, 3]])
+
+
+def test_select(padded_df):
+    ragged = RaggedSeries.from_dataframe(padded_df)
+    selected = ragged.select(['C', 'A'])
+    assert list(selected.names) == ['C', 'A']
+    assert list(selected.offsets) == [0, 2]
+    for name in ['C', 'A']:
+        pd.testing.assert_series_equal(selected[name], ragged[name])
+    assert len(ragged.select([])) == 0
+
+
+@pytest.mark.parametrize(
+    'usecols', [['B', 'C'], lambda name: name != 'A'], ids=['list', 'callable']
+)
+def test_load_usecols(padded_df, tmp_path, usecols):
+    path = str(tmp_path / 'series.npz')
+    RaggedSeries.from_dataframe(padded_df).save(path)
+    loaded = RaggedSeries.load(path, usecols=usecols)
+    assert list(loaded.names) == ['B', 'C']
+    pd.testing.assert_frame_equal(
+        loaded.to_dataframe(), padded_df[['B', 'C']]
+    )
@@ -0,0 +1,104 @@
+"""Tests for national_parks.model._reconcile."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from national_parks.model._forecasts import forecast_path, write_forecast
+from national_parks.model._reconcile import (
+    _park_model_forecasts, reconcile, summing_matrix
+)
+from national_parks.utils.ragged import RaggedSeries
+
+_METHODS = ['bottom_up', 'ols', 'wls_struct', 'mint_diag']
+
+
+@pytest.fixture
+def hierarchy():
+    S, aggregates = summing_matrix(['NP', 'NM', 'NP'])
+    rng = np.random.default_rng(0)
+    base = rng.normal(100, 10, size=(S.shape[0], 6))
+    variances = rng.uniform(1, 5, size=S.shape[0])
+    return S, aggregates, base, variances
+
+
+def test_summing_matrix(hierarchy):
+    S, aggregates, _, _ = hierarchy
+    assert list(aggregates) == ['NM', 'NP']
+    np.testing.assert_array_equal(
+        S.toarray(),
+        [[0, 1, 0], [1, 0, 1], [1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    )
+
+
+def test_bottom_up_sums_bottom_level(hierarchy):
+    S, _, base, _ = hierarchy
+    reconciled = reconcile(base, S, method='bottom_up')
+    np.testing.assert_array_equal(reconciled[2:], base[2:])
+    np.testing.assert_allclose(reconciled[0], base[3])
+    np.testing.assert_allclose(reconciled[1], base[2] + base[4])
+
+
+@pytest.mark.parametrize('method', _METHODS)
+def test_reconciled_forecasts_are_coherent(hierarchy, method):
+    S, _, base, variances = hierarchy
+    reconciled = reconcile(base, S, method=method, variances=variances)
+    assert reconciled.shape == base.shape
+    np.testing.assert_allclose(reconciled, S @ reconciled[2:])
+
+
+@pytest.mark.parametrize('method', _METHODS)
+def test_coherent_forecasts_are_unchanged(hierarchy, method):
+    S, _, base, variances = hierarchy
+    coherent = S @ base[2:]
+    np.testing.assert_allclose(
+        reconcile(coherent, S, method=method, variances=variances), coherent
+    )
+
+
+def test_projection_matches_dense_solution(hierarchy):
+    S, _, base, variances = hierarchy
+    dense = S.toarray()
+    w_inv = np.diag(1 / variances)
+    expected = dense @ np.linalg.solve(
+        dense.T @ w_inv @ dense, dense.T @ w_inv @ base
+    )
+    np.testing.assert_allclose(
+        reconcile(base, S, method='mint_diag', variances=variances), expected
+    )
+
+
+def test_invalid_method(hierarchy):
+    S, _, base, _ = hierarchy
+    with pytest.raises(ValueError):
+        reconcile(base, S, method='mint_diag')
+    with pytest.raises(NotImplementedError):
+        reconcile(base, S, method='mint_shrink')
+
+
+def test_baseline_forecasts_are_read_from_models(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    periods = pd.period_range('2000-01', periods=36, freq='M', name='dt_pk')
+    df = pd.DataFrame(
+        {'AAA': np.arange(36.0), 'BBB': np.arange(36.0)}, index=periods
+    )
+    ragged = RaggedSeries.from_dataframe(df)
+    # AAA's baseline was forecast from before the origin, whereas BBB's test
+    # set starts after it and so leaves BBB to seasonal naive forecasts
+    for park, test_size in (('AAA', 14), ('BBB', 10)):
+        model_output_path = os.path.join('models', 'parks', park)
+        os.makedirs(model_output_path)
+        write_forecast(
+            forecast_path(model_output_path, park),
+            df[park][-test_size:],
+            np.arange(test_size) + 100.0
+        )
+    forecasts, variances, sources = _park_model_forecasts(
+        ragged, ['AAA', 'BBB'], 'parks', [], None, periods[0].ordinal, 36, 24
+    )
+    np.testing.assert_array_equal(forecasts[24:, 0], np.arange(2, 14) + 100)
+    assert np.isnan(forecasts[:24]).all() and np.isnan(forecasts[:, 1]).all()
+    assert np.isnan(variances).all()
+    assert list(sources) == ['baseline', None]
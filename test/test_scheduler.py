@@ -0,0 +1,55 @@
+"""Tests for national_parks.model._scheduler."""
+
+import threading
+
+import pytest
+
+from national_parks.model import Scheduler
+
+
+def test_run_recipes_respects_dependencies():
+    built = []
+    lock = threading.Lock()
+    received = {}
+
+    def build(recipe, dependency_rebuilt):
+        with lock:
+            built.append(recipe)
+            received[recipe] = dependency_rebuilt
+        return recipe != 'c'
+
+    rebuilt = Scheduler(workers=1).run_recipes(
+        ['a', 'b', 'c', 'd'],
+        build,
+        {'a': set(), 'b': {'a'}, 'c': set(), 'd': {'c'}},
+        {'a': 1, 'b': 1, 'c': 2, 'd': 1}
+    )
+    assert rebuilt == {'a': True, 'b': True, 'c': False, 'd': True}
+    assert built.index('a') < built.index('b')
+    assert built.index('c') < built.index('d')
+    # A recipe must be rebuilt only if one of its dependencies was
+    assert received == {'a': False, 'b': True, 'c': False, 'd': False}
+
+
+def test_run_recipes_rejects_circular_dependencies():
+    with pytest.raises(ValueError):
+        Scheduler(workers=1).run_recipes(
+            ['a', 'b'],
+            lambda recipe, dependency_rebuilt: True,
+            {'a': {'b'}, 'b': {'a'}},
+            {'a': 1, 'b': 1}
+        )
+
+
+def test_run_recipes_propagates_failures():
+    def build(recipe, dependency_rebuilt):
+        raise RuntimeError(recipe)
+
+    with pytest.raises(RuntimeError):
+        Scheduler(workers=1).run_recipes(['a'], build, {'a': set()}, {'a': 1})
+
+
+def test_submit_runs_on_workers():
+    with Scheduler(workers=2) as scheduler:
+        futures = [scheduler.submit(cost, abs, -cost) for cost in range(5)]
+        assert [f.result() for f in futures] == list(range(5))
@@ -0,0 +1,71 @@
+"""Tests for national_parks.model._shards."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from national_parks.model import (
+    merge_shards, parse_shard, shard_subdir, unshard_subdir
+)
+from national_parks.model._shards import partition
+
+
+def test_parse_shard():
+    assert parse_shard('1/4') == (1, 4)
+    assert parse_shard(' 0 / 2 ') == (0, 2)
+
+
+@pytest.mark.parametrize('spec', ['4/4', '1', 'a/b', '-1/2'])
+def test_parse_shard_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_shard(spec)
+
+
+def test_shard_subdir_round_trip():
+    assert unshard_subdir(shard_subdir('parks', (1, 4))) == 'parks'
+    assert unshard_subdir(shard_subdir(None, (1, 4))) is None
+    assert unshard_subdir('parks') == 'parks'
+
+
+def test_partition_balances_costs():
+    costs = {'a': 5, 'b': 4, 'c': 3, 'd': 3, 'e': 1}
+    assignments = partition(costs, 2)
+    assert assignments == {'a': 0, 'b': 1, 'c': 1, 'd': 0, 'e': 1}
+    loads = [
+        sum(costs[u] for u, s in assignments.items() if s == shard)
+        for shard in range(2)
+    ]
+    assert loads == [8, 8]
+    # Every shard makes the same assignments, whatever the order of costs
+    assert partition(dict(reversed(list(costs.items()))), 2) == assignments
+
+
+def _write(path, contents=''):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fo:
+        fo.write(contents)
+
+
+def test_merge_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i, park in enumerate(['AAA', 'BBB']):
+        shard_dir = os.path.join('models', shard_subdir('parks', (i, 2)))
+        _write(os.path.join(shard_dir, park, f'{park}_arima.pkl'))
+        _write(
+            os.path.join(shard_dir, 'cascade_tiers.csv'),
+            f'series,tier\n{park},arima\n'
+        )
+    # An interrupted shard leaves a staging directory behind
+    _write(os.path.join(
+        'models', shard_subdir('parks', (1, 2)), '.partial-CCC-0', 'x.pkl'
+    ))
+    # A series previously fit is replaced
+    _write(os.path.join('models', 'parks', 'AAA', 'stale.pkl'))
+
+    assert merge_shards('parks', 2) == 2
+    parks_dir = os.path.join('models', 'parks')
+    assert sorted(os.listdir(parks_dir)) == ['AAA', 'BBB', 'cascade_tiers.csv']
+    assert os.listdir(os.path.join(parks_dir, 'AAA')) == ['AAA_arima.pkl']
+    tiers = pd.read_csv(os.path.join(parks_dir, 'cascade_tiers.csv'))
+    assert tiers['series'].tolist() == ['AAA', 'BBB']